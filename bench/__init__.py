@@ -0,0 +1 @@
+"""Офлайн-бенчмарки и проверки на фейковых Telegram, Mistral и Bot API (в образ не входят)"""
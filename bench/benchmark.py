@@ -0,0 +1,182 @@
+"""Офлайн-бенчмарк конвейера Userbot: фейковые Telegram, Mistral и Bot API, без сети.
+
+Прогоняет синтетический поток апдейтов через reaction_handler -> _dispatch_action ->
+_handle_media / _handle_text_fix и печатает p50/p99 задержки, задач/сек и пиковый RSS.
+
+    python -m bench.benchmark --jobs 200 --rate 50 --mistral-latency 0.3 --mistral-errors 0.05
+    python -m bench.benchmark --json   # машиночитаемый отчёт (для CI)
+
+Код выхода 1, если доля недоставленных задач больше --max-failures
+или p99 больше --max-p99 (когда задан).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import shutil
+import sys
+import tempfile
+import time
+from src.config import Config
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def run(args) -> dict:
+    from bench.fake_bot_api import FakeBotAPI
+    from bench.fake_mistral_api import FakeMistralAPI
+    from bench.fake_telegram import FakeTelegramClient
+    from src.memory_probe import RssProbe
+
+    random.seed(args.seed)
+    bot_api = FakeBotAPI(latency=args.bot_latency, flood_rate=args.bot_flood, retry_after=0)
+    mistral = FakeMistralAPI(latency=args.mistral_latency, jitter=args.mistral_latency,
+                             error_rate=args.mistral_errors, flood_rate=args.mistral_flood)
+    Config.BOT_API_URL = await bot_api.start()
+    Config.MISTRAL_SERVER_URL = await mistral.start()
+    Config.MISTRAL_API_KEY = Config.MISTRAL_API_KEY or "bench"
+    Config.BOT_TOKEN = Config.BOT_TOKEN or "bench"
+    Config.BOT_CHAT_RATE = 0  # фейковый Bot API не ограничивает чат; меряем сам конвейер
+    Config.METRICS_PORT = 0
+    Config.DATA_DIR = tempfile.mkdtemp(prefix="bench_")
+
+    # Время до готовности: импорт конвейера, конструктор и запуск сервисов
+    startup_at = time.monotonic()
+    from src.userbot import Userbot, JOB_RESULTS
+
+    client = FakeTelegramClient(rpc_latency=args.rpc_latency, error_rate=args.download_errors)
+    bot = Userbot(client=client, bot_client=object())
+    await bot.start_services(client.my_id)
+    startup = time.monotonic() - startup_at
+    bot.mark_ready(startup_at)
+
+    chats = [client.add_chat(f"Чат {i}") for i in range(5)]
+    users = [client.add_user(f"Пользователь {i}") for i in range(10)]
+
+    started_at = {}
+    latencies = []
+    results = dict.fromkeys(JOB_RESULTS, 0)
+    original_dispatch = bot._dispatch_action
+
+    async def timed_dispatch(peer, msg_id, priority=0, msg=None, job=None):
+        try:
+            result = await original_dispatch(peer, msg_id, priority, msg, job)
+        except Exception:
+            result = "error"
+        results[result] += 1
+        latencies.append(time.monotonic() - started_at[msg_id])
+
+    bot._dispatch_action = timed_dispatch
+
+    def make_update():
+        chat, user = random.choice(chats), random.choice(users)
+        roll = random.random()
+        if roll < args.voice_share:
+            return client.add_message(chat, user, "voice", duration=random.randint(2, 90))
+        if roll < args.voice_share + args.video_share:
+            return client.add_message(chat, user, "video_note", duration=random.randint(5, 60))
+        return client.add_message(chat, user, "text", text="привет как дела что нового " * random.randint(1, 5))
+
+    async with RssProbe() as probe:
+        t0 = time.monotonic()
+        for _ in range(args.jobs):
+            for _ in range(args.noise):
+                update = client.noise_update()
+                if bot.reaction_filter(update):
+                    await bot.reaction_handler(update)
+            update = make_update()
+            started_at[update.message.id] = time.monotonic()
+            if bot.reaction_filter(update):
+                await bot.reaction_handler(update)
+            if args.rate:
+                await asyncio.sleep(1 / args.rate)
+
+        while len(latencies) < args.jobs:
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - t0
+
+    await bot.stop_services()
+    await bot_api.stop()
+    await mistral.stop()
+    shutil.rmtree(Config.DATA_DIR, ignore_errors=True)
+
+    return {
+        "jobs": args.jobs,
+        "startup_sec": round(startup, 3),
+        # Всё, кроме sent и skipped, — задача не дошла до пользователя
+        "failed_jobs": args.jobs - results["sent"] - results["skipped"],
+        "unhandled_errors": results["error"],
+        "results": results,
+        "injected_faults": {"mistral": mistral.faults, "bot_api": bot_api.faults},
+        "elapsed_sec": round(elapsed, 3),
+        "jobs_per_sec": round(args.jobs / elapsed, 2) if elapsed else 0.0,
+        "latency_p50_sec": round(_percentile(latencies, 50), 3),
+        "latency_p99_sec": round(_percentile(latencies, 99), 3),
+        "peak_rss_mb": round(probe.peak / 1024 / 1024, 1),
+        "bot_api_requests": len(bot_api.requests),
+        "mistral_requests": mistral.calls,
+        "telegram_rpc": client.calls,
+        "updates": bot.reaction_filter.stats(),
+        "entity_cache": bot.entity_cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк Userbot")
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0, help="задач/сек на входе (0 — залпом)")
+    parser.add_argument("--noise", type=int, default=10, help="посторонних апдейтов на одну задачу")
+    parser.add_argument("--voice-share", type=float, default=0.6)
+    parser.add_argument("--video-share", type=float, default=0.2)
+    parser.add_argument("--rpc-latency", type=float, default=0.02)
+    parser.add_argument("--download-errors", type=float, default=0.0)
+    parser.add_argument("--mistral-latency", type=float, default=0.2)
+    parser.add_argument("--mistral-errors", type=float, default=0.0)
+    parser.add_argument("--mistral-flood", type=float, default=0.0)
+    parser.add_argument("--bot-latency", type=float, default=0.01)
+    parser.add_argument("--bot-flood", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-failures", type=float, default=0.0,
+                        help="допустимая доля недоставленных задач (при инъекциях ошибок)")
+    parser.add_argument("--max-p99", type=float, default=0.0, help="порог p99 задержки, сек (0 — не проверять)")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="не глушить логи конвейера")
+    args = parser.parse_args()
+
+    # Логи конвейера (включая ожидаемые ошибки от инъекций) в отчёте только мешают
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        for k, v in report.items():
+            print(f"{k:>18}: {v}")
+
+    problems = check(report, args.max_failures, args.max_p99)
+    for problem in problems:
+        print(f"ПРОВАЛ: {problem}", file=sys.stderr)
+    if problems:
+        raise SystemExit(1)
+
+
+def check(report: dict, max_failures: float = 0.0, max_p99: float = 0.0) -> list:
+    """Нарушенные пороги отчёта (пустой список — бенчмарк пройден)"""
+    problems = []
+    if report["failed_jobs"] > max_failures * report["jobs"]:
+        problems.append(f"недоставлено задач: {report['failed_jobs']} из {report['jobs']} {report['results']}")
+    if max_p99 and report["latency_p99_sec"] > max_p99:
+        problems.append(f"p99 {report['latency_p99_sec']} сек > {max_p99} сек")
+    return problems
+
+
+if __name__ == '__main__':
+    main()
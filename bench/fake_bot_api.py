@@ -0,0 +1,134 @@
+"""Локальный фейковый Bot API для проверки BotSender без сети.
+
+Запуск: python -m bench.fake_bot_api --port 8081
+Затем в .env: BOT_API_URL=http://127.0.0.1:8081
+"""
+import argparse
+import asyncio
+import random
+from aiohttp import web
+from src.logger import setup_logger
+
+logger = setup_logger("FakeBotAPI")
+
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0.0, flood_rate: float = 0.0, retry_after: int = 1,
+                 error_rate: float = 0.0):
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+
+        # Всё, что пришло: [(method, payload)]
+        self.requests = []
+        # {(chat_id, message_id): text}
+        self.messages = {}
+        self.faults = 0
+        self._next_id = 1
+        self.runner = None
+        self.url = None
+
+    def _app(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self.runner = web.AppRunner(self._app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        real_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{real_port}"
+        logger.info(f"Фейковый Bot API слушает {self.url}")
+        return self.url
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def _handle(self, request):
+        method = request.match_info["method"]
+        payload = await request.json()
+        self.requests.append((method, payload))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.flood_rate and random.random() < self.flood_rate:
+            self.faults += 1
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after}
+            }, status=429)
+
+        if self.error_rate and random.random() < self.error_rate:
+            self.faults += 1
+            return web.json_response({
+                "ok": False, "error_code": 500, "description": "Internal Server Error"
+            }, status=500)
+
+        handler = getattr(self, f"_m_{method}", None)
+        if handler is None:
+            return web.json_response({"ok": True, "result": True})
+        return handler(payload)
+
+    def _m_sendMessage(self, payload):
+        text = payload.get("text", "")
+        if payload.get("parse_mode") == "HTML" and text.count("<") != text.count(">"):
+            return web.json_response({
+                "ok": False, "error_code": 400,
+                "description": "Bad Request: can't parse entities"
+            }, status=400)
+
+        message_id = self._next_id
+        self._next_id += 1
+        self.messages[(payload["chat_id"], message_id)] = text
+        return web.json_response({"ok": True, "result": {
+            "message_id": message_id,
+            "chat": {"id": payload["chat_id"]},
+            "text": text
+        }})
+
+    def _m_editMessageText(self, payload):
+        key = (payload["chat_id"], payload["message_id"])
+        if key not in self.messages:
+            return web.json_response({
+                "ok": False, "error_code": 400,
+                "description": "Bad Request: message to edit not found"
+            }, status=400)
+        if self.messages[key] == payload.get("text"):
+            return web.json_response({
+                "ok": False, "error_code": 400,
+                "description": "Bad Request: message is not modified"
+            }, status=400)
+        self.messages[key] = payload.get("text", "")
+        return web.json_response({"ok": True, "result": {
+            "message_id": payload["message_id"],
+            "chat": {"id": payload["chat_id"]},
+            "text": self.messages[key]
+        }})
+
+
+async def _serve(args):
+    api = FakeBotAPI(latency=args.latency, flood_rate=args.flood_rate, error_rate=args.error_rate)
+    await api.start(port=args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Фейковый Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
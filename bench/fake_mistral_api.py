@@ -0,0 +1,151 @@
+"""Локальный фейковый Mistral API (чат и транскрипция) для бенчмарков без сети.
+
+Запуск: python -m bench.fake_mistral_api --port 8082
+Затем в .env: MISTRAL_SERVER_URL=http://127.0.0.1:8082
+"""
+import argparse
+import asyncio
+import random
+import time
+from aiohttp import web
+from src.logger import setup_logger
+
+logger = setup_logger("FakeMistralAPI")
+
+
+class FakeMistralAPI:
+    def __init__(self, latency: float = 0.0, latency_per_mb: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, flood_rate: float = 0.0, slow_rate: float = 0.0,
+                 slow_latency: float = 0.0):
+        self.latency = latency
+        self.latency_per_mb = latency_per_mb
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.flood_rate = flood_rate
+        # Медленный хвост: доля запросов с дополнительной задержкой slow_latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+
+        # {endpoint: число запросов}
+        self.calls = {}
+        self.faults = 0
+        self.runner = None
+        self.url = None
+
+    def _app(self):
+        app = web.Application(client_max_size=200 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self._chat)
+        app.router.add_post("/v1/audio/transcriptions", self._transcribe)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self.runner = web.AppRunner(self._app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        real_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{real_port}"
+        logger.info(f"Фейковый Mistral API слушает {self.url}")
+        return self.url
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def _delay_or_fault(self, endpoint: str, size: int):
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        delay = self.latency + self.latency_per_mb * size / (1024 * 1024)
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if self.slow_rate and random.random() < self.slow_rate:
+            delay += self.slow_latency
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.flood_rate and random.random() < self.flood_rate:
+            self.faults += 1
+            return web.json_response({"message": "Requests rate limit exceeded"}, status=429)
+        if self.error_rate and random.random() < self.error_rate:
+            self.faults += 1
+            return web.json_response({"message": "Internal server error"}, status=500)
+        return None
+
+    async def _chat(self, request):
+        payload = await request.json()
+        fault = await self._delay_or_fault("chat", 0)
+        if fault:
+            return fault
+
+        user_text = next((m["content"] for m in reversed(payload["messages"]) if m["role"] == "user"), "")
+        # "Правка": запятая после первого слова; для саммари — первые слова текста
+        words = user_text.split()
+        if words:
+            words[0] = words[0].rstrip(",") + ","
+        content = " ".join(words)
+
+        return web.json_response({
+            "id": f"fake-{time.time_ns()}",
+            "object": "chat.completion",
+            "model": payload.get("model", "fake"),
+            "created": int(time.time()),
+            "usage": {"prompt_tokens": len(words), "completion_tokens": len(words), "total_tokens": 2 * len(words)},
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content}
+            }]
+        })
+
+    async def _transcribe(self, request):
+        size = 0
+        model = "fake"
+        reader = await request.multipart()
+        try:
+            async for part in reader:
+                if part.name == "file":
+                    while chunk := await part.read_chunk(256 * 1024):
+                        size += len(chunk)
+                elif part.name == "model":
+                    model = await part.text()
+        except ConnectionResetError:
+            # Клиент отменил запрос (например, проигравший hedged-дубль)
+            return web.Response(status=499)
+
+        fault = await self._delay_or_fault("transcribe", size)
+        if fault:
+            return fault
+
+        return web.json_response({
+            "model": model,
+            "text": f"Распознанный текст ({size} байт)",
+            "language": "ru",
+            "segments": [],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        })
+
+
+async def _serve(args):
+    api = FakeMistralAPI(latency=args.latency, latency_per_mb=args.latency_per_mb,
+                         error_rate=args.error_rate, flood_rate=args.flood_rate,
+                         slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    await api.start(port=args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Фейковый Mistral API")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-per-mb", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=0.0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
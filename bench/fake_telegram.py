@@ -0,0 +1,182 @@
+"""Фейковый TelegramClient и генератор синтетических апдейтов для бенчмарков без сети"""
+import asyncio
+import datetime
+import itertools
+import random
+from telethon import types, utils
+from src.config import Config
+
+
+class FakeMessage:
+    """Обёртка над настоящим types.Message: get_chat/get_sender идут в фейковый клиент"""
+
+    def __init__(self, raw, client):
+        self._raw = raw
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    @property
+    def text(self):
+        return self._raw.message
+
+    async def get_chat(self):
+        await self._client._rpc()
+        return self._client.chats[self._raw.peer_id.channel_id]
+
+    async def get_sender(self):
+        await self._client._rpc()
+        return self._client.users[self._raw.from_id.user_id]
+
+
+class FakeTelegramClient:
+    """Подмножество TelegramClient, которое использует Userbot.
+
+    rpc_latency — задержка каждого MTProto-вызова, download_speed — байт/сек,
+    error_rate — доля скачиваний, падающих с ошибкой.
+    """
+
+    def __init__(self, my_id: int = 1, rpc_latency: float = 0.02, download_speed: float = 20e6,
+                 chunk_size: int = 128 * 1024, error_rate: float = 0.0, trigger_emoji: str = None):
+        self.my_id = my_id
+        self.trigger_emoji = trigger_emoji or Config.TRIGGER_EMOJI
+        self.rpc_latency = rpc_latency
+        self.download_speed = download_speed
+        self.chunk_size = chunk_size
+        self.error_rate = error_rate
+
+        self.chats = {}
+        self.users = {}
+        # {(channel_id, msg_id): types.Message}
+        self.messages = {}
+        # {document.id: размер}
+        self.sizes = {}
+        self.calls = 0
+        self._ids = itertools.count(1000)
+
+        # То, что Message._finish_init берёт у настоящего клиента. Вместо кэша сущностей — пустой dict:
+        # его get() возвращает None, и Telethon берёт input-сущность из самих entities
+        self._self_id = my_id
+        self._mb_entity_cache = {}
+        self.parse_mode = None
+
+    async def _rpc(self):
+        self.calls += 1
+        if self.rpc_latency:
+            await asyncio.sleep(self.rpc_latency)
+
+    async def __call__(self, request):
+        await self._rpc()
+
+    async def get_me(self):
+        await self._rpc()
+        return types.User(id=self.my_id, first_name="Bench", is_self=True)
+
+    @staticmethod
+    def _channel_id(peer) -> int:
+        if isinstance(peer, int):
+            return utils.resolve_id(peer)[0]
+        return getattr(peer, "channel_id", None) or peer.id
+
+    async def get_messages(self, peer, ids):
+        await self._rpc()
+        cid = self._channel_id(peer)
+        if isinstance(ids, list):
+            return [FakeMessage(self.messages[(cid, i)], self) if (cid, i) in self.messages else None for i in ids]
+        raw = self.messages.get((cid, ids))
+        return FakeMessage(raw, self) if raw else None
+
+    async def iter_messages(self, peer, limit: int = None):
+        await self._rpc()
+        cid = self._channel_id(peer)
+        ids = sorted((i for c, i in self.messages if c == cid), reverse=True)[:limit]
+        for i in ids:
+            yield FakeMessage(self.messages[(cid, i)], self)
+
+    async def get_entity(self, peer):
+        await self._rpc()
+        return self.chats[self._channel_id(peer)]
+
+    async def iter_download(self, media, request_size: int = None):
+        # Документ из чужого процесса (воркер получил сообщение через очередь) — по размеру из него
+        size = self.sizes.get(media.document.id) or media.document.size
+        chunk = request_size or self.chunk_size
+        if self.error_rate and random.random() < self.error_rate:
+            await self._rpc()
+            raise ConnectionError("fake: download failed")
+        sent = 0
+        while sent < size:
+            n = min(chunk, size - sent)
+            await asyncio.sleep(n / self.download_speed)
+            # Не нули, чтобы у разных файлов был разный хэш
+            yield random.randbytes(n)
+            sent += n
+
+    async def edit_message(self, *args, **kwargs):
+        await self._rpc()
+
+    # --- генерация данных ---
+
+    # Настоящие TL-типы: их можно сериализовать и передать воркеру через очередь
+    def add_chat(self, title: str) -> types.Channel:
+        chat = types.Channel(
+            id=next(self._ids), title=title, photo=types.ChatPhotoEmpty(), date=datetime.datetime.now(),
+            access_hash=random.getrandbits(62), megagroup=True
+        )
+        self.chats[chat.id] = chat
+        return chat
+
+    def add_user(self, name: str) -> types.User:
+        user = types.User(id=next(self._ids), access_hash=random.getrandbits(62), first_name=name)
+        self.users[user.id] = user
+        return user
+
+    def add_message(self, chat: types.Channel, sender: types.User, kind: str, duration: int = 0,
+                    text: str = "", bytes_per_sec: int = 4000):
+        """kind: voice | video_note | text. Возвращает апдейт с нашей реакцией-триггером"""
+        msg_id = next(self._ids)
+        media = None
+        if kind in ("voice", "video_note"):
+            if kind == "voice":
+                attr = types.DocumentAttributeAudio(duration=duration, voice=True)
+                mime = "audio/ogg"
+            else:
+                attr = types.DocumentAttributeVideo(duration=duration, w=384, h=384, round_message=True)
+                mime = "video/mp4"
+            size = max(1024, duration * bytes_per_sec)
+            doc = types.Document(
+                id=next(self._ids), access_hash=random.getrandbits(62), file_reference=b"",
+                date=datetime.datetime.now(), mime_type=mime, size=size, dc_id=2, attributes=[attr]
+            )
+            self.sizes[doc.id] = size
+            media = types.MessageMediaDocument(document=doc)
+
+        raw = types.Message(
+            id=msg_id, peer_id=types.PeerChannel(chat.id), from_id=types.PeerUser(sender.id),
+            date=datetime.datetime.now(), message=text, media=media
+        )
+        self.messages[(chat.id, msg_id)] = raw
+
+        reacted = types.Message(
+            id=msg_id, peer_id=raw.peer_id, from_id=raw.from_id, date=raw.date, message=text, media=media,
+            reactions=types.MessageReactions(results=[], recent_reactions=[
+                types.MessagePeerReaction(
+                    peer_id=types.PeerUser(self.my_id), date=raw.date,
+                    reaction=types.ReactionEmoji(emoticon=self.trigger_emoji)
+                )
+            ])
+        )
+        update = types.UpdateEditChannelMessage(message=reacted, pts=msg_id, pts_count=1)
+        # Как у Telethon: сущности из контейнера Updates, {marked id: сущность}
+        update._entities = {utils.get_peer_id(raw.peer_id): chat, sender.id: sender}
+        return update
+
+    @staticmethod
+    def noise_update():
+        """Апдейт, который должен отсекаться предфильтром"""
+        return random.choice((
+            types.UpdateUserTyping(user_id=42, action=types.SendMessageTypingAction()),
+            types.UpdateReadHistoryInbox(peer=types.PeerUser(42), max_id=1, still_unread_count=0, pts=1, pts_count=1),
+            types.UpdateUserStatus(user_id=42, status=types.UserStatusOnline(expires=datetime.datetime.now())),
+        ))
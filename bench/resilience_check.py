@@ -0,0 +1,57 @@
+"""Офлайн-проверка повторов, breaker'а и hedging против фейкового Mistral с ошибками и медленным хвостом:
+
+    python -m bench.resilience_check --requests 200 --error-rate 0.2 --slow-rate 0.05 --hedge
+"""
+import argparse
+import asyncio
+import time
+from src.ai_client import AIClient
+from src.config import Config
+from bench.fake_mistral_api import FakeMistralAPI
+from src.resilience import breaker_states, policy
+
+
+async def run(args):
+    Config.HEDGE_TRANSCRIBE = args.hedge
+    api = FakeMistralAPI(latency=args.latency, jitter=args.latency, error_rate=args.error_rate,
+                         flood_rate=args.flood_rate, slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    ai = AIClient(api_key="selftest", server_url=await api.start())
+    p = policy("mistral.transcribe")
+    p.base_delay = p.max_delay = 0.05
+
+    latencies = []
+    failed = 0
+
+    async def one():
+        nonlocal failed
+        started = time.monotonic()
+        try:
+            await ai.transcribe("fake", b"\0" * 1024, "voice.ogg")
+            latencies.append(time.monotonic() - started)
+        except Exception:
+            failed += 1
+
+    started = time.monotonic()
+    for _ in range(args.requests // 10):
+        await asyncio.gather(*(one() for _ in range(10)))
+    elapsed = time.monotonic() - started
+    await ai.close()
+    await api.stop()
+
+    latencies.sort()
+    q = lambda x: latencies[min(len(latencies) - 1, int(len(latencies) * x))] if latencies else 0.0
+    print(f"запросов: {args.requests}, неудач: {failed}, инъекций: {api.faults}, "
+          f"обращений к API: {api.calls.get('transcribe', 0)}, время: {elapsed:.2f} сек")
+    print(f"p50: {q(0.5):.3f} сек, p99: {q(0.99):.3f} сек, breaker: {breaker_states()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Офлайн-проверка повторов, breaker'а и hedging")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--hedge", action="store_true")
+    asyncio.run(run(parser.parse_args()))
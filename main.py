@@ -1,12 +1,34 @@
+import time
+
+# Отсчёт времени до готовности — до всех тяжёлых импортов
+STARTED_AT = time.monotonic()
+
+from dotenv import load_dotenv
+
+# .env — до импорта src: Config читает окружение при импорте
+load_dotenv()
+
+import argparse
 import asyncio
-from src.userbot import Userbot
+from src.config import Config
+from src.deployment import ROLES, run, run_workers
 from src.logger import setup_logger
 
 logger = setup_logger("Main")
 
 if __name__ == '__main__':
-    bot = Userbot()
+    parser = argparse.ArgumentParser(description="Telegram Voice Transcriber")
+    parser.add_argument("--role", choices=ROLES, default="all",
+                        help="all — всё в одном процессе; ingest — приём апдейтов; worker — обработка задач")
+    parser.add_argument("--queue", default=Config.QUEUE_URL,
+                        help="memory://, sqlite:///data/queue.sqlite3 или redis://localhost:6379/0")
+    parser.add_argument("--procs", type=int, default=1, help="число процессов-воркеров (для --role worker)")
+    args = parser.parse_args()
+
     try:
-        asyncio.run(bot.start())
+        if args.role == "worker":
+            run_workers(args.procs, args.queue, started_at=STARTED_AT)
+        else:
+            asyncio.run(run(args.role, args.queue, started_at=STARTED_AT))
     except KeyboardInterrupt:
-        logger.info("Бот остановлен пользователем.")
\ No newline at end of file
+        logger.info("Бот остановлен пользователем.")
@@ -0,0 +1,72 @@
+"""Аккаунты: у каждого свои API_ID/API_HASH, сессия, бот и каталог данных.
+
+Один аккаунт — из .env (как раньше). Несколько — по файлу на аккаунт в ACCOUNTS_DIR:
+
+    accounts/alice.env:  API_ID=... API_HASH=... BOT_TOKEN=... [SESSION_NAME=...] [DATA_DIR=...]
+
+Незаданные ключи берутся из общего .env.
+"""
+import glob
+import os
+from dotenv import dotenv_values
+from telethon.sessions import SQLiteSession, StringSession
+from .config import Config
+
+
+class Account:
+    __slots__ = ("name", "api_id", "api_hash", "session", "bot_token", "data_dir")
+
+    def __init__(self, name: str, api_id: int, api_hash: str, session: str, bot_token: str, data_dir: str):
+        self.name = name
+        self.api_id = api_id
+        self.api_hash = api_hash
+        self.session = session
+        self.bot_token = bot_token
+        self.data_dir = data_dir
+
+    @classmethod
+    def default(cls):
+        """Единственный аккаунт из .env — раскладка файлов та же, что до мультиаккаунта"""
+        return cls("default", Config.API_ID, Config.API_HASH, Config.SESSION_NAME, Config.BOT_TOKEN, Config.DATA_DIR)
+
+    @property
+    def bot_session(self) -> str:
+        return "bot_session" if self.name == "default" else f"{self.session}_bot"
+
+    def data_path(self, filename: str) -> str:
+        return os.path.join(self.data_dir, filename)
+
+    def worker_session(self) -> StringSession:
+        """Копия авторизации из сессии ingest: SQLite-сессию нельзя делить между процессами.
+
+        Ключ тот же, что у ingest, — годится только на той же машине (тот же IP)
+        """
+        path = self.session if self.session.endswith(".session") else self.session + ".session"
+        if not os.path.exists(path):
+            raise RuntimeError(f"Аккаунт {self.name}: нет сессии {path} — сначала авторизуйтесь, запустив ingest")
+        session = SQLiteSession(self.session)
+        try:
+            return StringSession(StringSession.save(session))
+        finally:
+            session.close()
+
+
+def load_accounts(directory: str = None) -> list:
+    directory = directory or Config.ACCOUNTS_DIR
+    files = sorted(glob.glob(os.path.join(directory, "*.env"))) if directory else []
+    if not files:
+        return [Account.default()]
+
+    accounts = []
+    for path in files:
+        name = os.path.splitext(os.path.basename(path))[0]
+        values = dotenv_values(path)
+        accounts.append(Account(
+            name=name,
+            api_id=int(values.get("API_ID") or Config.API_ID),
+            api_hash=values.get("API_HASH") or Config.API_HASH,
+            session=values.get("SESSION_NAME") or os.path.join(directory, name),
+            bot_token=values.get("BOT_TOKEN") or Config.BOT_TOKEN,
+            data_dir=values.get("DATA_DIR") or os.path.join(Config.DATA_DIR, name),
+        ))
+    return accounts
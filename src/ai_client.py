@@ -0,0 +1,120 @@
+import asyncio
+import importlib
+import httpx
+from contextlib import contextmanager
+from .config import Config
+from .logger import setup_logger
+from .metrics import metrics
+from .resilience import policy
+
+logger = setup_logger("AIClient")
+
+
+class AIClient:
+    """Общий асинхронный клиент Mistral для транскрипции, правки текста и саммари.
+
+    Один пул HTTP-соединений (httpx.AsyncClient) и один семафор: одновременно
+    выполняется не больше MISTRAL_CONCURRENCY запросов, остальные ждут в корутинах.
+    Повторы, дедлайны и breaker — через resilience.Policy на каждый эндпоинт.
+    """
+
+    def __init__(self, api_key: str = None, concurrency: int = None, server_url: str = None):
+        self.concurrency = concurrency if concurrency is not None else Config.MISTRAL_CONCURRENCY
+        self.api_key = api_key or Config.MISTRAL_API_KEY
+        self.server_url = server_url or Config.MISTRAL_SERVER_URL
+        self.http = None
+        self._client = None
+        self._warm_up = None
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.chat_policy = policy("mistral.chat", deadline=Config.MISTRAL_CHAT_DEADLINE)
+        self.transcribe_policy = policy("mistral.transcribe", deadline=Config.MISTRAL_TRANSCRIBE_DEADLINE)
+
+    @property
+    def client(self):
+        """Клиент Mistral создаётся при первом запросе: импорт SDK — самая долгая часть запуска"""
+        if self._client is None:
+            from mistralai import Mistral
+            # Запас соединений под дубли hedged-запросов: они не занимают слот семафора
+            connections = self.concurrency * 2 if Config.HEDGE_TRANSCRIBE else self.concurrency
+            self.http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=connections,
+                    max_keepalive_connections=self.concurrency
+                ),
+                timeout=httpx.Timeout(Config.MISTRAL_TIMEOUT, connect=10)
+            )
+            self._client = Mistral(api_key=self.api_key, server_url=self.server_url, async_client=self.http)
+        return self._client
+
+    def warm_up(self):
+        """Импорт SDK в фоновом потоке, когда бот уже принимает апдейты (один раз на клиент)"""
+        if self._warm_up is None:
+            self._warm_up = asyncio.create_task(asyncio.to_thread(importlib.import_module, "mistralai"))
+
+    async def _ready(self):
+        # Пока фоновый импорт идёт, импорт в client ждал бы блокировку импорта, остановив event loop
+        if self._warm_up and not self._warm_up.done():
+            await asyncio.wait([self._warm_up])
+
+    async def chat(self, model: str, messages: list) -> str:
+        await self._ready()
+
+        async def attempt():
+            with self._track("chat"):
+                return await self.client.chat.complete_async(model=model, messages=messages)
+
+        # Слот берётся на весь вызов с повторами: ожидание слота — локальная очередь,
+        # оно не входит в дедлайн, в окно латентности и в ошибки breaker'а
+        async with self._semaphore:
+            response = await self.chat_policy.call(attempt)
+        return response.choices[0].message.content
+
+    async def transcribe(self, model: str, content, filename: str):
+        """content — bytes или путь к файлу (открывается заново для каждой попытки и дубля)"""
+        await self._ready()
+
+        async def attempt():
+            with self._track("transcribe"):
+                if isinstance(content, str):
+                    with open(content, "rb") as f:
+                        return await self._transcribe_once(model, f, filename)
+                return await self._transcribe_once(model, content, filename)
+
+        # Дубль hedged-запроса идёт в том же слоте, что и основной запрос
+        async with self._semaphore:
+            return await self.transcribe_policy.call(attempt, hedge=Config.HEDGE_TRANSCRIBE)
+
+    async def _transcribe_once(self, model: str, content, filename: str):
+        # В этом API передаем только модель и файл.
+        # Параметр 'prompt' здесь не поддерживается SDK Mistral.
+        return await self.client.audio.transcriptions.complete_async(
+            model=model,
+            file={
+                "content": content,
+                "file_name": filename,
+            }
+        )
+
+    @contextmanager
+    def _track(self, op: str):
+        """Счётчик запросов к Mistral: result = ok | 429 | error"""
+        try:
+            yield
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            metrics.inc("mistral_requests_total", help_text="Запросы к Mistral по операции и результату",
+                        op=op, result="429" if status == 429 else "error")
+            raise
+        metrics.inc("mistral_requests_total", help_text="Запросы к Mistral по операции и результату",
+                    op=op, result="ok")
+
+    async def close(self):
+        if self._warm_up:
+            # Поток импорта не прервать; задачу отменяем, чтобы она не пережила event loop
+            self._warm_up.cancel()
+            await asyncio.wait([self._warm_up])
+            self._warm_up = None
+        if self.http:
+            await self.http.aclose()
+            self.http = None
+            self._client = None
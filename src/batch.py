@@ -0,0 +1,155 @@
+import html
+import os
+import sqlite3
+import time
+from .config import Config
+from .delivery import split_message
+
+
+class BatchItem:
+    __slots__ = ("msg_id", "sender", "label", "link", "date", "text")
+
+    def __init__(self, msg_id: int, sender: str, label: str, link: str, date: float, text: str = None):
+        self.msg_id = msg_id
+        self.sender = sender
+        self.label = label
+        self.link = link
+        self.date = date
+        # None — ещё не транскрибировано
+        self.text = text
+
+
+class BatchJob:
+    __slots__ = ("id", "peer", "title", "items")
+
+    def __init__(self, id: int, peer: int, title: str, items: list):
+        self.id = id
+        self.peer = peer
+        self.title = title
+        self.items = items
+
+    @property
+    def pending(self) -> list:
+        return [it for it in self.items if it.text is None]
+
+
+class BatchStore:
+    """Состояние пакетных задач в SQLite: переживает перезапуск, задача продолжается с места остановки.
+
+    batch_done хранит уже разобранные пакетом сообщения, чтобы следующий пакет их пропускал.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(Config.DATA_DIR, "batch.sqlite3")
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS batch_jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, peer INTEGER NOT NULL, title TEXT, "
+            "created REAL NOT NULL, done INTEGER NOT NULL DEFAULT 0);"
+            "CREATE TABLE IF NOT EXISTS batch_items ("
+            "job_id INTEGER NOT NULL, msg_id INTEGER NOT NULL, sender TEXT, label TEXT, link TEXT, "
+            "date REAL, text TEXT, PRIMARY KEY (job_id, msg_id));"
+            "CREATE TABLE IF NOT EXISTS batch_done ("
+            "peer INTEGER NOT NULL, msg_id INTEGER NOT NULL, PRIMARY KEY (peer, msg_id));"
+        )
+        self.db.commit()
+
+    def unfinished(self, peer: int = None) -> list:
+        """Незавершённые задачи (все или по одному чату)"""
+        if peer is None:
+            rows = self.db.execute("SELECT id, peer, title FROM batch_jobs WHERE done = 0 ORDER BY id").fetchall()
+        else:
+            rows = self.db.execute(
+                "SELECT id, peer, title FROM batch_jobs WHERE done = 0 AND peer = ? ORDER BY id", (peer,)
+            ).fetchall()
+        return [self._load(*row) for row in rows]
+
+    def _load(self, job_id: int, peer: int, title: str) -> BatchJob:
+        rows = self.db.execute(
+            "SELECT msg_id, sender, label, link, date, text FROM batch_items WHERE job_id = ? ORDER BY msg_id",
+            (job_id,)
+        ).fetchall()
+        return BatchJob(job_id, peer, title, [BatchItem(*row) for row in rows])
+
+    def is_done(self, peer: int, msg_id: int) -> bool:
+        return self.db.execute(
+            "SELECT 1 FROM batch_done WHERE peer = ? AND msg_id = ?", (peer, msg_id)
+        ).fetchone() is not None
+
+    def create(self, peer: int, title: str, items: list) -> BatchJob:
+        with self.db:
+            cur = self.db.execute(
+                "INSERT INTO batch_jobs (peer, title, created) VALUES (?, ?, ?)", (peer, title, time.time())
+            )
+            job_id = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO batch_items (job_id, msg_id, sender, label, link, date) VALUES (?, ?, ?, ?, ?, ?)",
+                [(job_id, it.msg_id, it.sender, it.label, it.link, it.date) for it in items]
+            )
+        return BatchJob(job_id, peer, title, items)
+
+    def save(self, job: BatchJob, item: BatchItem):
+        with self.db:
+            self.db.execute(
+                "UPDATE batch_items SET text = ? WHERE job_id = ? AND msg_id = ?", (item.text, job.id, item.msg_id)
+            )
+
+    def finish(self, job: BatchJob, exclude=()):
+        """Дайджест отправлен: помечаем сообщения разобранными (кроме exclude), промежуточные результаты больше не нужны"""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO batch_done (peer, msg_id) VALUES (?, ?)",
+                [(job.peer, it.msg_id) for it in job.items if it.msg_id not in exclude]
+            )
+            self.db.execute("DELETE FROM batch_items WHERE job_id = ?", (job.id,))
+            self.db.execute("UPDATE batch_jobs SET done = 1 WHERE id = ?", (job.id,))
+
+    def close(self):
+        self.db.close()
+
+
+def build_digest(title: str, items: list, max_len: int) -> list:
+    """Один дайджест на весь пакет: записи упаковываются в как можно меньше сообщений"""
+    header = (
+        f"<b>Сводка чата:</b> {html.escape(title)}\n"
+        f"<b>Сообщений:</b> {len(items)}\n"
+        f"--------------------\n\n"
+    )
+    parts = []
+    current = header
+    for it in sorted(items, key=lambda i: i.msg_id):
+        when = time.strftime("%d.%m %H:%M", time.localtime(it.date)) if it.date else ""
+        if it.link:
+            when = f'<a href="{it.link}">{when or "ссылка"}</a>'
+        title_line = f"<b>{html.escape(it.sender)}</b> · {it.label} · {when}\n"
+        safe_text = html.escape(it.text or "")
+        block = title_line + safe_text + "\n\n"
+
+        if len(current) + len(block) <= max_len:
+            current += block
+            continue
+        if len(block) <= max_len:
+            parts.append(current.rstrip())
+            current = block
+            continue
+
+        # Одна запись длиннее сообщения — режем как обычную транскрипцию, дописывая текущее
+        if len(current) + len(title_line) > max_len // 2:
+            parts.append(current.rstrip())
+            current = ""
+        chunks = split_message(current + title_line, safe_text, max_len)
+        parts.extend(chunks[:-1])
+        current = chunks[-1] + "\n\n"
+    if current.strip():
+        parts.append(current.rstrip())
+    return parts
+
+
+def combined_text(items: list) -> str:
+    """Текст всех записей пакета с именами — для общего саммари"""
+    return "\n\n".join(
+        f"{it.sender}: {it.text}" for it in sorted(items, key=lambda i: i.msg_id) if it.text
+    )
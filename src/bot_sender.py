@@ -1,56 +1,309 @@
 import aiohttp
+import asyncio
 import re
 import html
+import time
+from collections import deque
 from .config import Config
 from .logger import setup_logger
+from .metrics import metrics
+from .resilience import policy, TransientError, CircuitOpenError, RETRY_STATUSES
+from .tracing import trace_id
 
 logger = setup_logger("BotSender")
 
+
+class DeliveryError(Exception):
+    """Bot API так и не принял сообщение (send_message вернул None)"""
+
+
+def _resolve(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+class RateLimiter:
+    """Лимиты Bot API: общий (сообщений в секунду) и на каждый чат (token bucket)"""
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: int):
+        self.global_interval = 1.0 / global_rate if global_rate > 0 else 0.0
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._next_global = 0.0
+        # {chat_id: [tokens, last_ts]}
+        self._buckets = {}
+        # {chat_id: ts} — пауза после 429 (retry_after)
+        self._paused_until = {}
+        self._global_paused_until = 0.0
+
+    def delay(self, chat_id) -> float:
+        """Сколько ждать до разрешения следующего запроса в чат"""
+        now = time.monotonic()
+        wait = max(0.0, self._next_global - now, self._global_paused_until - now,
+                   self._paused_until.get(chat_id, 0.0) - now)
+
+        if self.chat_rate > 0:
+            tokens, last = self._buckets.get(chat_id, (self.chat_burst, now))
+            tokens = min(self.chat_burst, tokens + (now - last) * self.chat_rate)
+            self._buckets[chat_id] = [tokens, now]
+            if tokens < 1:
+                wait = max(wait, (1 - tokens) / self.chat_rate)
+        return wait
+
+    def consume(self, chat_id):
+        now = time.monotonic()
+        self._next_global = max(self._next_global, now) + self.global_interval
+        if self.chat_rate > 0 and chat_id in self._buckets:
+            self._buckets[chat_id][0] -= 1
+
+    def pause(self, chat_id, retry_after: float):
+        until = time.monotonic() + retry_after
+        self._paused_until[chat_id] = max(self._paused_until.get(chat_id, 0.0), until)
+        # Флуд-контроль у Telegram бывает глобальным: притормаживаем и общий поток
+        self._global_paused_until = max(self._global_paused_until, until)
+
+
 class BotSender:
-    def __init__(self):
-        self.token = Config.BOT_TOKEN
-        self.base_url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+    """Отправка через Bot API: своя очередь на каждый чат, чаты обслуживаются параллельно —
+    не больше BOT_POOL_SIZE запросов одновременно, общий лимит BOT_GLOBAL_RATE на всех.
+    Чат, ждущий своего лимита, не задерживает остальные.
+
+    Отправитель чата делает по одной попытке на запрос: после 429/5xx запрос возвращается
+    в очередь через паузу (backoff или retry_after), а отправитель берёт следующий.
+    """
+
+    def __init__(self, token: str = None):
+        self.token = token or Config.BOT_TOKEN
+        self.base_url = f"{Config.BOT_API_URL.rstrip('/')}/bot{self.token}"
+
+        self.limiter = RateLimiter(
+            global_rate=Config.BOT_GLOBAL_RATE,
+            chat_rate=Config.BOT_CHAT_RATE,
+            chat_burst=Config.BOT_CHAT_BURST
+        )
+        self.session = None
+        # {chat_id: deque} и {chat_id: task}: отправитель чата живёт, пока у чата есть сообщения
+        self._queues = {}
+        self._workers = {}
+        # Запросы, ждущие повтора вне очереди
+        self._retries = set()
+        self._slots = asyncio.Semaphore(Config.BOT_POOL_SIZE)
+
+    async def start(self):
+        """Открывает постоянную сессию (keep-alive); отправители чатов запускаются по мере сообщений"""
+        if self.session is not None:
+            return
+        connector = aiohttp.TCPConnector(limit=Config.BOT_POOL_SIZE, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+        logger.info("BotSender запущен (пул соединений + очереди отправки по чатам).")
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values()) + len(self._retries)
+
+    async def close(self):
+        """Дожидается отправки очередей (и отложенных повторов) и закрывает сессию"""
+        if self.session is None:
+            return
+        deadline = time.monotonic() + 30
+        # Повтор может запустить нового отправителя чата — ждём, пока не останется ни тех, ни других
+        while self._workers or self._retries:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                logger.warning("Очередь отправки не опустела за 30 сек, закрываю принудительно.")
+                break
+            await asyncio.wait([*self._workers.values(), *self._retries], timeout=timeout)
+        tasks = [*self._workers.values(), *self._retries]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.session.close()
+        self.session = None
+        logger.info("BotSender остановлен.")
 
     def _strip_html(self, text):
         """Удаляет все HTML теги из текста"""
         return re.sub(r'<[^>]*>', '', text)
 
+    def _build_markup(self, buttons: list):
+        inline_kb = []
+        for b_text, b_val in buttons:
+            kb_item = {"text": b_text}
+            if b_val.startswith("http"):
+                kb_item["url"] = b_val
+            else:
+                kb_item["callback_data"] = b_val
+            inline_kb.append(kb_item)
+        return {"inline_keyboard": [inline_kb]}
+
     async def send_message(self, chat_id: int, text: str, buttons: list = None):
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "chat_id": chat_id,
-                "text": text,
-                "parse_mode": "HTML",
-                "disable_web_page_preview": True
-            }
-
-            if buttons:
-                inline_kb = []
-                for b_text, b_val in buttons:
-                    kb_item = {"text": b_text}
-                    if b_val.startswith("http"):
-                        kb_item["url"] = b_val
-                    else:
-                        kb_item["callback_data"] = b_val
-                    inline_kb.append(kb_item)
-                payload["reply_markup"] = {"inline_keyboard": [inline_kb]}
-
-            async with session.post(self.base_url, json=payload) as resp:
-                status = resp.status
-                body = await resp.text()
-
-                # Если ошибка в HTML тегах (код 400 и специфичное сообщение)
-                if status == 400 and "can't parse entities" in body:
-                    logger.warning("Ошибка HTML парсинга. Пробую отправить plain text...")
-                    
-                    # ФАЛЛБЕК: Чистим текст от тегов и экранируем
-                    clean_text = self._strip_html(text)
-                    payload["text"] = html.escape(clean_text)
-                    payload["parse_mode"] = "HTML" # Теперь это безопасно, так как всё экранировано
-                    
-                    async with session.post(self.base_url, json=payload) as retry_resp:
-                        if retry_resp.status != 200:
-                            logger.error(f"Фаллбек тоже не удался: {await retry_resp.text()}")
-                
-                elif status != 200:
-                    logger.error(f"Ошибка Bot API (Status {status}): {body}")
\ No newline at end of file
+        """Ставит сообщение в очередь и ждёт отправки. Возвращает result от Bot API или None"""
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": True
+        }
+        if buttons:
+            payload["reply_markup"] = self._build_markup(buttons)
+
+        return await self._enqueue("sendMessage", payload)
+
+    async def edit_message(self, chat_id: int, message_id: int, text: str, buttons: list = None):
+        """Редактирует ранее отправленное сообщение (через ту же очередь и лимиты)"""
+        payload = {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "text": text,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": True
+        }
+        if buttons:
+            payload["reply_markup"] = self._build_markup(buttons)
+
+        return await self._enqueue("editMessageText", payload)
+
+    async def _enqueue(self, method: str, payload: dict):
+        if self.session is None:
+            await self.start()
+        with metrics.timer("send"):
+            return await self._call(method, payload)
+
+    def _put(self, item: list):
+        chat_id = item[1].get("chat_id")
+        self._queues.setdefault(chat_id, deque()).append(item)
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._send_loop(chat_id))
+
+    async def _send_loop(self, chat_id):
+        """Отправитель одного чата: по одной попытке на запрос, пока очередь чата не опустеет"""
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                item = queue.popleft()
+                future = item[2]
+                if future.done():
+                    # Вызывающий уже не ждёт (отменён)
+                    continue
+                token = trace_id.set(item[3])
+                try:
+                    await self._send_once(item)
+                except BaseException:
+                    _resolve(future, None)
+                    raise
+                finally:
+                    trace_id.reset(token)
+        finally:
+            # Без await между проверкой и удалением: новое сообщение запустит нового отправителя
+            del self._queues[chat_id]
+            del self._workers[chat_id]
+            for item in queue:
+                _resolve(item[2], None)
+
+    async def _send_once(self, item: list):
+        """Одна попытка: ответ — в future; после 429/5xx — повтор через паузу; не вышло — None"""
+        method, payload, future, _, attempt, deadline_at = item
+        p = policy(f"bot.{method}", attempts=Config.BOT_RETRY_ATTEMPTS, deadline=Config.BOT_SEND_DEADLINE)
+        started = time.monotonic()
+        try:
+            p.breaker.allow()
+            response = await self._attempt(method, payload)
+        except CircuitOpenError as e:
+            logger.warning(f"Bot API {method}: пропуск, {e}")
+        except Exception as e:
+            delay = p.failed(e, attempt, deadline_at)
+            if delay is not None:
+                item[4] += 1
+                task = asyncio.create_task(self._retry_later(delay, item))
+                self._retries.add(task)
+                task.add_done_callback(self._retries.discard)
+                return
+            logger.error(f"Ошибка Bot API {method} после повторов: {e!r}")
+        else:
+            p.succeeded(started)
+            _resolve(future, response)
+            return
+        _resolve(future, None)
+
+    async def _retry_later(self, delay: float, item: list):
+        """Пауза перед повтором — вне очереди чата: остальные сообщения уходят без задержки"""
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            _resolve(item[2], None)
+            raise
+        self._put(item)
+
+    async def _post(self, method: str, payload: dict):
+        """Один запрос с учётом лимитов. Возвращает (status, json)"""
+        chat_id = payload.get("chat_id")
+        while True:
+            wait = self.limiter.delay(chat_id)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        self.limiter.consume(chat_id)
+
+        # Слот пула — только на сам запрос: ожидание лимитов и пауз между повторами его не держит
+        async with self._slots, self.session.post(f"{self.base_url}/{method}", json=payload) as resp:
+            try:
+                body = await resp.json(content_type=None)
+            except ValueError:
+                body = {"ok": False, "description": await resp.text()}
+            metrics.inc("bot_api_requests_total", help_text="Запросы к Bot API по методу и HTTP-статусу",
+                        method=method, status=resp.status)
+            return resp.status, body
+
+    async def _attempt(self, method: str, payload: dict):
+        """Один запрос; 429/5xx превращаются в TransientError для повтора"""
+        status, body = await self._post(method, payload)
+        if status in RETRY_STATUSES:
+            retry_after = (body.get("parameters") or {}).get("retry_after")
+            if status == 429:
+                # Флуд-контроль: ждём сколько попросил Telegram (и притормаживаем остальных)
+                logger.warning(f"Bot API 429: пауза {retry_after} сек.")
+                self.limiter.pause(payload.get("chat_id"), retry_after or 1)
+            raise TransientError(status, str(body.get("description", "")), retry_after)
+        return status, body
+
+    async def _resilient_post(self, method: str, payload: dict):
+        """Запрос через очередь чата с повторами (backoff, retry_after), дедлайном и breaker'ом на метод.
+        Возвращает (status, json) или None, если отправить так и не удалось"""
+        future = asyncio.get_running_loop().create_future()
+        # [method, payload, future, trace, номер попытки, дедлайн повторов]
+        self._put([method, payload, future, trace_id.get(), 0, time.monotonic() + Config.BOT_SEND_DEADLINE])
+        return await future
+
+    async def _call(self, method: str, payload: dict):
+        response = await self._resilient_post(method, payload)
+        if response is None:
+            return None
+        status, body = response
+
+        # Если ошибка в HTML тегах (код 400 и специфичное сообщение)
+        if status == 400 and "can't parse entities" in str(body.get("description", "")):
+            logger.warning("Ошибка HTML парсинга. Пробую отправить plain text...")
+
+            # ФАЛЛБЕК: Чистим текст от тегов и экранируем
+            clean_text = self._strip_html(payload["text"])
+            payload = dict(payload, text=html.escape(clean_text))
+            # parse_mode остаётся HTML — теперь это безопасно, так как всё экранировано
+
+            response = await self._resilient_post(method, payload)
+            if response is None or response[0] != 200:
+                logger.error(f"Фаллбек тоже не удался: {response[1] if response else None}")
+                return None
+            status, body = response
+
+        elif status == 400 and "message is not modified" in str(body.get("description", "")):
+            # Правка совпала с текущим текстом — это не ошибка
+            return True
+
+        elif status != 200:
+            logger.error(f"Ошибка Bot API (Status {status}): {body}")
+            return None
+
+        return body.get("result")
@@ -1,16 +1,20 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
 
+# Значения читаются из окружения при импорте; .env загружает точка входа (main.py) до импорта src
 class Config:
     API_ID = int(os.getenv("API_ID", 0))
     API_HASH = os.getenv("API_HASH")
     SESSION_NAME = os.getenv("SESSION_NAME", "voice_transcriber")
     
     MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
+    # Пусто — официальный API; можно указать локальный фейковый сервер
+    MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL") or None
     MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "voxtral-mini-latest")
     MISTRAL_AUDIO_MODEL = os.getenv("MISTRAL_AUDIO_MODEL", "voxtral-mini-2602")
+    # Сколько запросов к Mistral выполняется одновременно (общий пул соединений)
+    MISTRAL_CONCURRENCY = int(os.getenv("MISTRAL_CONCURRENCY", 8))
+    MISTRAL_TIMEOUT = float(os.getenv("MISTRAL_TIMEOUT", 300))
     
     TARGET_LANGUAGE = os.getenv("TARGET_LANGUAGE", "Русский")
     SYSTEM_PROMPT = os.getenv("SYSTEM_PROMPT")
@@ -18,4 +22,95 @@ class Config:
 
     BOT_TOKEN = os.getenv("BOT_TOKEN")
     TRIGGER_EMOJI = os.getenv("TRIGGER_EMOJI", "✍")
-    
\ No newline at end of file
+    # Одинаковые правки одного сообщения в пределах окна (сек) считаются дублями
+    REACTION_DEDUP_WINDOW = float(os.getenv("REACTION_DEDUP_WINDOW", 5))
+
+    # Bot API: адрес (можно указать локальный фейковый сервер) и лимиты отправки
+    BOT_API_URL = os.getenv("BOT_API_URL", "https://api.telegram.org")
+    BOT_GLOBAL_RATE = float(os.getenv("BOT_GLOBAL_RATE", 30))
+    BOT_CHAT_RATE = float(os.getenv("BOT_CHAT_RATE", 1))
+    BOT_CHAT_BURST = int(os.getenv("BOT_CHAT_BURST", 3))
+    BOT_POOL_SIZE = int(os.getenv("BOT_POOL_SIZE", 10))
+
+    # Prometheus-метрики (/metrics). 0 — сервер не запускается
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+
+    # Локальные данные (кэши, базы). В docker-compose каталог проекта смонтирован в /app
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+    TRANSCRIPTION_CACHE_TTL = float(os.getenv("TRANSCRIPTION_CACHE_TTL", 30 * 24 * 3600))
+    TRANSCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_ENTRIES", 5000))
+    DATA_CACHE_MAX_ITEMS = int(os.getenv("DATA_CACHE_MAX_ITEMS", 500))
+    DATA_CACHE_TTL = float(os.getenv("DATA_CACHE_TTL", 7 * 24 * 3600))
+    DATA_CACHE_FLUSH_INTERVAL = float(os.getenv("DATA_CACHE_FLUSH_INTERVAL", 5))
+
+    # Кэш названий чатов и имён отправителей (экономит get_chat/get_sender на каждую задачу)
+    ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", 3600))
+    ENTITY_CACHE_MAX_ITEMS = int(os.getenv("ENTITY_CACHE_MAX_ITEMS", 5000))
+
+    # Скачивание медиа: размер чанка iter_download и порог сброса во временный файл
+    DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", 512 * 1024))
+    SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", 2 * 1024 * 1024))
+    TMP_DIR = os.getenv("TMP_DIR") or None
+
+    # Планировщик: воркеры по стадиям, размер очередей и время на завершение при остановке
+    SCHED_JOB_WORKERS = int(os.getenv("SCHED_JOB_WORKERS", 16))
+    SCHED_DOWNLOAD_WORKERS = int(os.getenv("SCHED_DOWNLOAD_WORKERS", 3))
+    SCHED_TRANSCRIBE_WORKERS = int(os.getenv("SCHED_TRANSCRIBE_WORKERS", 4))
+    SCHED_FIX_WORKERS = int(os.getenv("SCHED_FIX_WORKERS", 4))
+    SCHED_SUMMARY_WORKERS = int(os.getenv("SCHED_SUMMARY_WORKERS", 2))
+    SCHED_QUEUE_SIZE = int(os.getenv("SCHED_QUEUE_SIZE", 100))
+    SCHED_DRAIN_TIMEOUT = float(os.getenv("SCHED_DRAIN_TIMEOUT", 60))
+
+    # Длинные записи: порог (сек), длина куска, перекрытие, параллельность и повторы на кусок
+    LONG_AUDIO_THRESHOLD = float(os.getenv("LONG_AUDIO_THRESHOLD", 300))
+    LONG_AUDIO_SEGMENT = float(os.getenv("LONG_AUDIO_SEGMENT", 120))
+    LONG_AUDIO_OVERLAP = float(os.getenv("LONG_AUDIO_OVERLAP", 2))
+    LONG_AUDIO_FANOUT = int(os.getenv("LONG_AUDIO_FANOUT", 4))
+    LONG_AUDIO_RETRIES = int(os.getenv("LONG_AUDIO_RETRIES", 1))
+
+    # Постепенная доставка длинных транскрипций: правка сообщения не чаще раза в N секунд
+    PROGRESSIVE_DELIVERY = os.getenv("PROGRESSIVE_DELIVERY", "true").lower() in ("1", "true", "yes")
+    PROGRESS_EDIT_INTERVAL = float(os.getenv("PROGRESS_EDIT_INTERVAL", 3))
+
+    # Пакетный режим (/batch в чате бота): сколько последних сообщений смотреть и сколько
+    # записей обрабатывать одновременно
+    BATCH_SCAN_LIMIT = int(os.getenv("BATCH_SCAN_LIMIT", 200))
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+
+    # Саммари: больше SUMMARY_SINGLE_CALL_TOKENS (оценка) — map-reduce кусками по SUMMARY_CHUNK_TOKENS
+    SUMMARY_SINGLE_CALL_TOKENS = int(os.getenv("SUMMARY_SINGLE_CALL_TOKENS", 8000))
+    SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 4000))
+    SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", 30 * 24 * 3600))
+
+    # Правка пунктуации: кэш результатов по нормализованному тексту (записей в памяти)
+    FIX_CACHE_MAX_ITEMS = int(os.getenv("FIX_CACHE_MAX_ITEMS", 1000))
+
+    # Повторы внешних запросов (429/5xx/сеть): попытки, задержки backoff (сек) и circuit breaker
+    RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", 3))
+    RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 0.5))
+    RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 10))
+    BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 5))
+    BREAKER_RESET = float(os.getenv("BREAKER_RESET", 30))
+    # Общий дедлайн вызова со всеми повторами (сек)
+    MISTRAL_CHAT_DEADLINE = float(os.getenv("MISTRAL_CHAT_DEADLINE", 120))
+    MISTRAL_TRANSCRIBE_DEADLINE = float(os.getenv("MISTRAL_TRANSCRIBE_DEADLINE", 600))
+    BOT_SEND_DEADLINE = float(os.getenv("BOT_SEND_DEADLINE", 90))
+    BOT_RETRY_ATTEMPTS = int(os.getenv("BOT_RETRY_ATTEMPTS", 5))
+    # Дубль запроса транскрипции, если он идёт дольше p95 (нужно HEDGE_MIN_SAMPLES замеров)
+    HEDGE_TRANSCRIBE = os.getenv("HEDGE_TRANSCRIBE", "false").lower() in ("1", "true", "yes")
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+
+    # Журнал задач: компактизация каждые N завершённых и предел повторов после рестартов
+    JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", 50))
+    JOURNAL_MAX_REPLAYS = int(os.getenv("JOURNAL_MAX_REPLAYS", 3))
+    
+    # Несколько аккаунтов: по файлу <имя>.env на аккаунт (нет файлов — один аккаунт из .env)
+    ACCOUNTS_DIR = os.getenv("ACCOUNTS_DIR", "accounts")
+    # Очередь задач между ingest и воркерами: memory://, sqlite:///путь или redis://хост:порт/0
+    # (воркеры — только на машине ingest: общие DATA_DIR и ключ авторизации)
+    QUEUE_URL = os.getenv("QUEUE_URL", "memory://")
+    # Через сколько секунд задача, взятая воркером без подтверждения, выдаётся снова
+    QUEUE_LEASE = float(os.getenv("QUEUE_LEASE", 1800))
+    # Сколько раз SQLite-очередь выдаёт задачу, прежде чем отбросить её как неисполнимую
+    QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", 5))
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("DataCache")
+
+
+class CacheEntry:
+    """Данные для кнопок: текст транскрипции/правки, ссылка и (для правки) куда применять"""
+    __slots__ = ("text", "link", "peer", "msg_id", "created")
+
+    def __init__(self, text: str, link: str = None, peer: int = None, msg_id: int = None, created: float = None):
+        self.text = text
+        self.link = link
+        # peer хранится как marked id (utils.get_peer_id), чтобы переживать рестарт
+        self.peer = peer
+        self.msg_id = msg_id
+        self.created = created if created is not None else time.time()
+
+
+class DataCache:
+    """Ограниченный LRU + TTL кэш в памяти с отложенной записью в SQLite.
+
+    В памяти держится не больше max_items записей; всё остальное читается из базы
+    только при нажатии кнопки, поэтому кнопки работают и после перезапуска.
+    """
+
+    def __init__(self, path: str = None, max_items: int = None, ttl: float = None, flush_interval: float = None):
+        self.path = path or os.path.join(Config.DATA_DIR, "data_cache.sqlite3")
+        self.max_items = max_items if max_items is not None else Config.DATA_CACHE_MAX_ITEMS
+        self.ttl = ttl if ttl is not None else Config.DATA_CACHE_TTL
+        self.flush_interval = flush_interval if flush_interval is not None else Config.DATA_CACHE_FLUSH_INTERVAL
+
+        self._memory = OrderedDict()
+        # Очередь записи: {item_id: CacheEntry | None (удаление)}
+        self._pending = {}
+        self._flusher = None
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "id TEXT PRIMARY KEY, text TEXT NOT NULL, link TEXT, peer INTEGER, msg_id INTEGER, created REAL NOT NULL)"
+        )
+        self.db.commit()
+        self._purge_expired()
+
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        self.flush()
+        self.db.close()
+
+    def put(self, item_id: str, entry: CacheEntry):
+        self._remember(item_id, entry)
+        self._pending[item_id] = entry
+
+    def get(self, item_id: str):
+        entry = self._memory.get(item_id)
+        if entry is None:
+            # Вытесненная из памяти запись: ещё не записана или уже в базе
+            if item_id in self._pending:
+                entry = self._pending[item_id]
+            else:
+                entry = self._load(item_id)
+            if entry is None:
+                return None
+            self._remember(item_id, entry)
+
+        if self._expired(entry):
+            self.delete(item_id)
+            return None
+        self._memory.move_to_end(item_id)
+        return entry
+
+    def delete(self, item_id: str):
+        self._memory.pop(item_id, None)
+        self._pending[item_id] = None
+
+    def _remember(self, item_id: str, entry: CacheEntry):
+        self._memory[item_id] = entry
+        self._memory.move_to_end(item_id)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _expired(self, entry: CacheEntry) -> bool:
+        return bool(self.ttl) and time.time() - entry.created > self.ttl
+
+    def _load(self, item_id: str):
+        row = self.db.execute(
+            "SELECT text, link, peer, msg_id, created FROM items WHERE id = ?", (item_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(*row)
+
+    def flush(self):
+        """Сбрасывает накопленные изменения в SQLite одной транзакцией"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        upserts = [
+            (k, e.text, e.link, e.peer, e.msg_id, e.created)
+            for k, e in pending.items() if e is not None
+        ]
+        deletes = [(k,) for k, e in pending.items() if e is None]
+        with self.db:
+            if upserts:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO items (id, text, link, peer, msg_id, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    upserts
+                )
+            if deletes:
+                self.db.executemany("DELETE FROM items WHERE id = ?", deletes)
+
+    def _purge_expired(self):
+        if self.ttl:
+            with self.db:
+                self.db.execute("DELETE FROM items WHERE created < ?", (time.time() - self.ttl,))
+
+    async def _flush_loop(self):
+        ticks = 0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+                ticks += 1
+                if ticks % 100 == 0:
+                    self._purge_expired()
+            except Exception as e:
+                logger.error(f"Ошибка записи кэша в SQLite: {e}")
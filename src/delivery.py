@@ -0,0 +1,110 @@
+import asyncio
+import time
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("Delivery")
+
+PROGRESS_MARK = "\n\n⏳ <i>Транскрибирую...</i>"
+
+
+def split_message(header: str, safe_text: str, max_len: int) -> list:
+    """Разбивка на части если текст длинный: заголовок только в первой части"""
+    parts = []
+    if len(header + safe_text) <= max_len:
+        parts.append(header + safe_text)
+    else:
+        first_part_limit = max_len - len(header)
+        parts.append(header + safe_text[:first_part_limit])
+        remaining = safe_text[first_part_limit:]
+        for i in range(0, len(remaining), max_len):
+            parts.append(remaining[i : i + max_len])
+    return parts
+
+
+class ProgressiveMessage:
+    """Постепенная доставка транскрипции в чат бота.
+
+    Сразу отправляет заглушку, затем редактирует её по мере готовности кусков
+    (и досылает продолжения сверх max_len). Правки объединяются: не чаще одной
+    за PROGRESS_EDIT_INTERVAL секунд, в работу идёт только самый свежий текст.
+    """
+
+    def __init__(self, sender, chat_id: int, header: str, max_len: int, interval: float = None):
+        self.sender = sender
+        self.chat_id = chat_id
+        self.header = header
+        self.max_len = max_len
+        self.interval = interval if interval is not None else Config.PROGRESS_EDIT_INTERVAL
+
+        # [(message_id, отправленный текст)]
+        self.messages = []
+        self._latest = None
+        self._last_flush = 0.0
+        self._flush_task = None
+        self._sleeping = False
+        self._finished = False
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        await self._render([self.header + PROGRESS_MARK.lstrip("\n")])
+
+    def update(self, safe_text: str):
+        """Новый частичный текст (уже HTML-экранированный). Отправка — отложенно"""
+        self._latest = safe_text
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        while True:
+            wait = self._last_flush + self.interval - time.monotonic()
+            self._sleeping = True
+            try:
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            finally:
+                self._sleeping = False
+            if self._finished:
+                return
+            text = self._latest
+            parts = split_message(self.header, text, self.max_len - len(PROGRESS_MARK))
+            parts[-1] += PROGRESS_MARK
+            await self._render(parts)
+            # Пока шла правка, мог прийти текст новее — отправим и его
+            if self._latest is text:
+                return
+
+    async def finish(self, safe_text: str, buttons: list = None) -> bool:
+        """Итоговый текст; кнопки цепляются к последней части. False — доставить не удалось"""
+        self._finished = True
+        if self._flush_task and not self._flush_task.done():
+            # Ждущую правку отменяем; уже идущую — дожидаемся, чтобы не потерять message_id
+            if self._sleeping:
+                self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        return await self._render(split_message(self.header, safe_text, self.max_len), buttons)
+
+    async def _render(self, parts: list, buttons: list = None) -> bool:
+        async with self._lock:
+            self._last_flush = time.monotonic()
+            for i, part in enumerate(parts):
+                is_last = (i == len(parts) - 1)
+                btns = buttons if is_last else None
+                if i < len(self.messages):
+                    message_id, sent = self.messages[i]
+                    if sent == part and not btns:
+                        continue
+                    if not await self.sender.edit_message(self.chat_id, message_id, part, buttons=btns):
+                        logger.error(f"Не удалось обновить часть {i + 1}")
+                        return False
+                    self.messages[i] = (message_id, part)
+                else:
+                    result = await self.sender.send_message(self.chat_id, part, buttons=btns)
+                    if not result:
+                        logger.error(f"Не удалось отправить часть {i + 1}")
+                        return False
+                    self.messages.append((result["message_id"], part))
+            return True
@@ -0,0 +1,147 @@
+"""Запуск по ролям: всё в одном процессе (all), приём апдейтов (ingest) и воркеры (worker).
+
+    python main.py                                                  # как раньше: один процесс
+    python main.py --role ingest --queue sqlite:///data/queue.sqlite3
+    python main.py --role worker --queue sqlite:///data/queue.sqlite3 --procs 4
+
+Ingest держит MTProto-соединения, кнопки и /batch, а задачи реакций кладёт в общую очередь;
+воркеры-процессы скачивают, транскрибируют и отправляют результат.
+
+Только одна машина: воркеры и ingest делят каталог DATA_DIR (данные кнопок из data_cache.sqlite3)
+и ключ авторизации из файла сессии. Один ключ с разных IP Telegram отзывает (AuthKeyDuplicatedError),
+поэтому redis:// — лишь альтернатива sqlite:// на той же машине, а не способ вынести воркеры.
+
+Проверка без сети (фейковые Telegram, Bot API и Mistral, убитый воркер): tests/test_deployment.py
+"""
+import asyncio
+import multiprocessing
+import signal
+import time
+from urllib.parse import urlsplit
+from .accounts import load_accounts
+from .ai_client import AIClient
+from .config import Config
+from .job_queue import open_queue, consume
+from .logger import setup_logger
+from .userbot import Userbot
+
+logger = setup_logger("Deployment")
+
+ROLES = ("all", "ingest", "worker")
+
+
+async def run(role: str = "all", queue_url: str = None, accounts: list = None, metrics_port: int = None,
+              started_at: float = None):
+    """started_at — time.monotonic() запуска процесса (для замера времени до готовности)"""
+    accounts = accounts or load_accounts()
+    queue_url = queue_url or Config.QUEUE_URL
+    local = queue_url.startswith("memory://")
+    if role != "all" and local:
+        raise ValueError("Для раздельных ingest и worker нужна общая очередь: sqlite:///... или redis://...")
+    if role == "worker" and not _local_queue_host(queue_url):
+        logger.warning("Очередь на другой машине: воркер должен работать там же, где ingest "
+                       "(общие DATA_DIR и ключ авторизации)")
+
+    # memory:// — у каждого аккаунта своя очередь внутри Userbot; иначе одна общая на процесс
+    shared = None if local else open_queue(queue_url)
+    # Клиент Mistral (пул соединений и лимит параллельности) и сервер метрик — одни на процесс
+    ai = AIClient()
+    bots = {
+        a.name: Userbot(account=a, queue=shared, role=role, metrics_port=metrics_port if i == 0 else 0, ai=ai)
+        for i, a in enumerate(accounts)
+    }
+    logger.info(f"Роль {role}, аккаунты: {', '.join(bots)}, очередь: {queue_url}")
+
+    started = []
+    work = asyncio.ensure_future(_serve(role, bots, shared, started, started_at))
+    terminated = False
+
+    def _terminate():
+        nonlocal terminated
+        logger.info("Получен SIGTERM, останавливаюсь...")
+        terminated = True
+        work.cancel()
+
+    # docker stop шлёт SIGTERM: отменяем работу, как при Ctrl+C, — finally-блоки закрывают сервисы
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, _terminate)
+    except (NotImplementedError, RuntimeError):
+        # Windows или не главный поток: остаётся только Ctrl+C
+        pass
+    try:
+        await work
+    except asyncio.CancelledError:
+        if not terminated:
+            raise
+    finally:
+        for bot in started:
+            await bot.stop_services()
+        for bot in bots.values():
+            await bot.client.disconnect()
+        await ai.close()
+        if shared:
+            await shared.close()
+
+
+async def _serve(role: str, bots: dict, shared, started: list, started_at: float):
+    """Работа роли до отключения или отмены; started — воркеры, чьи сервисы закрывает run"""
+    if role == "worker":
+        for bot in bots.values():
+            await bot.connect()
+            started.append(bot)
+            bot.mark_ready(started_at)
+        await consume(shared, bots)
+    else:
+        # Userbot.start сам закрывает свои сервисы после отключения клиента
+        tasks = [bot.start(started_at) for bot in bots.values()]
+        if shared and role == "all":
+            tasks.append(consume(shared, bots))
+        await asyncio.gather(*tasks)
+
+
+def _local_queue_host(queue_url: str) -> bool:
+    host = urlsplit(queue_url).hostname
+    return host is None or host in ("localhost", "127.0.0.1", "::1")
+
+
+def _worker_process(queue_url: str, metrics_port: int):
+    started_at = time.monotonic()
+    try:
+        asyncio.run(run("worker", queue_url, metrics_port=metrics_port, started_at=started_at))
+    except KeyboardInterrupt:
+        pass
+
+
+def _worker_metrics_port(i: int) -> int:
+    # METRICS_PORT занят ingest, воркеры — на следующих портах; 0 — метрики выключены
+    return Config.METRICS_PORT + 1 + i if Config.METRICS_PORT else 0
+
+
+def run_workers(procs: int, queue_url: str = None, started_at: float = None):
+    """procs процессов-воркеров; у каждого свой порт метрик (METRICS_PORT + 1 + номер)"""
+    queue_url = queue_url or Config.QUEUE_URL
+    if procs <= 1:
+        asyncio.run(run("worker", queue_url, metrics_port=_worker_metrics_port(0), started_at=started_at))
+        return
+
+    # spawn, а не fork: у каждого воркера свои event loop, соединения и SQLite-подключения
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(
+            target=_worker_process, name=f"worker-{i}",
+            args=(queue_url, _worker_metrics_port(i))
+        )
+        for i in range(procs)
+    ]
+    for p in processes:
+        p.start()
+    # SIGTERM (docker stop) приходит только главному процессу — передаём воркерам, они завершаются сами
+    signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in processes if p.is_alive()])
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        # Ctrl+C получает вся группа процессов; ждём, пока воркеры допишут начатое
+        for p in processes:
+            p.join()
@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from telethon import types, utils
+from .config import Config
+
+
+def _link_prefix(entity) -> str:
+    """Префикс ссылки на сообщение: https://t.me/<username>/ или https://t.me/c/<id>/"""
+    try:
+        if getattr(entity, 'username', None):
+            return f"https://t.me/{entity.username}/"
+        cid = str(entity.id).replace("-100", "")
+        return f"https://t.me/c/{cid}/"
+    except Exception:
+        return None
+
+
+class EntityInfo:
+    """То, что нужно задаче от чата/отправителя: название, имя, username и префикс ссылки"""
+    __slots__ = ("title", "name", "username", "link_prefix", "expires")
+
+    def __init__(self, entity, expires: float):
+        self.title = getattr(entity, 'title', None)
+        self.name = utils.get_display_name(entity)
+        self.username = getattr(entity, 'username', None)
+        self.link_prefix = _link_prefix(entity)
+        self.expires = expires
+
+    def link(self, msg_id: int):
+        return f"{self.link_prefix}{msg_id}" if self.link_prefix else None
+
+
+class EntityCache:
+    """LRU + TTL кэш EntityInfo по marked peer id (utils.get_peer_id).
+
+    Наполняется сущностями, пришедшими вместе с апдейтами (update._entities),
+    а при промахе — через переданный fetch (m.get_chat / m.get_sender).
+    Апдейты о смене имени/названия сбрасывают запись.
+    """
+
+    def __init__(self, ttl: float = None, max_items: int = None):
+        self.ttl = ttl if ttl is not None else Config.ENTITY_CACHE_TTL
+        self.max_items = max_items if max_items is not None else Config.ENTITY_CACHE_MAX_ITEMS
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def absorb(self, entities: dict):
+        """Сущности из апдейта: {marked peer id: User | Chat | Channel}"""
+        if not entities:
+            return
+        expires = time.monotonic() + self.ttl
+        for peer_id, entity in entities.items():
+            # min-сущности приходят урезанными (без username и т.п.) — не затираем ими полные
+            if getattr(entity, 'min', False) and peer_id in self._items:
+                continue
+            self._store(peer_id, EntityInfo(entity, expires))
+
+    def on_update(self, update):
+        """Сбрасывает запись при UpdateUserName / UpdateChannel / UpdateChat"""
+        if isinstance(update, types.UpdateUserName):
+            peer_id = update.user_id
+        elif isinstance(update, types.UpdateChannel):
+            peer_id = utils.get_peer_id(types.PeerChannel(update.channel_id))
+        elif isinstance(update, types.UpdateChat):
+            peer_id = utils.get_peer_id(types.PeerChat(update.chat_id))
+        else:
+            return
+        self._items.pop(peer_id, None)
+
+    async def get(self, peer_id: int, fetch):
+        """EntityInfo для peer_id; при промахе await fetch() -> сущность (или None)"""
+        if peer_id is None:
+            return None
+        info = self._items.get(peer_id)
+        if info is not None and info.expires > time.monotonic():
+            self._items.move_to_end(peer_id)
+            self.hits += 1
+            return info
+
+        self.misses += 1
+        entity = await fetch()
+        if entity is None:
+            return None
+        info = EntityInfo(entity, time.monotonic() + self.ttl)
+        self._store(peer_id, info)
+        return info
+
+    def _store(self, peer_id: int, info: EntityInfo):
+        self._items[peer_id] = info
+        self._items.move_to_end(peer_id)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._items)
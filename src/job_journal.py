@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("JobJournal")
+
+QUEUED, DOWNLOADED, TRANSCRIBED, SENT, FAILED = "queued", "downloaded", "transcribed", "sent", "failed"
+_FINAL = (SENT, FAILED)
+
+
+class JournalJob:
+    """Незавершённая задача из журнала: последняя стадия и накопленные артефакты"""
+    __slots__ = ("id", "peer", "msg_id", "priority", "stage", "media_path", "text", "replays")
+
+    def __init__(self, id: str, peer: int = None, msg_id: int = None, priority: int = 0):
+        self.id = id
+        self.peer = peer
+        self.msg_id = msg_id
+        self.priority = priority
+        self.stage = QUEUED
+        # Скачанный файл (стадия downloaded) и текст (стадия transcribed)
+        self.media_path = None
+        self.text = None
+        self.replays = 0
+
+
+class JobJournal:
+    """Журнал задач реакций в SQLite (WAL), только дописывание.
+
+    Каждая стадия задачи — отдельная запись: queued -> downloaded -> transcribed -> sent.
+    После перезапуска незавершённые задачи продолжаются с последней стадии. Записи
+    завершённых задач и их артефакты (скачанные файлы) удаляются при компактизации.
+    """
+
+    def __init__(self, path: str = None, compact_every: int = None):
+        self.path = path or os.path.join(Config.DATA_DIR, "jobs.sqlite3")
+        self.artifacts_dir = os.path.join(os.path.dirname(self.path) or ".", "jobs")
+        self.compact_every = compact_every if compact_every is not None else Config.JOURNAL_COMPACT_EVERY
+        self._finished_since_compact = 0
+
+        os.makedirs(self.artifacts_dir, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # Журнал — не кэш: synchronous=NORMAL в WAL не теряет данные при падении процесса
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, stage TEXT NOT NULL, "
+            "data TEXT, ts REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_events_job ON events(job_id)")
+        self.db.commit()
+
+    def _append(self, job_id: str, stage: str, **data):
+        self.db.execute(
+            "INSERT INTO events (job_id, stage, data, ts) VALUES (?, ?, ?, ?)",
+            (job_id, stage, json.dumps(data, ensure_ascii=False) if data else None, time.time())
+        )
+        self.db.commit()
+
+    def queued(self, peer: int, msg_id: int, priority: int = 0) -> JournalJob:
+        job = JournalJob(uuid.uuid4().hex[:12], peer, msg_id, priority)
+        self._append(job.id, QUEUED, peer=peer, msg_id=msg_id, priority=priority)
+        return job
+
+    def downloaded(self, job_id: str, media) -> str:
+        """Сохраняет скачанный файл рядом с журналом, чтобы не качать его заново"""
+        path = os.path.join(self.artifacts_dir, job_id + media.suffix)
+        if media.path:
+            try:
+                os.link(media.path, path)
+            except OSError:
+                shutil.copyfile(media.path, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(media.content())
+        self._append(job_id, DOWNLOADED, path=path, sha256=media.sha256)
+        return path
+
+    def transcribed(self, job_id: str, text: str):
+        self._append(job_id, TRANSCRIBED, text=text)
+
+    def replayed(self, job_id: str):
+        self._append(job_id, "replay")
+
+    def finish(self, job_id: str, ok: bool = True):
+        self._append(job_id, SENT if ok else FAILED)
+        self._finished_since_compact += 1
+        if self._finished_since_compact >= self.compact_every:
+            self.compact()
+
+    def unfinished(self) -> list:
+        """Задачи без sent/failed в порядке постановки"""
+        rows = self.db.execute("SELECT job_id, stage, data FROM events ORDER BY seq").fetchall()
+        return list(self._fold(rows).values())
+
+    def get(self, job_id: str):
+        """Незавершённая задача со стадией и артефактами либо None"""
+        rows = self.db.execute(
+            "SELECT job_id, stage, data FROM events WHERE job_id = ? ORDER BY seq", (job_id,)
+        ).fetchall()
+        return self._fold(rows).get(job_id)
+
+    @staticmethod
+    def _fold(rows) -> dict:
+        jobs = {}
+        for job_id, stage, data in rows:
+            data = json.loads(data) if data else {}
+            if stage == QUEUED:
+                jobs[job_id] = JournalJob(job_id, data["peer"], data["msg_id"], data.get("priority", 0))
+                continue
+            job = jobs.get(job_id)
+            if job is None:
+                continue
+            if stage in _FINAL:
+                del jobs[job_id]
+            elif stage == "replay":
+                job.replays += 1
+            else:
+                job.stage = stage
+                job.media_path = data.get("path", job.media_path)
+                job.text = data.get("text", job.text)
+        return jobs
+
+    def compact(self):
+        """Удаляет записи и артефакты завершённых задач"""
+        done = [row[0] for row in self.db.execute(
+            "SELECT DISTINCT job_id FROM events WHERE stage IN (?, ?)", _FINAL
+        )]
+        for job_id in done:
+            for (data,) in self.db.execute(
+                "SELECT data FROM events WHERE job_id = ? AND stage = ?", (job_id, DOWNLOADED)
+            ).fetchall():
+                path = json.loads(data).get("path")
+                if path and os.path.exists(path):
+                    os.remove(path)
+        with self.db:
+            self.db.executemany("DELETE FROM events WHERE job_id = ?", [(j,) for j in done])
+        self._finished_since_compact = 0
+        if done:
+            logger.info(f"Журнал задач: удалено завершённых {len(done)}")
+
+    def close(self):
+        self.compact()
+        self.db.close()
@@ -0,0 +1,246 @@
+"""Очередь задач между приёмом апдейтов (ingest) и воркерами.
+
+    memory://                     — asyncio-очередь внутри процесса (по умолчанию)
+    sqlite:///data/queue.sqlite3  — общий файл: несколько процессов на одной машине
+    redis://localhost:6379/0      — Redis-совместимый сервер (нужен пакет redis); воркеры
+                                    всё равно на машине ingest — см. src/deployment.py
+
+Задача — dict: account, peer, msg_id, priority, job_id и (необязательно) message/entities —
+сообщение из апдейта и его сущности. Вне процесса они передаются TL-сериализацией Telethon.
+"""
+import asyncio
+import base64
+import itertools
+import json
+import os
+import sqlite3
+import time
+import uuid
+from telethon.extensions import BinaryReader
+from telethon.tl.tlobject import TLObject
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("JobQueue")
+
+# Итоги задач (userbot.JOB_RESULTS), после которых задачу стоит выдать снова
+RETRY_RESULTS = ("undelivered", "error")
+
+
+def _tl_encode(obj) -> str:
+    return base64.b64encode(bytes(obj)).decode()
+
+
+def _tl_decode(data: str):
+    with BinaryReader(base64.b64decode(data)) as reader:
+        return reader.tgread_object()
+
+
+def encode_job(job: dict) -> str:
+    data = {k: v for k, v in job.items() if k not in ("message", "entities")}
+    message = job.get("message")
+    if isinstance(message, TLObject):
+        data["message"] = _tl_encode(message)
+    entities = job.get("entities") or {}
+    data["entities"] = {str(k): _tl_encode(e) for k, e in entities.items() if isinstance(e, TLObject)}
+    return json.dumps(data, ensure_ascii=False)
+
+
+def decode_job(raw: str) -> dict:
+    job = json.loads(raw)
+    if job.get("message"):
+        job["message"] = _tl_decode(job["message"])
+    job["entities"] = {int(k): _tl_decode(v) for k, v in (job.get("entities") or {}).items()}
+    return job
+
+
+class MemoryQueue:
+    """Приоритетная asyncio-очередь: ingest и воркер в одном процессе"""
+
+    def __init__(self, maxsize: int = 0):
+        self._queue = asyncio.PriorityQueue(maxsize=maxsize)
+        self._seq = itertools.count()
+
+    async def put(self, job: dict):
+        await self._queue.put((job.get("priority", 0), next(self._seq), job))
+
+    async def get(self):
+        """-> (receipt, job); receipt передаётся в ack после обработки"""
+        _, _, job = await self._queue.get()
+        return None, job
+
+    async def ack(self, receipt):
+        pass
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def close(self):
+        pass
+
+
+class SQLiteQueue:
+    """Очередь в файле SQLite (WAL) для процессов на одной машине.
+
+    Взятая задача «арендуется» на lease секунд; без ack (воркер упал или не доставил
+    результат) она снова становится доступной — так задачи переживают падение воркера.
+    После max_attempts выдач задача удаляется, чтобы не крутиться вечно.
+    """
+
+    def __init__(self, path: str, lease: float = None, poll_interval: float = 0.2, max_attempts: int = None):
+        self.path = path
+        self.lease = lease if lease is not None else Config.QUEUE_LEASE
+        self.max_attempts = max_attempts if max_attempts is not None else Config.QUEUE_MAX_ATTEMPTS
+        self.poll_interval = poll_interval
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, priority REAL NOT NULL, payload TEXT NOT NULL, "
+            "lease_until REAL NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(lease_until, priority, id)")
+        self.db.commit()
+
+    async def put(self, job: dict):
+        with self.db:
+            self.db.execute(
+                "INSERT INTO jobs (priority, payload) VALUES (?, ?)", (job.get("priority", 0), encode_job(job))
+            )
+
+    async def get(self):
+        while True:
+            now = time.time()
+            with self.db:
+                # Один UPDATE ... RETURNING атомарно забирает задачу у остальных процессов
+                row = self.db.execute(
+                    "UPDATE jobs SET lease_until = ?, attempts = attempts + 1 WHERE id = ("
+                    "SELECT id FROM jobs WHERE lease_until < ? ORDER BY priority, id LIMIT 1"
+                    ") RETURNING id, payload, attempts",
+                    (now + self.lease, now)
+                ).fetchone()
+            if row:
+                job_id, payload, attempts = row
+                if attempts > self.max_attempts:
+                    logger.error(f"Задача {job_id} не выполнена за {self.max_attempts} попыток, удаляю")
+                    await self.ack(job_id)
+                    continue
+                if attempts > 1:
+                    logger.warning(f"Задача {job_id} выдана повторно (попытка {attempts})")
+                return job_id, decode_job(payload)
+            await asyncio.sleep(self.poll_interval)
+
+    async def ack(self, receipt):
+        with self.db:
+            self.db.execute("DELETE FROM jobs WHERE id = ?", (receipt,))
+
+    async def depth(self) -> int:
+        """Задач, ожидающих воркера (без взятых в работу)"""
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE lease_until < ?", (time.time(),)).fetchone()[0]
+
+    async def close(self):
+        self.db.close()
+
+
+class RedisQueue:
+    """Очередь в Redis-совместимом сервере: sorted set по приоритету + hash взятых задач.
+
+    Задачи, взятые упавшим воркером, возвращаются в очередь через lease секунд.
+    """
+
+    def __init__(self, url: str, name: str = "voice_transcriber", lease: float = None):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("Для очереди redis:// нужен пакет redis: pip install redis") from e
+        self.redis = redis.from_url(url)
+        self.key = f"{name}:jobs"
+        self.processing = f"{name}:processing"
+        self.lease = lease if lease is not None else Config.QUEUE_LEASE
+        self._next_recover = 0.0
+
+    async def put(self, job: dict):
+        # Уникальный член с меткой времени: при равном приоритете — FIFO
+        member = f"{time.time_ns():020d}:{uuid.uuid4().hex[:8]}:{encode_job(job)}"
+        await self.redis.zadd(self.key, {member: job.get("priority", 0)})
+
+    async def get(self):
+        while True:
+            if time.monotonic() >= self._next_recover:
+                await self._recover()
+            item = await self.redis.bzpopmin(self.key, timeout=5)
+            if item is None:
+                continue
+            _, member, score = item
+            member = member.decode() if isinstance(member, bytes) else member
+            await self.redis.hset(self.processing, member, json.dumps([time.time(), score]))
+            return member, decode_job(member.split(":", 2)[2])
+
+    async def ack(self, receipt):
+        await self.redis.hdel(self.processing, receipt)
+
+    async def _recover(self):
+        """Возвращает в очередь задачи, взятые больше lease секунд назад"""
+        self._next_recover = time.monotonic() + min(self.lease, 60)
+        now = time.time()
+        for member, value in (await self.redis.hgetall(self.processing)).items():
+            taken, score = json.loads(value)
+            if now - taken > self.lease:
+                if await self.redis.hdel(self.processing, member):
+                    await self.redis.zadd(self.key, {member: score})
+
+    async def depth(self) -> int:
+        return await self.redis.zcard(self.key)
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def open_queue(url: str = None):
+    url = url or Config.QUEUE_URL
+    if url.startswith("memory://"):
+        # Предел как у очередей планировщика: при заторе ingest ждёт, а не копит задачи
+        return MemoryQueue(maxsize=Config.SCHED_QUEUE_SIZE)
+    if url.startswith("sqlite:///"):
+        # Как в SQLAlchemy: sqlite:///rel/path или sqlite:////abs/path
+        return SQLiteQueue(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisQueue(url)
+    raise ValueError(f"Неизвестная очередь: {url}")
+
+
+async def consume(queue, targets: dict, prefetch: int = None):
+    """Раздаёт задачи из очереди: targets — {account: Userbot}. ack — после обработки задачи.
+
+    Задачи с итогом undelivered/error не подтверждаются: по истечении аренды их получит
+    следующий воркер (в memory:// аренды нет, и такая задача не повторяется).
+
+    Берёт не больше prefetch задач сразу: остальное ждёт в очереди и достаётся
+    свободным воркерам, а не копится у одного (и не переживает свою аренду).
+    """
+    slots = asyncio.Semaphore(prefetch or Config.SCHED_JOB_WORKERS)
+    while True:
+        await slots.acquire()
+        receipt, job = await queue.get()
+        target = targets.get(job.get("account"))
+        if target is None:
+            logger.error(f"Задача для неизвестного аккаунта {job.get('account')}, пропускаю")
+            await queue.ack(receipt)
+            slots.release()
+            continue
+
+        future = await target.submit_job(job)
+        if future is None:
+            slots.release()
+            continue
+
+        def _done(f, receipt=receipt):
+            slots.release()
+            # Отменённую при остановке или не доставленную задачу не подтверждаем: её получит следующий воркер
+            if f.cancelled() or f.exception() is not None or f.result() in RETRY_RESULTS:
+                return
+            asyncio.create_task(queue.ack(receipt))
+        future.add_done_callback(_done)
@@ -1,12 +1,21 @@
 import logging
 import sys
+from .tracing import trace_id
+
+
+class _TraceFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
 
 def setup_logger(name: str):
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
     if not logger.handlers:
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - [%(name)s] - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - [%(name)s] [%(trace_id)s] - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
         ch = logging.StreamHandler(sys.stdout)
         ch.setFormatter(formatter)
+        ch.addFilter(_TraceFilter())
         logger.addHandler(ch)
-    return logger
\ No newline at end of file
+    return logger
@@ -0,0 +1,190 @@
+"""Транскрипция длинных записей: нарезка по паузам, параллельные запросы, склейка.
+
+Офлайн-проверка без ffmpeg и Mistral: python -m bench.long_audio_check
+"""
+import asyncio
+import os
+import random
+import re
+from .config import Config
+from .logger import setup_logger
+from .media import cut_segment, detect_silences
+from .resilience import is_retryable
+
+logger = setup_logger("LongAudio")
+
+# Что вставляется на место куска, который так и не удалось распознать
+FAILED_SEGMENT_TEXT = "[…фрагмент не распознан…]"
+
+
+class PartialTranscript(str):
+    """Текст, в котором часть кусков не распознана: показать можно, кэшировать и журналировать — нет"""
+
+    def __new__(cls, text: str, failed: int, total: int):
+        obj = super().__new__(cls, text)
+        obj.failed = failed
+        obj.total = total
+        return obj
+
+
+class Segment:
+    __slots__ = ("index", "start", "end")
+
+    def __init__(self, index: int, start: float, end: float):
+        self.index = index
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Segment({self.index}, {self.start:.1f}-{self.end:.1f})"
+
+
+def plan_segments(duration: float, silences: list, target: float, overlap: float, search: float = None) -> list:
+    """Разбивает запись на куски ~target секунд.
+
+    Разрез ставится в середину ближайшей паузы в окне ±search от идеальной точки;
+    если паузы нет — режем по времени. Каждый кусок расширяется на overlap
+    в обе стороны, чтобы слово на границе целиком попало хотя бы в один кусок.
+    """
+    search = search if search is not None else target * 0.25
+    mids = sorted((s + e) / 2 for s, e in silences)
+
+    cuts = []
+    pos = 0.0
+    while duration - pos > target + search:
+        ideal = pos + target
+        candidates = [m for m in mids if ideal - search <= m <= ideal + search]
+        cut = min(candidates, key=lambda m: abs(m - ideal)) if candidates else ideal
+        cuts.append(cut)
+        pos = cut
+
+    bounds = [0.0] + cuts + [duration]
+    return [
+        Segment(i, max(0.0, bounds[i] - overlap), min(duration, bounds[i + 1] + overlap))
+        for i in range(len(bounds) - 1)
+    ]
+
+
+_WORD_RE = re.compile(r"[\w']+")
+
+
+def _norm(word: str) -> str:
+    found = _WORD_RE.findall(word.lower())
+    return "".join(found)
+
+
+def merge_texts(texts: list, max_overlap_words: int = 40, min_match: int = 2, edge_slack: int = 2) -> str:
+    """Склеивает тексты соседних кусков, убирая повтор на перекрытии.
+
+    Ищет самое длинное совпадение хвоста предыдущего текста с началом следующего
+    (без учёта регистра и пунктуации). Допускается до edge_slack "обрезанных" слов
+    на краях — на границе куска слово часто распознаётся частично.
+    """
+    words = []
+    for text in texts:
+        nxt = text.split()
+        if not words:
+            words = nxt
+            continue
+
+        best = (0, 0, 0)  # (длина совпадения, отброшено с конца words, отброшено с начала nxt)
+        tail = [_norm(w) for w in words[-(max_overlap_words + edge_slack):]]
+        head = [_norm(w) for w in nxt[:max_overlap_words + edge_slack]]
+        for i in range(edge_slack + 1):
+            t = tail[:len(tail) - i] if i else tail
+            for j in range(edge_slack + 1):
+                h = head[j:]
+                for k in range(min(len(t), len(h), max_overlap_words), best[0], -1):
+                    if t[-k:] == h[:k]:
+                        best = (k, i, j)
+                        break
+
+        k, i, j = best
+        if k >= min_match:
+            if i:
+                words = words[:-i]
+            nxt = nxt[j + k:]
+        words.extend(nxt)
+    return " ".join(words)
+
+
+class LongAudioTranscriber:
+    """Параллельная транскрипция кусков с ограничением fan-out и повторами по каждому куску.
+
+    backend — объект с async transcribe_segment(path, segment) -> str (бросает исключение при ошибке).
+    """
+
+    def __init__(self, backend, fanout: int = None, retries: int = None,
+                 segment_len: float = None, overlap: float = None, backoff: float = 1.0):
+        self.backend = backend
+        self.fanout = fanout or Config.LONG_AUDIO_FANOUT
+        self.retries = retries if retries is not None else Config.LONG_AUDIO_RETRIES
+        self.segment_len = segment_len or Config.LONG_AUDIO_SEGMENT
+        self.overlap = overlap if overlap is not None else Config.LONG_AUDIO_OVERLAP
+        self.backoff = backoff
+
+    async def transcribe(self, path: str, duration: float, silences: list = None, on_partial=None) -> str:
+        """on_partial(text) вызывается, когда готов новый непрерывный префикс кусков (по порядку).
+
+        Если часть кусков не распознана — PartialTranscript; если ни один — RuntimeError.
+        """
+        if silences is None:
+            silences = await detect_silences(path)
+        segments = plan_segments(duration, silences, self.segment_len, self.overlap)
+        logger.info(f"Длинная запись {duration:.0f} сек: {len(segments)} кусков, пауз найдено {len(silences)}")
+
+        semaphore = asyncio.Semaphore(self.fanout)
+
+        texts = [None] * len(segments)
+        ready = 0
+
+        async def run(segment):
+            nonlocal ready
+            async with semaphore:
+                texts[segment.index] = await self._transcribe_segment(path, segment)
+            # Отдаём наружу только непрерывное начало, чтобы текст не "прыгал"
+            prefix = ready
+            while prefix < len(texts) and texts[prefix] is not None:
+                prefix += 1
+            if prefix > ready:
+                ready = prefix
+                if on_partial and prefix < len(texts):
+                    on_partial(merge_texts([t for t in texts[:prefix] if t]))
+
+        await asyncio.gather(*(run(s) for s in segments))
+        failed = sum(1 for t in texts if t == FAILED_SEGMENT_TEXT)
+        if failed == len(texts):
+            raise RuntimeError("ни один фрагмент не распознан")
+        text = merge_texts([t for t in texts if t])
+        if failed:
+            logger.warning(f"Не распознано кусков: {failed} из {len(texts)}")
+            return PartialTranscript(text, failed, len(texts))
+        return text
+
+    async def _transcribe_segment(self, path: str, segment: Segment) -> str:
+        # Запросы к Mistral уже повторяет resilience.Policy; здесь — редкий повтор куска целиком
+        # после исчерпанных попыток, и только для временных ошибок (не 400/401 и не открытый breaker)
+        for attempt in range(self.retries + 1):
+            try:
+                return (await self.backend.transcribe_segment(path, segment)).strip()
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    logger.error(f"{segment}: не удалось после {attempt + 1} попыток: {e}")
+                    return FAILED_SEGMENT_TEXT
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"{segment}: ошибка ({e}), повтор через {delay:.1f} сек")
+                await asyncio.sleep(delay)
+
+
+class MistralSegmentBackend:
+    """Вырезает кусок через ffmpeg и отправляет его в MistralTranscriber"""
+
+    def __init__(self, transcriber):
+        self.transcriber = transcriber
+
+    async def transcribe_segment(self, path: str, segment: Segment) -> str:
+        piece = await cut_segment(path, segment.start, segment.end)
+        try:
+            return await self.transcriber.transcribe_raw(piece, f"part{segment.index}.ogg")
+        finally:
+            os.remove(piece)
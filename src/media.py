@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("Media")
+
+
+class SpooledMedia:
+    """Медиафайл, скачанный по частям.
+
+    Пока файл меньше SPOOL_MAX_BYTES, он лежит в памяти одним bytearray;
+    крупнее — сбрасывается во временный файл. SHA-256 считается на лету.
+    """
+
+    def __init__(self, max_memory: int = None, suffix: str = ""):
+        self.max_memory = max_memory if max_memory is not None else Config.SPOOL_MAX_BYTES
+        self.suffix = suffix
+        self.size = 0
+        self.path = None
+        self._buffer = bytearray()
+        self._file = None
+        self._sha = hashlib.sha256()
+        # Временный файл наш — удаляется в close()
+        self._owned = True
+
+    @classmethod
+    def from_file(cls, path: str, suffix: str = ""):
+        """Уже лежащий на диске файл (артефакт журнала задач); close() его не удаляет"""
+        media = cls(suffix=suffix)
+        media.path = path
+        media._owned = False
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                media._sha.update(chunk)
+                media.size += len(chunk)
+        return media
+
+    def write(self, chunk):
+        self._sha.update(chunk)
+        self.size += len(chunk)
+        if self._file is None and self.size > self.max_memory:
+            self._spill()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer += chunk
+
+    def _spill(self):
+        fd, self.path = tempfile.mkstemp(suffix=self.suffix, dir=Config.TMP_DIR)
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+
+    def finish(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def ensure_on_disk(self) -> str:
+        """Нужен путь к файлу (например, для ffmpeg)"""
+        if self.path is None:
+            fd, self.path = tempfile.mkstemp(suffix=self.suffix, dir=Config.TMP_DIR)
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._buffer)
+            self._buffer = bytearray()
+        return self.path
+
+    @property
+    def sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    def content(self):
+        """bytes для маленьких файлов, путь — для файлов на диске"""
+        return self.path if self.path is not None else bytes(self._buffer)
+
+    def close(self):
+        self.finish()
+        self._buffer = bytearray()
+        if self._owned and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+
+async def download_media(client, message, suffix: str = "") -> SpooledMedia:
+    """Скачивает медиа через iter_download, не собирая весь файл в памяти"""
+    media = SpooledMedia(suffix=suffix)
+    try:
+        async for chunk in client.iter_download(message.media, request_size=Config.DOWNLOAD_CHUNK_SIZE):
+            media.write(chunk)
+        media.finish()
+    except BaseException:
+        media.close()
+        raise
+    return media
+
+
+def has_ffmpeg() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+async def _run_ffmpeg(*args):
+    """Запускает ffmpeg, возвращает (код возврата, stderr)"""
+    proc = await asyncio.create_subprocess_exec(
+        shutil.which("ffmpeg"), "-y", "-hide_banner", *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, err = await proc.communicate()
+    return proc.returncode, err.decode(errors="ignore")
+
+
+async def extract_audio(media: SpooledMedia):
+    """Вытаскивает аудиодорожку из кружочка без перекодирования.
+
+    Возвращает SpooledMedia с .m4a или None, если ffmpeg недоступен или упал —
+    тогда отправляется исходный файл.
+    """
+    if not has_ffmpeg():
+        return None
+
+    src = media.ensure_on_disk()
+    fd, dst = tempfile.mkstemp(suffix=".m4a", dir=Config.TMP_DIR)
+    os.close(fd)
+    code, err = await _run_ffmpeg("-loglevel", "error", "-i", src, "-vn", "-c:a", "copy", dst)
+    if code != 0:
+        logger.warning(f"ffmpeg не смог извлечь аудио: {err.strip()}")
+        os.remove(dst)
+        return None
+
+    audio = SpooledMedia(suffix=".m4a")
+    audio.path = dst
+    audio.size = os.path.getsize(dst)
+    logger.info(f"Аудио извлечено: {media.size} -> {audio.size} байт")
+    return audio
+
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+
+async def detect_silences(path: str, noise_db: int = -30, min_silence: float = 0.5) -> list:
+    """Паузы в аудио через silencedetect: [(start, end), ...] в секундах"""
+    code, err = await _run_ffmpeg(
+        "-i", path, "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"
+    )
+    if code != 0:
+        logger.warning(f"silencedetect не отработал: {err.strip()[-200:]}")
+        return []
+
+    silences = []
+    start = None
+    for kind, value in _SILENCE_RE.findall(err):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    return silences
+
+
+async def cut_segment(path: str, start: float, end: float) -> str:
+    """Вырезает кусок [start, end) в моно Opus — маленький файл для загрузки. Возвращает путь"""
+    fd, dst = tempfile.mkstemp(suffix=".ogg", dir=Config.TMP_DIR)
+    os.close(fd)
+    code, err = await _run_ffmpeg(
+        "-loglevel", "error", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", path,
+        "-vn", "-ac", "1", "-c:a", "libopus", "-b:a", "32k", dst
+    )
+    if code != 0:
+        os.remove(dst)
+        raise RuntimeError(f"ffmpeg не смог вырезать {start:.1f}-{end:.1f}: {err.strip()}")
+    return dst
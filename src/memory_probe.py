@@ -0,0 +1,55 @@
+import asyncio
+import os
+import resource
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """Текущий RSS процесса в байтах (Linux: /proc, иначе — пиковый ru_maxrss)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssProbe:
+    """Замер пикового RSS за время задачи: фоновая выборка каждые interval секунд.
+
+    async with RssProbe() as probe:
+        ...
+    probe.peak, probe.delta
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self._task = None
+
+    @property
+    def delta(self) -> int:
+        return self.peak - self.start
+
+    def sample(self):
+        self.peak = max(self.peak, current_rss())
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sample()
+
+    async def __aenter__(self):
+        self.start = self.peak = current_rss()
+        self._task = asyncio.create_task(self._loop())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.sample()
+        return False
@@ -0,0 +1,138 @@
+import time
+from contextlib import contextmanager
+from aiohttp import web
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("Metrics")
+
+# Границы гистограмм длительности стадий (сек)
+_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _fmt_labels(labels, extra: dict = None) -> str:
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Metrics:
+    """Счётчики, гистограммы и gauge-функции в формате Prometheus (text exposition)"""
+
+    def __init__(self):
+        self._help = {}
+        self._types = {}
+        self._counters = {}
+        # {(name, labels): [bucket_counts..., count, sum]}
+        self._histograms = {}
+        # {name: {labels: (fn, label)}}: fn() -> число или {label_value: число}, label — имя метки для dict
+        self._gauges = {}
+
+    def _declare(self, name: str, kind: str, help_text: str):
+        if name not in self._types:
+            self._types[name] = kind
+            self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels):
+        self._declare(name, "counter", help_text)
+        key = (name, _labels(labels))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        self._declare(name, "histogram", help_text)
+        key = (name, _labels(labels))
+        h = self._histograms.get(key)
+        if h is None:
+            h = self._histograms[key] = [0] * (len(_BUCKETS) + 2)
+        for i, bound in enumerate(_BUCKETS):
+            if value <= bound:
+                h[i] += 1
+        h[-2] += 1
+        h[-1] += value
+
+    def gauge(self, name: str, fn, help_text: str = "", label: str = None, **labels):
+        """labels — постоянные метки (например account): с разными метками gauge не перезаписывают друг друга"""
+        self._declare(name, "gauge", help_text)
+        self._gauges.setdefault(name, {})[_labels(labels)] = (fn, label)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Время стадии -> stage_seconds{stage=...}"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.monotonic() - started,
+                         "Длительность стадий обработки", stage=stage)
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._types):
+            kind = self._types[name]
+            lines.append(f"# HELP {name} {self._help[name] or name}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (n, labels), value in self._counters.items():
+                    if n == name:
+                        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+            elif kind == "histogram":
+                for (n, labels), h in self._histograms.items():
+                    if n != name:
+                        continue
+                    for i, bound in enumerate(_BUCKETS):
+                        lines.append(f"{name}_bucket{_fmt_labels(labels, {'le': bound})} {h[i]}")
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, {'le': '+Inf'})} {h[-2]}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {h[-2]}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-1]}")
+            else:
+                for labels, (fn, label) in self._gauges[name].items():
+                    try:
+                        value = fn()
+                    except Exception as e:
+                        logger.warning(f"gauge {name}: {e}")
+                        continue
+                    if isinstance(value, dict):
+                        for k, v in value.items():
+                            lines.append(f"{name}{_fmt_labels(labels, {label: k})} {v}")
+                    else:
+                        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр процесса
+metrics = Metrics()
+
+
+class MetricsServer:
+    """Маленький HTTP-сервер с /metrics для Prometheus"""
+
+    def __init__(self, host: str = None, port: int = None):
+        self.host = host or Config.METRICS_HOST
+        self.port = port if port is not None else Config.METRICS_PORT
+        self.runner = None
+
+    async def start(self):
+        if not self.port:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Метрики: http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def _handle(self, request):
+        return web.Response(
+            text=metrics.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
@@ -0,0 +1,83 @@
+import time
+from telethon import types, utils
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("ReactionFilter")
+
+_EDIT_TYPES = frozenset((types.UpdateEditMessage, types.UpdateEditChannelMessage))
+# Смена имени/названия — повод сбросить кэш сущностей
+_ENTITY_TYPES = frozenset((types.UpdateUserName, types.UpdateChannel, types.UpdateChat))
+
+
+class ReactionFilter:
+    """Быстрый предфильтр сырых апдейтов для reaction_handler (func у events.Raw).
+
+    Отсекает всё, кроме правок сообщений с нашей реакцией, как можно раньше —
+    без isinstance-цепочек и без запуска корутины обработчика. Пока наша реакция
+    остаётся на сообщении, его повторные правки (чужие реакции, дубли апдейта)
+    в пределах window секунд отбрасываются; снятая реакция сбрасывает запись,
+    и поставленная заново снова запускает задачу.
+    Апдейты о смене имён отдаются в on_entity_update (кэш сущностей).
+    """
+
+    def __init__(self, window: float = None, stats_every: int = 10000):
+        self.window = window if window is not None else Config.REACTION_DEDUP_WINDOW
+        self.stats_every = stats_every
+        self.my_id = None
+        self.on_entity_update = None
+
+        self.seen = 0
+        self.dispatched = 0
+        self.duplicates = 0
+        # {(peer_id, msg_id): ts последней правки с нашей реакцией}
+        self._recent = {}
+
+    def __call__(self, update) -> bool:
+        self.seen += 1
+        if self.seen % self.stats_every == 0:
+            logger.info(f"Апдейты: {self.stats()}")
+
+        kind = type(update)
+        if kind not in _EDIT_TYPES:
+            if kind in _ENTITY_TYPES and self.on_entity_update:
+                self.on_entity_update(update)
+            return False
+        msg = update.message
+        reactions = getattr(msg, "reactions", None)
+        recent = reactions.recent_reactions if reactions else None
+        mine = recent and any(
+            type(r.peer_id) is types.PeerUser and r.peer_id.user_id == self.my_id
+            and getattr(r.reaction, "emoticon", None) == Config.TRIGGER_EMOJI
+            for r in recent
+        )
+        if not mine:
+            # Реакцию сняли: следующая такая же — новая задача, а не дубль
+            if self._recent:
+                self._recent.pop((utils.get_peer_id(msg.peer_id), msg.id), None)
+            return False
+
+        now = time.monotonic()
+        key = (utils.get_peer_id(msg.peer_id), msg.id)
+        last = self._recent.get(key)
+        # Метка обновляется и на дублях: пока реакция стоит, чужие реакции задачу не повторяют
+        self._recent[key] = now
+        if last is not None and now - last < self.window:
+            self.duplicates += 1
+            return False
+        if len(self._recent) > 1000:
+            self._prune(now)
+
+        self.dispatched += 1
+        return True
+
+    def _prune(self, now: float):
+        self._recent = {k: ts for k, ts in self._recent.items() if now - ts < self.window}
+
+    def stats(self) -> dict:
+        return {
+            "seen": self.seen,
+            "dispatched": self.dispatched,
+            "duplicates": self.duplicates,
+            "filtered_ratio": 1 - self.dispatched / self.seen if self.seen else 0.0,
+        }
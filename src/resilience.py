@@ -0,0 +1,218 @@
+"""Повторы с backoff, circuit breaker, дедлайны и hedged-запросы для внешних API (Mistral, Bot API).
+
+Офлайн-проверка против фейкового Mistral: python -m bench.resilience_check
+"""
+import asyncio
+import random
+import time
+from collections import deque
+import aiohttp
+import httpx
+from .config import Config
+from .logger import setup_logger
+from .metrics import metrics
+
+logger = setup_logger("Resilience")
+
+# Статусы, которые имеет смысл повторить
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class TransientError(Exception):
+    """Ответ 429/5xx, который стоит повторить; retry_after — подсказка сервера (сек)"""
+
+    def __init__(self, status: int, message: str = "", retry_after: float = None):
+        super().__init__(f"HTTP {status}: {message}" if message else f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Эндпоинт временно отключён после серии ошибок"""
+
+
+def _status(exc):
+    return getattr(exc, "status", None) or getattr(exc, "status_code", None)
+
+
+def is_retryable(exc) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, httpx.TransportError, aiohttp.ClientError)):
+        return True
+    return _status(exc) in RETRY_STATUSES
+
+
+def _retry_after(exc):
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(exc, "headers", None)
+        value = headers.get("retry-after") if headers else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """closed -> (threshold ошибок подряд) -> open -> (reset_timeout) -> half_open: один пробный запрос"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, threshold: int = None, reset_timeout: float = None):
+        self.name = name
+        self.threshold = threshold if threshold is not None else Config.BREAKER_FAILURES
+        self.reset_timeout = reset_timeout if reset_timeout is not None else Config.BREAKER_RESET
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self):
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name}: circuit open")
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(f"{self.name}: circuit half-open, идёт пробный запрос")
+            self._probing = True
+
+    def success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"{self.name}: circuit closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"{self.name}: circuit open на {self.reset_timeout:.0f} сек ({self.failures} ошибок подряд)")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    """Скользящее окно длительностей успешных запросов для порога hedging"""
+
+    def __init__(self, size: int = 200):
+        self._values = deque(maxlen=size)
+
+    def add(self, value: float):
+        self._values.append(value)
+
+    def __len__(self):
+        return len(self._values)
+
+    def percentile(self, p: float) -> float:
+        values = sorted(self._values)
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Policy:
+    """Повторы с экспоненциальной задержкой и jitter, общий дедлайн и circuit breaker эндпоинта"""
+
+    def __init__(self, name: str, attempts: int = None, base_delay: float = None, max_delay: float = None,
+                 deadline: float = None, breaker: CircuitBreaker = None):
+        self.name = name
+        self.attempts = attempts if attempts is not None else Config.RETRY_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else Config.RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else Config.RETRY_MAX_DELAY
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latency = LatencyWindow()
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": равномерно от 0 до экспоненциальной границы
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def call(self, fn, hedge: bool = False):
+        """fn — фабрика корутины (вызывается заново на каждую попытку)"""
+        deadline_at = time.monotonic() + self.deadline if self.deadline else None
+        for attempt in range(self.attempts):
+            self.breaker.allow()
+            timeout = deadline_at - time.monotonic() if deadline_at else None
+            if timeout is not None and timeout <= 0:
+                raise asyncio.TimeoutError(f"{self.name}: дедлайн {self.deadline:.0f} сек исчерпан")
+
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(self._hedged(fn) if hedge else fn(), timeout)
+            except Exception as e:
+                delay = self.failed(e, attempt, deadline_at)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            self.succeeded(started)
+            return result
+
+    def failed(self, exc, attempt: int, deadline_at: float = None):
+        """Учёт неудачной попытки: через сколько секунд повторить или None — не повторять.
+        Для вызывающих, которые повторяют сами (например, возвращают задачу в очередь)"""
+        retryable = is_retryable(exc)
+        # 429 — сервер жив, просто просит притормозить: breaker не трогаем
+        if retryable and _status(exc) != 429:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+        if not retryable or attempt >= self.attempts - 1:
+            return None
+
+        delay = _retry_after(exc) or self._backoff(attempt)
+        if deadline_at and time.monotonic() + delay >= deadline_at:
+            return None
+        metrics.inc("retries_total", help_text="Повторы запросов к внешним API", endpoint=self.name)
+        logger.warning(f"{self.name}: {exc!r}, повтор {attempt + 1}/{self.attempts - 1} через {delay:.1f} сек")
+        return delay
+
+    def succeeded(self, started: float):
+        self.breaker.success()
+        self.latency.add(time.monotonic() - started)
+
+    async def _hedged(self, fn):
+        """Если запрос дольше p95 — параллельно шлём дубль и берём первый успешный ответ"""
+        if len(self.latency) < Config.HEDGE_MIN_SAMPLES:
+            return await fn()
+
+        threshold = self.latency.percentile(95)
+        tasks = [asyncio.ensure_future(fn())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            if done:
+                return tasks[0].result()
+
+            metrics.inc("hedged_requests_total", help_text="Дублирующие запросы после p95", endpoint=self.name)
+            tasks.append(asyncio.ensure_future(fn()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+# Один Policy (и breaker) на эндпоинт на весь процесс
+_policies = {}
+
+
+def policy(name: str, **kwargs) -> Policy:
+    if name not in _policies:
+        _policies[name] = Policy(name, **kwargs)
+    return _policies[name]
+
+
+def breaker_states() -> dict:
+    """Для gauge: 0 — closed, 1 — half_open, 2 — open"""
+    codes = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+    return {name: codes[p.breaker.state] for name, p in _policies.items()}
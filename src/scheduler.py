@@ -0,0 +1,149 @@
+import asyncio
+import itertools
+from .config import Config
+from .logger import setup_logger
+from .tracing import trace_id
+
+logger = setup_logger("Scheduler")
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "fn", "future", "trace")
+
+    def __init__(self, priority, seq, fn, future, trace):
+        self.priority = priority
+        self.seq = seq
+        self.fn = fn
+        self.future = future
+        self.trace = trace
+
+    def __lt__(self, other):
+        # Меньший приоритет — раньше; при равенстве — в порядке поступления
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class WorkerPool:
+    """Пул воркеров с ограниченной приоритетной очередью"""
+
+    def __init__(self, name: str, workers: int, maxsize: int):
+        self.name = name
+        self.workers = workers
+        self.queue = asyncio.PriorityQueue(maxsize=maxsize)
+        self.active = 0
+        self._tasks = []
+
+    def start(self):
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"{self.name}-{i}"))
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    async def put(self, job: _Job):
+        # Очередь ограничена: при переполнении вызывающий ждёт (backpressure)
+        await self.queue.put(job)
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.future.cancelled():
+                    continue
+                self.active += 1
+                # Стадия выполняется с trace ID той задачи, что её поставила
+                token = trace_id.set(job.trace)
+                try:
+                    result = await job.fn()
+                    if not job.future.done():
+                        job.future.set_result(result)
+                except asyncio.CancelledError:
+                    job.future.cancel()
+                    raise
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                finally:
+                    trace_id.reset(token)
+                    self.active -= 1
+            finally:
+                self.queue.task_done()
+
+    async def drain(self):
+        await self.queue.join()
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+class Scheduler:
+    """Планировщик задач по реакциям.
+
+    Пул "jobs" принимает задачи из reaction_handler, отдельные пулы ограничивают
+    скачивания, транскрипцию, правку текста и саммари. Внутри пула задачи идут
+    по приоритету: короткие голосовые и правки раньше длинных кружочков.
+    """
+
+    # Порядок важен для остановки: сначала дожидаемся задач, затем стадий
+    POOLS = ("jobs", "download", "transcribe", "fix", "summary")
+
+    def __init__(self, workers: dict = None, maxsize: int = None):
+        workers = workers or {
+            "jobs": Config.SCHED_JOB_WORKERS,
+            "download": Config.SCHED_DOWNLOAD_WORKERS,
+            "transcribe": Config.SCHED_TRANSCRIBE_WORKERS,
+            "fix": Config.SCHED_FIX_WORKERS,
+            "summary": Config.SCHED_SUMMARY_WORKERS,
+        }
+        maxsize = maxsize if maxsize is not None else Config.SCHED_QUEUE_SIZE
+        self.pools = {name: WorkerPool(name, workers[name], maxsize) for name in self.POOLS}
+        self.accepting = False
+        self._seq = itertools.count()
+
+    def start(self):
+        for pool in self.pools.values():
+            pool.start()
+        self.accepting = True
+        logger.info("Планировщик запущен: " + ", ".join(f"{p.name}={p.workers}" for p in self.pools.values()))
+
+    async def submit(self, pool: str, priority: float, fn):
+        """Ставит задачу (fn — функция без аргументов, возвращающая корутину). Возвращает future"""
+        future = asyncio.get_running_loop().create_future()
+        if pool == "jobs":
+            # Новые задачи после остановки не принимаем; вложенные стадии — да
+            if not self.accepting:
+                raise RuntimeError("Планировщик остановлен")
+            # Результат задачи никто не ждёт — ошибки только в лог
+            future.add_done_callback(self._log_failure)
+        await self.pools[pool].put(_Job(priority, next(self._seq), fn, future, trace_id.get()))
+        return future
+
+    async def run(self, pool: str, priority: float, fn):
+        """Выполняет стадию в нужном пуле и возвращает её результат"""
+        return await (await self.submit(pool, priority, fn))
+
+    def depths(self) -> dict:
+        return {name: pool.depth for name, pool in self.pools.items()}
+
+    async def close(self, timeout: float = None):
+        """Перестаёт принимать задачи и даёт начатым завершиться"""
+        timeout = timeout if timeout is not None else Config.SCHED_DRAIN_TIMEOUT
+        self.accepting = False
+        jobs = self.pools["jobs"]
+        try:
+            await asyncio.wait_for(jobs.drain(), timeout=timeout)
+            for pool in self.pools.values():
+                await asyncio.wait_for(pool.drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не все задачи завершились за {timeout} сек: {self.depths()}")
+        for pool in self.pools.values():
+            await pool.stop()
+        logger.info("Планировщик остановлен.")
+
+    @staticmethod
+    def _log_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Ошибка задачи: {future.exception()}")
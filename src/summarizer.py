@@ -1,52 +1,200 @@
 import asyncio
+import hashlib
+import os
 import re
-from mistralai import Mistral
+import sqlite3
+import time
+from .ai_client import AIClient
 from .config import Config
 from .logger import setup_logger
 
 logger = setup_logger("Summarizer")
 
+# Грубая оценка без токенизатора: для русского текста ~3 символа на токен
+CHARS_PER_TOKEN = 3
+
+# Промпты итогового саммари. Промежуточные выжимки кусков от стиля не зависят,
+# поэтому при смене стиля переиспользуются из кэша
+STYLES = {
+    # Максимально строгий промпт для обычного текста
+    "brief": (
+        "Ты — мастер краткости. Сделай МАКСИМАЛЬНО сжатую выжимку текста.\n"
+        "ТРЕБОВАНИЯ:\n"
+        "1. Не более 3-5 коротких пунктов.\n"
+        "2. Пиши только самую суть (Bottom Line). Избегай подробностей.\n"
+        "3. КАТЕГОРИЧЕСКИ ЗАПРЕЩЕНО любое форматирование (звездочки, жирный шрифт и т.д.).\n"
+        "4. Используй обычное тире (-) для списков.\n"
+        "5. Ответ на языке оригинала."
+    ),
+    "detailed": (
+        "Сделай подробную выжимку текста по темам.\n"
+        "ТРЕБОВАНИЯ:\n"
+        "1. Сохрани все договорённости, цифры, даты и имена.\n"
+        "2. КАТЕГОРИЧЕСКИ ЗАПРЕЩЕНО любое форматирование (звездочки, жирный шрифт и т.д.).\n"
+        "3. Используй обычное тире (-) для списков.\n"
+        "4. Ответ на языке оригинала."
+    ),
+}
+
+# Промпт для кусков длинного текста и промежуточных уровней свёртки
+CHUNK_PROMPT = (
+    "Это фрагмент длинной расшифровки. Перескажи его сжато, но без потери фактов:\n"
+    "решения, договорённости, цифры, даты, имена. Без вступлений и форматирования.\n"
+    "Ответ на языке оригинала."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_text(text: str, max_tokens: int) -> list:
+    """Куски не длиннее max_tokens: по абзацам, затем по предложениям, в крайнем случае по словам"""
+    limit = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if len(paragraph) <= limit:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?…])\s+", paragraph):
+            while len(sentence) > limit:
+                cut = sentence.rfind(" ", 0, limit)
+                cut = cut if cut > 0 else limit
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].lstrip()
+            pieces.append(sentence)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if not piece.strip():
+            continue
+        if current and len(current) + len(piece) + 1 > limit:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ChunkSummaryCache:
+    """Выжимки кусков в SQLite по хэшу (модель + промпт + текст куска)"""
+
+    def __init__(self, path: str = None, ttl: float = None):
+        self.path = path or os.path.join(Config.DATA_DIR, "summary_chunks.sqlite3")
+        self.ttl = ttl if ttl is not None else Config.SUMMARY_CACHE_TTL
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (key TEXT PRIMARY KEY, summary TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        if self.ttl:
+            self.db.execute("DELETE FROM chunks WHERE created < ?", (time.time() - self.ttl,))
+        self.db.commit()
+
+    @staticmethod
+    def key(model: str, prompt: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{prompt}\0{text}".encode()).hexdigest()
+
+    def get(self, key: str):
+        row = self.db.execute("SELECT summary FROM chunks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, summary: str):
+        self.db.execute(
+            "INSERT OR REPLACE INTO chunks (key, summary, created) VALUES (?, ?, ?)", (key, summary, time.time())
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
 class MistralSummarizer:
-    def __init__(self):
-        self.client = Mistral(api_key=Config.MISTRAL_API_KEY)
+    """Саммари одним запросом, а для длинных текстов — map-reduce.
+
+    Длинный текст режется на куски по SUMMARY_CHUNK_TOKENS, куски пересказываются
+    параллельно (с кэшем), пересказы сворачиваются уровнями, пока не влезут в один
+    запрос, и уже он превращается в итоговое саммари нужного стиля.
+    """
+
+    def __init__(self, ai: AIClient, memo: ChunkSummaryCache = None):
+        self.ai = ai
         self.model = "mistral-medium-latest"
+        self.memo = memo or ChunkSummaryCache()
+        self.chunk_tokens = Config.SUMMARY_CHUNK_TOKENS
+        self.single_call_tokens = Config.SUMMARY_SINGLE_CALL_TOKENS
 
-    async def summarize(self, text: str) -> str:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._summarize_sync, text)
-
-    def _summarize_sync(self, text: str) -> str:
-        # Максимально строгий промпт для обычного текста
-        prompt = (
-            "Ты — мастер краткости. Сделай МАКСИМАЛЬНО сжатую выжимку текста.\n"
-            "ТРЕБОВАНИЯ:\n"
-            "1. Не более 3-5 коротких пунктов.\n"
-            "2. Пиши только самую суть (Bottom Line). Избегай подробностей.\n"
-            "3. КАТЕГОРИЧЕСКИ ЗАПРЕЩЕНО любое форматирование (звездочки, жирный шрифт и т.д.).\n"
-            "4. Используй обычное тире (-) для списков.\n"
-            "5. Ответ на языке оригинала."
-        )
+    async def summarize(self, text: str, style: str = "brief") -> str:
+        prompt = STYLES[style]
         try:
+            if estimate_tokens(text) > self.single_call_tokens:
+                text = await self._reduce(text)
+
             logger.info("Запрос к Mistral для создания Plain Text саммари...")
-            response = self.client.chat.complete(
+            result = await self.ai.chat(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": prompt},
                     {"role": "user", "content": text}
                 ]
             )
-            result = response.choices[0].message.content
-            
+
             # --- ПРИНУДИТЕЛЬНАЯ ОЧИСТКА ---
             # Удаляем звездочки, нижние подчеркивания и решетки (Markdown)
             result = result.replace("**", "").replace("__", "").replace("*", "").replace("#", "")
-            
+
             # Удаляем любые HTML-теги, если они проскочили
             result = re.sub(r'<[^>]*>', '', result)
-            
+
             logger.info("Саммари готово (чистый текст).")
             return result.strip()
-            
+
         except Exception as e:
             logger.error(f"Ошибка в Summarizer: {e}")
-            return f"Ошибка при создании саммари: {e}"
\ No newline at end of file
+            return f"Ошибка при создании саммари: {e}"
+
+    async def _reduce(self, text: str) -> str:
+        """Сворачивает текст уровнями, пока он не влезет в один запрос"""
+        level = 0
+        while estimate_tokens(text) > self.single_call_tokens:
+            chunks = split_text(text, self.chunk_tokens)
+            level += 1
+            logger.info(f"Map-reduce саммари: уровень {level}, кусков {len(chunks)}")
+            partials = await asyncio.gather(*(self._summarize_chunk(c) for c in chunks))
+            reduced = "\n\n".join(partials)
+            if len(reduced) >= len(text):
+                # Пересказ не сокращает текст — дальше свёртка бесполезна
+                break
+            text = reduced
+        return text
+
+    async def _summarize_chunk(self, chunk: str) -> str:
+        key = self.memo.key(self.model, CHUNK_PROMPT, chunk)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+        result = await self.ai.chat(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": CHUNK_PROMPT},
+                {"role": "user", "content": chunk}
+            ]
+        )
+        result = result.strip()
+        self.memo.put(key, result)
+        return result
+
+    def close(self):
+        self.memo.close()
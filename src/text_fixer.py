@@ -1,20 +1,79 @@
 import asyncio
-from mistralai import Mistral
+import re
+from collections import OrderedDict
+from .ai_client import AIClient
 from .config import Config
 from .logger import setup_logger
+from .metrics import metrics
 
 logger = setup_logger("TextFixer")
 
+_URL_RE = re.compile(r"(https?://|www\.)\S+|[@#]\w+", re.IGNORECASE)
+_LETTER_RE = re.compile(r"[^\W\d_]")
+_MARK_RE = re.compile(r"[,.!?;:…]|\s-\s")
+# Уже расставлено: хотя бы один знак на столько слов
+_WORDS_PER_MARK = 6
+# Короче этого (в словах) расставлять нечего
+_MIN_WORDS = 3
+
+
+def is_noop(text: str) -> bool:
+    """Локальная проверка: правка заведомо ничего не изменит (ok, эмодзи, ссылки, уже с пунктуацией)"""
+    bare = _URL_RE.sub(" ", text)
+    if not _LETTER_RE.search(bare):
+        return True
+    words = bare.split()
+    if len(words) < _MIN_WORDS:
+        return True
+    return len(_MARK_RE.findall(bare)) * _WORDS_PER_MARK >= len(words)
+
+
 class MistralTextFixer:
-    def __init__(self):
-        self.client = Mistral(api_key=Config.MISTRAL_API_KEY)
+    def __init__(self, ai: AIClient, cache_size: int = None):
+        self.ai = ai
         self.model = "mistral-medium-latest"
+        self.cache_size = cache_size if cache_size is not None else Config.FIX_CACHE_MAX_ITEMS
+
+        # {исходный текст: исправленный} — LRU. Ключ — текст как есть: ответ повторяет его
+        # переносы строк и пробелы, и для "почти такого же" сообщения он не подходит
+        self._cache = OrderedDict()
+        # {исходный текст: Task} — одинаковые одновременные запросы ждут один вызов
+        self._inflight = {}
+
+    def try_local(self, text: str):
+        """Результат без запроса к API (no-op или кэш) либо None"""
+        if is_noop(text):
+            metrics.inc("text_fix_total", help_text="Правки текста по источнику результата", source="noop")
+            return text
+        fixed = self._cache.get(text)
+        if fixed is not None:
+            self._cache.move_to_end(text)
+            metrics.inc("text_fix_total", help_text="Правки текста по источнику результата", source="cache")
+        return fixed
 
     async def fix_punctuation(self, text: str) -> str:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._fix_sync, text)
+        fixed = self.try_local(text)
+        if fixed is not None:
+            return fixed
+
+        task = self._inflight.get(text)
+        if task is None:
+            task = asyncio.ensure_future(self._fix_remote(text))
+            self._inflight[text] = task
+            task.add_done_callback(lambda _: self._inflight.pop(text, None))
+            source = "api"
+        else:
+            source = "coalesced"
+        metrics.inc("text_fix_total", help_text="Правки текста по источнику результата", source=source)
+
+        try:
+            # shield: отмена одного ожидающего не обрывает общий запрос
+            return await asyncio.shield(task)
+        except Exception as e:
+            logger.error(f"Ошибка в TextFixer: {e}")
+            return text
 
-    def _fix_sync(self, text: str) -> str:
+    async def _fix_remote(self, text: str) -> str:
         prompt = (
             "Ты — профессиональный корректор для чатов. Твоя задача: расставить знаки препинания (запятые, дефисы).\n"
             "ПРАВИЛА:\n"
@@ -23,25 +82,24 @@ class MistralTextFixer:
             "3. НЕ СТАВЬ точку в самом конце всего сообщения.\n"
             "4. Оставляй текст максимально оригинальным, добавляй только пунктуацию."
         )
-        try:
-            logger.info(f"Отправка в Mistral ({self.model})...")
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": text}
-                ]
-            )
-            result = response.choices[0].message.content
-            
-            result = result.replace(" — ", " - ").replace("—", "-").replace("–", "-").replace(" – ", " - ")
-            
-            result = result.strip()
-            if result.endswith('.') and not text.endswith('.'):
-                result = result[:-1]
-            
-            logger.info("Ответ от Mistral получен и обработан.")
-            return result
-        except Exception as e:
-            logger.error(f"Ошибка в TextFixer: {e}")
-            return text
\ No newline at end of file
+        logger.info(f"Отправка в Mistral ({self.model})...")
+        result = await self.ai.chat(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": text}
+            ]
+        )
+
+        result = result.replace(" — ", " - ").replace("—", "-").replace("–", "-").replace(" – ", " - ")
+
+        result = result.strip()
+        if result.endswith('.') and not text.endswith('.'):
+            result = result[:-1]
+
+        logger.info("Ответ от Mistral получен и обработан.")
+        # Ошибки не кэшируются: исключение уходит всем ожидающим, повтор сходит в API заново
+        self._cache[text] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
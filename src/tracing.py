@@ -0,0 +1,12 @@
+import contextvars
+import uuid
+
+# ID текущей задачи: проходит через диспетчер, обработчики, планировщик и BotSender и попадает в логи
+trace_id = contextvars.ContextVar("trace_id", default="-")
+
+
+def new_trace() -> str:
+    """Создаёт ID для новой задачи и делает его текущим"""
+    value = uuid.uuid4().hex[:8]
+    trace_id.set(value)
+    return value
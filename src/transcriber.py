@@ -1,38 +1,46 @@
-import io
-import asyncio
-from mistralai import Mistral
+from .ai_client import AIClient
 from .config import Config
 from .logger import setup_logger
+from .long_audio import LongAudioTranscriber, MistralSegmentBackend, PartialTranscript
+from .media import has_ffmpeg
 
 logger = setup_logger("Transcriber")
 
+# Префикс сообщения об ошибке: такие результаты не кэшируются
+ERROR_PREFIX = "❌ Ошибка транскрипции"
+
+
+def is_complete(text: str) -> bool:
+    """Транскрипция целиком: не ошибка и без нераспознанных кусков — её можно кэшировать"""
+    return not text.startswith(ERROR_PREFIX) and not isinstance(text, PartialTranscript)
+
+
 class MistralTranscriber:
-    def __init__(self):
-        self.client = Mistral(api_key=Config.MISTRAL_API_KEY)
+    def __init__(self, ai: AIClient):
+        self.ai = ai
         # Используем проверенную в тестах модель
         self.model = "voxtral-mini-2602"
 
-    async def transcribe(self, media_bytes: bytes, filename: str) -> str:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._transcribe_sync, media_bytes, filename)
+    def is_long(self, duration) -> bool:
+        """Запись стоит резать на куски (нужен ffmpeg)"""
+        return bool(duration) and duration >= Config.LONG_AUDIO_THRESHOLD and has_ffmpeg()
 
-    def _transcribe_sync(self, media_bytes: bytes, filename: str) -> str:
+    async def transcribe(self, media, filename: str, duration: float = None, on_partial=None) -> str:
+        """media — bytes или путь к файлу на диске (читается потоком при загрузке).
+
+        Длинные записи (путь + duration >= LONG_AUDIO_THRESHOLD) транскрибируются по кускам параллельно,
+        on_partial(text) получает уже готовое начало текста.
+        """
         try:
-            logger.info(f"Транскрипция {filename} через {self.model}...")
-            
-            # В этом API передаем только модель и файл. 
-            # Параметр 'prompt' здесь не поддерживается SDK Mistral.
-            response = self.client.audio.transcriptions.complete(
-                model=self.model,
-                file={
-                    "content": media_bytes,
-                    "file_name": filename,
-                }
-            )
-
-            # Извлекаем текст
-            result = getattr(response, 'text', str(response))
-            
+            if isinstance(media, str) and self.is_long(duration):
+                logger.info(f"Транскрипция {filename} ({duration:.0f} сек) по кускам через {self.model}...")
+                result = await LongAudioTranscriber(MistralSegmentBackend(self)).transcribe(
+                    media, duration, on_partial=on_partial
+                )
+            else:
+                logger.info(f"Транскрипция {filename} через {self.model}...")
+                result = await self.transcribe_raw(media, filename)
+
             if not result or not result.strip():
                 return "<i>(Распознано как пустое сообщение или тишина)</i>"
 
@@ -40,4 +48,11 @@ class MistralTranscriber:
 
         except Exception as e:
             logger.error(f"Ошибка Audio API: {e}", exc_info=True)
-            return f"❌ Ошибка транскрипции: {str(e)}"
\ No newline at end of file
+            return f"{ERROR_PREFIX}: {str(e)}"
+
+    async def transcribe_raw(self, media, filename: str) -> str:
+        """Запрос к Audio API (с повторами AIClient), ошибки не перехватываются"""
+        response = await self.ai.transcribe(self.model, media, filename)
+
+        # Извлекаем текст
+        return getattr(response, 'text', str(response))
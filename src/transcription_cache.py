@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import time
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("TranscriptionCache")
+
+
+class TranscriptionCache:
+    """Постоянный кэш транскрипций в SQLite.
+
+    Ключи: "doc:<id>:<access_hash>" (повтор без скачивания) и "sha:<hash>" (тот же файл под другим id).
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None):
+        self.path = path or os.path.join(Config.DATA_DIR, "transcriptions.sqlite3")
+        self.ttl = ttl if ttl is not None else Config.TRANSCRIPTION_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else Config.TRANSCRIPTION_CACHE_MAX_ENTRIES
+
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_accessed ON transcripts(accessed)")
+        self.db.commit()
+        self._evict()
+
+    @staticmethod
+    def file_key(document) -> str:
+        return f"doc:{document.id}:{document.access_hash}"
+
+    @staticmethod
+    def content_key(sha256_hex: str) -> str:
+        return f"sha:{sha256_hex}"
+
+    def get_by_file(self, document):
+        """Поиск до скачивания. Промах здесь ещё не окончательный — см. get_by_content"""
+        text = self._get(self.file_key(document))
+        if text is not None:
+            self.hits += 1
+        return text
+
+    def has_file(self, document) -> bool:
+        """Уже транскрибировано (без учёта в статистике попаданий) — для пакетного режима"""
+        row = self.db.execute(
+            "SELECT created FROM transcripts WHERE key = ?", (self.file_key(document),)
+        ).fetchone()
+        return row is not None and not (self.ttl and time.time() - row[0] > self.ttl)
+
+    def get_by_content(self, sha256_hex: str):
+        """Поиск после скачивания по хэшу содержимого (например, пересланное голосовое)"""
+        text = self._get(self.content_key(sha256_hex))
+        if text is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return text
+
+    def _get(self, key: str):
+        now = time.time()
+        row = self.db.execute(
+            "SELECT text, created FROM transcripts WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (self.ttl and now - row[1] > self.ttl):
+            return None
+        self.db.execute("UPDATE transcripts SET accessed = ? WHERE key = ?", (now, key))
+        self.db.commit()
+        return row[0]
+
+    def put(self, document, sha256_hex: str, text: str):
+        now = time.time()
+        keys = [self.file_key(document), self.content_key(sha256_hex)]
+        self.db.executemany(
+            "INSERT OR REPLACE INTO transcripts (key, text, created, accessed) VALUES (?, ?, ?, ?)",
+            [(k, text, now, now) for k in keys]
+        )
+        self.db.commit()
+        self._puts += 1
+        if self._puts % 50 == 0:
+            self._evict()
+
+    def _evict(self):
+        """Удаляет просроченные записи и самые старые сверх лимита"""
+        if self.ttl:
+            self.db.execute("DELETE FROM transcripts WHERE created < ?", (time.time() - self.ttl,))
+        if self.max_entries:
+            self.db.execute(
+                "DELETE FROM transcripts WHERE key IN ("
+                "SELECT key FROM transcripts ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        self.db.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        self.db.close()
@@ -1,61 +1,234 @@
-import io
 import asyncio
-import qrcode
+import os
 import html
+import time
 import uuid
 from telethon import TelegramClient, events, types, functions, utils, Button
 from .config import Config
-from .transcriber import MistralTranscriber
+from .accounts import Account
+from .ai_client import AIClient
+from .transcriber import MistralTranscriber, ERROR_PREFIX, is_complete
+from .transcription_cache import TranscriptionCache
+from .data_cache import DataCache, CacheEntry
+from .entity_cache import EntityCache
+from .batch import BatchStore, BatchItem, build_digest, combined_text
+from .media import SpooledMedia, download_media, extract_audio
+from .job_journal import JobJournal
+from .job_queue import open_queue, consume
+from .memory_probe import RssProbe
 from .text_fixer import MistralTextFixer
-from .summarizer import MistralSummarizer  # Не забудьте создать этот файл
-from .bot_sender import BotSender
+from .bot_sender import BotSender, DeliveryError
+from .scheduler import Scheduler
+from .reaction_filter import ReactionFilter
+from .delivery import ProgressiveMessage, split_message
+from .metrics import metrics, MetricsServer
+from .resilience import breaker_states
+from .tracing import new_trace
 from .logger import setup_logger
 
 logger = setup_logger("Userbot")
 
+# Пакетные задачи уступают интерактивным (реакциям) во всех пулах планировщика
+BATCH_PRIORITY = 1000
+
+# Итоги задачи реакции: sent — доставлено; failed — ошибка транскрипции (показана пользователю);
+# undelivered — Bot API не принял результат; error — исключение; skipped — обрабатывать нечего
+JOB_RESULTS = ("sent", "failed", "undelivered", "error", "skipped")
+
 class Userbot:
-    def __init__(self):
+    """Один аккаунт. role: all — всё в одном процессе; ingest — апдейты, кнопки и /batch,
+    задачи уходят в общую очередь; worker — только выполняет задачи из очереди"""
+
+    def __init__(self, client=None, bot_client=None, account: Account = None, queue=None, role: str = "all",
+                 metrics_port: int = None, ai: AIClient = None):
+        self._created_at = time.monotonic()
+        self.account = account or Account.default()
+        self.role = role
+        acc = self.account
+
         # Два клиента: ваш аккаунт и вспомогательный бот для кнопок
-        self.client = TelegramClient(Config.SESSION_NAME, Config.API_ID, Config.API_HASH)
-        self.bot_client = TelegramClient("bot_session", Config.API_ID, Config.API_HASH)
+        # (в бенчмарке подставляются фейковые). Воркеру апдейты и бот не нужны
+        if role == "worker":
+            self.client = client or TelegramClient(
+                acc.worker_session(), acc.api_id, acc.api_hash, receive_updates=False
+            )
+            self.bot_client = bot_client
+        else:
+            self.client = client or TelegramClient(acc.session, acc.api_id, acc.api_hash)
+            self.bot_client = bot_client or TelegramClient(acc.bot_session, acc.api_id, acc.api_hash)
+
+        # Очередь задач реакций. Своя in-memory очередь разбирается этим же процессом,
+        # общую (sqlite/redis) разбирают воркеры через job_queue.consume
+        self._own_queue = queue is None
+        self.queue = queue or open_queue("memory://")
+        self._consumer = None
         
-        # Модули ИИ
-        self.transcriber = MistralTranscriber()
-        self.fixer = MistralTextFixer()
-        self.summarizer = MistralSummarizer()
+        # Модули ИИ (один общий асинхронный клиент Mistral; при нескольких аккаунтах — на процесс).
+        # Сам SDK импортируется при первом запросе, саммари — при первой кнопке Summary
+        self._own_ai = ai is None
+        self.ai = ai or AIClient()
+        self.transcriber = MistralTranscriber(self.ai)
+        self.fixer = MistralTextFixer(self.ai)
+        self._summarizer = None
+        self.transcript_cache = TranscriptionCache(acc.data_path("transcriptions.sqlite3"))
         
-        self.bot_sender = BotSender()
+        self.bot_sender = BotSender(acc.bot_token)
+        self.scheduler = Scheduler()
+        self.reaction_filter = ReactionFilter()
+        # Названия чатов и имена отправителей: из апдейтов, с TTL
+        self.entity_cache = EntityCache()
+        self.reaction_filter.on_entity_update = self.entity_cache.on_update
+        self.metrics_server = MetricsServer(port=metrics_port)
         self.my_id = None
         
         # Общий кэш для правок текста и транскрипций (для саммари)
-        # {id: {"text": str, "peer": obj, "msg_id": int, "link": str}}
-        self.data_cache = {}
+        # {id: CacheEntry(text, link, peer, msg_id)} — LRU в памяти + SQLite
+        # Кнопки нажимают в ingest: воркер сбрасывает записи на диск почти сразу
+        self.data_cache = DataCache(
+            acc.data_path("data_cache.sqlite3"), flush_interval=0.5 if role == "worker" else None
+        )
         self.MAX_MSG_LEN = 4000
 
-    async def start(self):
-        # Авторизация Юзербота
+        # Пакетный режим (/batch): состояние в SQLite, чтобы продолжать после перезапуска
+        self.batch_store = BatchStore(acc.data_path("batch.sqlite3"))
+        self._batches = set()
+
+        # Журнал задач реакций: переживают перезапуск и продолжаются с последней стадии.
+        # При раздельных ingest/worker ту же роль играет общая очередь (задача без ack выдаётся снова)
+        self.journal = JobJournal(acc.data_path("jobs.sqlite3")) if role == "all" else None
+
+    async def start(self, started_at: float = None):
+        """started_at — time.monotonic() запуска процесса, для замера времени до готовности"""
+        me = await self.connect()
+        logger.info(f"Система запущена. Аккаунт: {me.first_name} (ID: {self.my_id}), роль: {self.role}")
+
+        # Регистрация обработчиков
+        # Предфильтр отбрасывает лишние апдейты до вызова обработчика
+        self.client.add_event_handler(self.reaction_handler, events.Raw(func=self.reaction_filter))
+        self.bot_client.add_event_handler(self.bot_callback_handler, events.CallbackQuery())
+        self.bot_client.add_event_handler(self.bot_command_handler, events.NewMessage(pattern=r"^/batch\b"))
+        self.mark_ready(started_at)
+        
+        try:
+            await self.client.run_until_disconnected()
+        finally:
+            await self.stop_services()
+
+    async def connect(self):
+        """Авторизация клиентов и запуск сервисов; обработчики апдейтов не регистрируются"""
+        # Юзербот и бот авторизуются параллельно: это два независимых MTProto-соединения
+        with metrics.timer("startup_auth"):
+            me, _ = await asyncio.gather(self._login(), self._login_bot())
+        with metrics.timer("startup_services"):
+            await self.start_services(me.id)
+        return me
+
+    async def _login(self):
         await self.client.connect()
         if not await self.client.is_user_authorized():
+            if self.role == "worker":
+                raise RuntimeError(f"Аккаунт {self.account.name}: сессия не авторизована")
             logger.info("Требуется авторизация Юзербота...")
+            # QR-вход нужен один раз — модуль грузится только тогда
+            import qrcode
             qr_login = await self.client.qr_login()
             qr = qrcode.QRCode()
             qr.add_data(qr_login.url)
             qr.make(fit=True)
             qr.print_ascii(invert=True)
             await qr_login.wait()
+        return await self.client.get_me()
 
-        # Авторизация Бота
-        await self.bot_client.start(bot_token=Config.BOT_TOKEN)
-        
-        me = await self.client.get_me()
-        self.my_id = me.id
-        logger.info(f"Система запущена. Аккаунт: {me.first_name} (ID: {self.my_id})")
+    async def _login_bot(self):
+        if self.bot_client:
+            await self.bot_client.start(bot_token=self.account.bot_token)
 
-        # Регистрация обработчиков
-        self.client.add_event_handler(self.reaction_handler, events.Raw())
-        self.bot_client.add_event_handler(self.bot_callback_handler, events.CallbackQuery())
-        
-        await self.client.run_until_disconnected()
+    def mark_ready(self, started_at: float = None):
+        """Время от запуска до готовности принимать задачи: в лог и gauge ready_seconds.
+        После этого SDK Mistral догружается в фоне"""
+        ready = time.monotonic() - (started_at or self._created_at)
+        metrics.gauge("ready_seconds", lambda: ready, "Время от запуска процесса до готовности",
+                      account=self.account.name)
+        logger.info(f"Готов к работе за {ready:.2f} сек")
+        self.ai.warm_up()
+
+    @property
+    def summarizer(self):
+        if self._summarizer is None:
+            from .summarizer import MistralSummarizer, ChunkSummaryCache
+            self._summarizer = MistralSummarizer(
+                self.ai, ChunkSummaryCache(self.account.data_path("summary_chunks.sqlite3"))
+            )
+        return self._summarizer
+
+    async def start_services(self, my_id: int):
+        """Всё, кроме Telegram-клиентов: очередь отправки, кэши, планировщик, метрики"""
+        self.my_id = my_id
+        self.reaction_filter.my_id = my_id
+        await self.bot_sender.start()
+        self.data_cache.start()
+        self.scheduler.start()
+        self._register_gauges()
+        await self.metrics_server.start()
+        if self._own_queue:
+            self._consumer = asyncio.create_task(consume(self.queue, {self.account.name: self}))
+        if self.role == "worker":
+            return
+
+        # Прерванные пакеты продолжаются с места остановки
+        for job in self.batch_store.unfinished():
+            logger.info(f"Продолжаю пакет {job.id}: осталось {len(job.pending)} из {len(job.items)}")
+            await self.scheduler.submit("jobs", BATCH_PRIORITY, lambda peer=job.peer: self._run_batch(peer))
+
+        if self.journal:
+            await self._replay_journal()
+
+    async def _replay_journal(self):
+        """Задачи, прерванные рестартом (реакция уже снята), продолжаются с последней стадии"""
+        for job in self.journal.unfinished():
+            if job.replays >= Config.JOURNAL_MAX_REPLAYS:
+                logger.warning(f"Задача {job.id}: {job.replays} перезапусков без результата, пропускаю")
+                self.journal.finish(job.id, ok=False)
+                continue
+            self.journal.replayed(job.id)
+            logger.info(f"Продолжаю задачу {job.id} (сообщение {job.msg_id}) со стадии {job.stage}")
+            await self.queue.put(self._queue_job(job.peer, job.msg_id, job.priority, job_id=job.id))
+
+    async def stop_services(self):
+        logger.info(f"Апдейты: {self.reaction_filter.stats()}")
+        if self._consumer:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+        await self.scheduler.close()
+        await self.bot_sender.close()
+        self.batch_store.close()
+        if self.journal:
+            self.journal.close()
+        if self._own_queue:
+            await self.queue.close()
+        self.transcript_cache.close()
+        if self._summarizer:
+            self._summarizer.close()
+        await self.data_cache.close()
+        if self._own_ai:
+            await self.ai.close()
+        await self.metrics_server.stop()
+
+    def _register_gauges(self):
+        # Метка account: при нескольких аккаунтах в процессе у каждого свои значения
+        acc = self.account.name
+        metrics.gauge("queue_depth", self.scheduler.depths, "Задач в очереди пула планировщика", label="pool", account=acc)
+        metrics.gauge("bot_send_queue_depth", lambda: self.bot_sender.queue_depth, "Сообщений в очереди BotSender", account=acc)
+        metrics.gauge("transcription_cache", self.transcript_cache.stats, "Кэш транскрипций: попадания/промахи", label="stat", account=acc)
+        metrics.gauge("data_cache_items", lambda: len(self.data_cache), "Записей кэша кнопок в памяти", account=acc)
+        metrics.gauge("reaction_updates", self.reaction_filter.stats, "Сырые апдейты: получено/передано", label="stat", account=acc)
+        metrics.gauge("entity_cache", self.entity_cache.stats, "Кэш сущностей: записи/попадания/промахи", label="stat", account=acc)
+        # Breaker'ы общие на процесс — без метки аккаунта
+        metrics.gauge("circuit_state", breaker_states, "Circuit breaker: 0 closed, 1 half-open, 2 open", label="endpoint")
 
     async def reaction_handler(self, event):
         """Ловит вашу реакцию-триггер на сообщениях"""
@@ -88,47 +261,119 @@ class Userbot:
                     reaction=reactions_to_keep
                 ))
             except: pass
-            
-            # Запускаем обработку в фоне
-            asyncio.create_task(self._dispatch_action(msg_event.peer_id, msg_event.id))
 
-    async def _dispatch_action(self, peer, msg_id):
-        """Определяет тип контента и вызывает нужный модуль ИИ"""
+            # Задача уходит в очередь (ждём, если она полна) вместе с сообщением из апдейта
+            # и его сущностями — исполнителю не нужно запрашивать их заново.
+            # Сначала — запись в журнал: реакция уже снята, и без неё задача пропала бы при рестарте
+            peer = utils.get_peer_id(msg_event.peer_id)
+            priority = self._job_priority(msg_event)
+            job = self.journal.queued(peer, msg_event.id, priority) if self.journal else None
+            await self.queue.put(self._queue_job(
+                peer, msg_event.id, priority, job_id=job.id if job else None,
+                message=msg_event, entities=getattr(event, "_entities", None) or {}
+            ))
+
+    def _queue_job(self, peer, msg_id, priority, job_id=None, message=None, entities=None) -> dict:
+        return {
+            "account": self.account.name, "peer": peer, "msg_id": msg_id, "priority": priority,
+            "job_id": job_id, "message": message, "entities": entities or {},
+        }
+
+    async def submit_job(self, job: dict):
+        """Задача из очереди -> пул "jobs" планировщика. Future задачи или None, если не принята"""
+        msg, entities = job.get("message"), job.get("entities") or {}
+        # Сущности, пришедшие с апдейтом, — в кэш; само сообщение в апдейте полное,
+        # поэтому привязываем его к клиенту и не запрашиваем заново
+        self.entity_cache.absorb(entities)
+        if msg is not None:
+            msg._finish_init(self.client, entities, None)
+        journal_job = self.journal.get(job["job_id"]) if self.journal and job.get("job_id") else None
+
+        peer, msg_id, priority = job["peer"], job["msg_id"], job.get("priority", 0)
+        try:
+            return await self.scheduler.submit(
+                "jobs", priority, lambda: self._dispatch_action(peer, msg_id, priority, msg, journal_job)
+            )
+        except RuntimeError as e:
+            logger.warning(f"Задача не принята: {e}")
+            return None
+
+    @staticmethod
+    def _job_priority(msg):
+        """Чем меньше, тем раньше: правки текста, затем короткие голосовые, затем кружочки"""
+        if msg.voice or msg.video_note:
+            duration = (msg.file.duration if msg.file else 0) or 0
+            if msg.video_note:
+                return 30 + duration * 2
+            return 1 + duration
+        return 0
+
+    async def _dispatch_action(self, peer, msg_id, priority=0, msg=None, job=None) -> str:
+        """Определяет тип контента и вызывает нужный модуль ИИ.
+
+        msg — сообщение из апдейта; если его нет, сообщение запрашивается по id.
+        job — запись журнала задач (стадии и артефакты для продолжения после рестарта).
+        Возвращает итог задачи (JOB_RESULTS), он же — в счётчике job_results_total.
+        """
+        trace = new_trace()
+        result = "error"
         try:
-            m = await self.client.get_messages(peer, ids=msg_id)
-            if not m: return
+            if isinstance(msg, types.Message):
+                m = msg
+            else:
+                with metrics.timer("fetch"):
+                    m = await self.client.get_messages(peer, ids=msg_id)
+            if not m:
+                if job:
+                    self.journal.finish(job.id, ok=False)
+                result = "skipped"
+                return result
 
-            if m.voice or m.video_note:
-                await self._handle_media(m)
-            elif m.text:
-                await self._handle_text_fix(m)
+            kind = "media" if (m.voice or m.video_note) else "text" if m.text else None
+            if kind:
+                logger.info(f"Задача {trace}: {kind}, сообщение {msg_id}")
+                metrics.inc("jobs_total", help_text="Задачи по типу", kind=kind)
+            ok = True
+            with metrics.timer("job"):
+                if kind == "media":
+                    ok = await self._handle_media(m, priority, job)
+                elif kind == "text":
+                    await self._handle_text_fix(m)
+            if job:
+                self.journal.finish(job.id, ok=ok)
+            result = ("sent" if ok else "failed") if kind else "skipped"
+        except DeliveryError as e:
+            # Задача остаётся в журнале: текст уже сохранён, после перезапуска отправка повторится
+            logger.error(f"Результат не доставлен: {e}")
+            result = "undelivered"
         except Exception as e:
-            logger.error(f"Ошибка диспетчера: {e}")
+            logger.error(f"Ошибка диспетчера: {e}", exc_info=True)
+            if job:
+                self.journal.finish(job.id, ok=False)
+        finally:
+            metrics.inc("job_results_total", help_text="Итоги задач реакций", result=result)
+        return result
 
-    async def _handle_media(self, m):
-        """Процесс транскрипции голосовых и кружочков"""
+    async def _handle_media(self, m, priority=0, job=None) -> bool:
+        """Процесс транскрипции голосовых и кружочков.
+
+        False — вместо текста пришла ошибка транскрипции или часть записи не распознана
+        (показано пользователю, но не кэшируется и не журналируется);
+        DeliveryError — результат не доставлен; прочие ошибки пробрасываются.
+        """
         try:
             is_video = bool(m.video_note)
             ext = "video.mp4" if is_video else "voice.ogg"
             label = "Кружочек" if is_video else "Голосовое"
             
-            chat = await m.get_chat()
-            sender = await m.get_sender()
-            chat_title = getattr(chat, 'title', 'Личные сообщения')
-            s_name = utils.get_display_name(sender) if sender else "Неизвестный"
+            with metrics.timer("entity"):
+                chat = await self.entity_cache.get(m.chat_id, m.get_chat)
+                sender = await self.entity_cache.get(m.sender_id, m.get_sender)
+            chat_title = (chat.title if chat else None) or 'Личные сообщения'
+            s_name = sender.name if sender else "Неизвестный"
             msg_link = self._get_link(chat, m.id)
 
             logger.info(f"Транскрипция {label} от {s_name}...")
-            
-            file_bytes = io.BytesIO()
-            await self.client.download_media(m, file=file_bytes)
-            
-            # Получаем текст от Mistral Audio API
-            raw_text = await self.transcriber.transcribe(file_bytes.getvalue(), ext)
-            
-            # Кэшируем для возможного саммари
-            item_id = str(uuid.uuid4())[:8]
-            self.data_cache[item_id] = {"text": raw_text, "link": msg_link}
 
             # Подготовка HTML
             header = (
@@ -137,58 +382,134 @@ class Userbot:
                 f"<b>Тип:</b> {label}\n"
                 f"--------------------\n\n"
             )
-            safe_text = html.escape(raw_text)
-            
-            # Разбивка на части если текст длинный
-            parts = []
-            if len(header + safe_text) <= self.MAX_MSG_LEN:
-                parts.append(header + safe_text)
+
+            # Повтор (та же реакция, пересланное голосовое) — без скачивания и запроса к API
+            progress = None
+            # После рестарта: текст уже получен до падения
+            raw_text = job.text if job else None
+            if raw_text is None:
+                raw_text = self.transcript_cache.get_by_file(m.document)
+            if raw_text is None:
+                # Длинную запись показываем по мере готовности кусков
+                duration = m.file.duration if m.file else None
+                if Config.PROGRESSIVE_DELIVERY and self.transcriber.is_long(duration):
+                    progress = ProgressiveMessage(self.bot_sender, self.my_id, header, self.MAX_MSG_LEN)
+                    await progress.start()
+                on_partial = (lambda t: progress.update(html.escape(t))) if progress else None
+                raw_text = await self._transcribe_message(m, is_video, ext, priority, on_partial, job)
             else:
-                first_part_limit = self.MAX_MSG_LEN - len(header)
-                parts.append(header + safe_text[:first_part_limit])
-                remaining = safe_text[first_part_limit:]
-                for i in range(0, len(remaining), self.MAX_MSG_LEN):
-                    parts.append(remaining[i : i + self.MAX_MSG_LEN])
+                logger.info("Транскрипция найдена в кэше.")
+            # Ошибка или нераспознанные куски: текст показываем, но задачу не считаем выполненной
+            ok = is_complete(raw_text)
+            if job and job.text is None and ok:
+                self.journal.transcribed(job.id, raw_text)
+            logger.info(f"Кэш транскрипций: {self.transcript_cache.stats()}")
+            
+            # Кэшируем для возможного саммари
+            item_id = str(uuid.uuid4())[:8]
+            self.data_cache.put(item_id, CacheEntry(text=raw_text, link=msg_link))
+
+            safe_text = html.escape(raw_text)
+            btns = [("🔗 Перейти", msg_link), *self._summary_buttons(item_id)]
+
+            if progress:
+                if not await progress.finish(safe_text, btns):
+                    raise DeliveryError(f"транскрипция сообщения {m.id}")
+                return ok
 
-            # Отправка
+            # Отправка; темп регулирует очередь BotSender (лимиты Bot API)
+            parts = split_message(header, safe_text, self.MAX_MSG_LEN)
             for i, part_content in enumerate(parts):
                 is_last = (i == len(parts) - 1)
-                btns = []
-                if is_last:
-                    btns = [
-                        ("🔗 Перейти", msg_link),
-                        ("📝 Summary", f"summ:{item_id}")
-                    ]
-                
-                await self.bot_sender.send_message(
+                sent = await self.bot_sender.send_message(
                     chat_id=self.my_id,
                     text=part_content,
-                    buttons=btns
+                    buttons=btns if is_last else []
                 )
-                if not is_last: await asyncio.sleep(0.4)
+                if sent is None:
+                    raise DeliveryError(f"транскрипция сообщения {m.id}, часть {i + 1}/{len(parts)}")
+            return ok
 
+        except DeliveryError:
+            raise
         except Exception as e:
             logger.error(f"Ошибка медиа: {e}", exc_info=True)
+            raise
+
+    async def _transcribe_message(self, m, is_video, ext, priority=0, on_partial=None, job=None):
+        """Потоковое скачивание -> (аудиодорожка) -> Mistral, с замером пикового RSS"""
+        async with RssProbe() as probe:
+            suffix = ".mp4" if is_video else ".ogg"
+            if job and job.media_path and os.path.exists(job.media_path):
+                # Файл скачан до рестарта и сохранён журналом
+                media = SpooledMedia.from_file(job.media_path, suffix=suffix)
+            else:
+                with metrics.timer("download"):
+                    media = await self.scheduler.run(
+                        "download", priority,
+                        lambda: download_media(self.client, m, suffix=suffix)
+                    )
+                metrics.inc("media_bytes_total", media.size, "Объём медиа", direction="download")
+                if job:
+                    job.media_path = self.journal.downloaded(job.id, media)
+            audio = None
+            try:
+                raw_text = self.transcript_cache.get_by_content(media.sha256)
+                if raw_text is not None:
+                    return raw_text
+
+                upload, name = media, ext
+                if is_video:
+                    audio = await extract_audio(media)
+                    if audio:
+                        upload, name = audio, "audio.m4a"
+
+                # Получаем текст от Mistral Audio API
+                # Длинную запись режем ffmpeg'ом по паузам — для этого нужна копия на диске
+                duration = m.file.duration if m.file else None
+                content = upload.ensure_on_disk() if self.transcriber.is_long(duration) else upload.content()
+                metrics.inc("media_bytes_total", upload.size, "Объём медиа", direction="upload")
+                with metrics.timer("transcribe"):
+                    raw_text = await self.scheduler.run(
+                        "transcribe", priority,
+                        lambda: self.transcriber.transcribe(content, name, duration, on_partial)
+                    )
+                if is_complete(raw_text):
+                    self.transcript_cache.put(m.document, media.sha256, raw_text)
+                return raw_text
+            finally:
+                media.close()
+                if audio:
+                    audio.close()
+                logger.info(
+                    f"Медиа {media.size} байт, пик RSS {probe.peak // 1024} КБ "
+                    f"(+{max(probe.delta, 0) // 1024} КБ за задачу)"
+                )
 
     async def _handle_text_fix(self, m):
-        """Процесс исправления пунктуации"""
+        """Процесс исправления пунктуации. DeliveryError — правка не доставлена"""
         try:
             original = m.text
-            fixed = await self.fixer.fix_punctuation(original)
+            with metrics.timer("fix"):
+                # No-op и повторы решаются локально, без очереди пула "fix"
+                fixed = self.fixer.try_local(original)
+                if fixed is None:
+                    fixed = await self.scheduler.run("fix", 0, lambda: self.fixer.fix_punctuation(original))
             
             if fixed.strip() == original.strip():
                 return # Нет изменений — нет сообщения
 
             item_id = str(uuid.uuid4())[:8]
-            chat = await m.get_chat()
+            with metrics.timer("entity"):
+                chat = await self.entity_cache.get(m.chat_id, m.get_chat)
             msg_link = self._get_link(chat, m.id)
 
-            self.data_cache[item_id] = {
-                "peer": m.peer_id,
-                "msg_id": m.id,
-                "text": fixed,
-                "link": msg_link
-            }
+            self.data_cache.put(item_id, CacheEntry(
+                text=fixed,
+                link=msg_link,
+                peer=utils.get_peer_id(m.peer_id),
+                msg_id=m.id
+            ))
 
             diff_msg = (
                 f"📝 <b>Коррекция пунктуации</b>\n\n"
@@ -196,13 +517,18 @@ class Userbot:
                 f"✅ <b>Стало:</b>\n<code>{html.escape(fixed)}</code>"
             )
 
-            await self.bot_sender.send_message(
+            sent = await self.bot_sender.send_message(
                 chat_id=self.my_id,
                 text=diff_msg,
                 buttons=[("Применить ✅", f"fix:{item_id}")]
             )
+            if sent is None:
+                raise DeliveryError(f"правка сообщения {m.id}")
+        except DeliveryError:
+            raise
         except Exception as e:
             logger.error(f"Ошибка фикса текста: {e}")
+            raise
 
     async def bot_callback_handler(self, event):
         """Обработка нажатий на кнопки Summary и Применить"""
@@ -214,42 +540,168 @@ class Userbot:
             cached = self.data_cache.get(item_id)
             if cached:
                 try:
-                    await self.client.edit_message(cached["peer"], cached["msg_id"], cached["text"])
+                    await self.client.edit_message(cached.peer, cached.msg_id, cached.text)
                     await event.edit(
                         "✅ <b>Сообщение отредактировано!</b>",
-                        buttons=[Button.url("🔗 Вернуться к сообщению", cached["link"])],
+                        buttons=[Button.url("🔗 Вернуться к сообщению", cached.link)],
                         parse_mode='html'
                     )
-                    del self.data_cache[item_id]
+                    self.data_cache.delete(item_id)
                 except Exception as e:
                     logger.error(f"Ошибка редактирования: {e}")
                     await event.answer("Ошибка: не удалось отредактировать.", alert=True)
             else:
                 await event.answer("Данные устарели.", alert=True)
 
-        # 2. Логика СОЗДАТЬ SUMMARY
+        # 2. Логика СОЗДАТЬ SUMMARY (summ:<id> — краткое, summ:<id>:detailed — подробное)
         elif data.startswith("summ:"):
-            item_id = data.split(":")[1]
+            _, item_id, *rest = data.split(":")
+            style = "detailed" if rest == ["detailed"] else "brief"
             cached = self.data_cache.get(item_id)
             if cached:
+                new_trace()
                 await event.answer("Генерирую Summary... 🧠")
-                summary = await self.summarizer.summarize(cached["text"])
+                with metrics.timer("summarize"):
+                    summary = await self.scheduler.run(
+                        "summary", 0, lambda: self.summarizer.summarize(cached.text, style=style)
+                    )
                 
                 safe_summary = html.escape(summary)
-                resp = f"📋 <b>Summary сообщения:</b>\n\n{safe_summary}"
+                title = "Подробное summary" if style == "detailed" else "Summary"
+                resp = f"📋 <b>{title} сообщения:</b>\n\n{safe_summary}"
                 
-                await self.bot_sender.send_message(
+                sent = await self.bot_sender.send_message(
                     chat_id=self.my_id,
                     text=resp,
-                    buttons=[("🔗 К сообщению", cached["link"])]
+                    buttons=[("🔗 К сообщению", cached.link)]
                 )
+                if sent is None:
+                    logger.error(f"Summary {item_id} не доставлено")
             else:
                 await event.answer("Текст транскрипции не найден в кэше.", alert=True)
 
-    def _get_link(self, chat, msg_id):
+    async def bot_command_handler(self, event):
+        """/batch <чат> [сколько сообщений] — все необработанные голосовые и кружочки чата одним дайджестом"""
+        if event.sender_id != self.my_id:
+            return
+        args = event.raw_text.split()[1:]
+        if not args:
+            await event.reply("Использование: /batch <@username, ссылка или id чата> [сколько последних сообщений]")
+            return
+
+        target = int(args[0]) if args[0].lstrip("-").isdigit() else args[0]
+        limit = int(args[1]) if len(args) > 1 and args[1].isdigit() else Config.BATCH_SCAN_LIMIT
+        try:
+            chat = await self.client.get_entity(target)
+        except Exception as e:
+            await event.reply(f"Чат не найден: {e}")
+            return
+
+        new_trace()
+        peer = utils.get_peer_id(chat)
+        try:
+            await self.scheduler.submit("jobs", BATCH_PRIORITY, lambda: self._run_batch(peer, chat, limit))
+        except RuntimeError as e:
+            logger.warning(f"Пакет не принят: {e}")
+
+    async def _run_batch(self, peer, chat=None, limit=None):
+        """Скан истории -> параллельная транскрипция -> один дайджест. Незавершённый пакет продолжается"""
+        if peer in self._batches:
+            await self.bot_sender.send_message(chat_id=self.my_id, text="⏳ Этот чат уже обрабатывается.")
+            return
+        self._batches.add(peer)
         try:
-            if hasattr(chat, 'username') and chat.username:
-                return f"https://t.me/{chat.username}/{msg_id}"
-            cid = str(chat.id).replace("-100", "")
-            return f"https://t.me/c/{cid}/{msg_id}"
-        except: return None
\ No newline at end of file
+            unfinished = self.batch_store.unfinished(peer)
+            job = unfinished[0] if unfinished else await self._scan_batch(peer, chat, limit or Config.BATCH_SCAN_LIMIT)
+            if job is None:
+                await self.bot_sender.send_message(chat_id=self.my_id, text="✅ Новых голосовых и кружочков нет.")
+                return
+
+            await self.bot_sender.send_message(
+                chat_id=self.my_id,
+                text=f"⏳ <b>{html.escape(job.title)}</b>: записей {len(job.items)}, "
+                     f"осталось обработать {len(job.pending)}..."
+            )
+            with metrics.timer("batch"):
+                await self._process_batch(job)
+        except Exception as e:
+            logger.error(f"Ошибка пакета: {e}", exc_info=True)
+        finally:
+            self._batches.discard(peer)
+
+    async def _scan_batch(self, peer, chat, limit):
+        """Голосовые и кружочки из последних limit сообщений, которые ещё не транскрибировались"""
+        chat = chat or peer
+        with metrics.timer("entity"):
+            info = await self.entity_cache.get(peer, lambda: self.client.get_entity(chat))
+        title = (info.title if info else None) or 'Личные сообщения'
+
+        items = []
+        async for m in self.client.iter_messages(chat, limit=limit):
+            if not (m.voice or m.video_note):
+                continue
+            if self.batch_store.is_done(peer, m.id) or self.transcript_cache.has_file(m.document):
+                continue
+            sender = await self.entity_cache.get(m.sender_id, m.get_sender)
+            items.append(BatchItem(
+                msg_id=m.id,
+                sender=sender.name if sender else "Неизвестный",
+                label="Кружочек" if m.video_note else "Голосовое",
+                link=self._get_link(info, m.id),
+                date=m.date.timestamp() if m.date else None
+            ))
+
+        logger.info(f"Пакет {title}: найдено {len(items)} записей")
+        return self.batch_store.create(peer, title, items) if items else None
+
+    async def _process_batch(self, job):
+        pending = job.pending
+        if pending:
+            messages = await self.client.get_messages(job.peer, ids=[it.msg_id for it in pending])
+            sem = asyncio.Semaphore(Config.BATCH_CONCURRENCY)
+
+            async def process(item, m):
+                async with sem:
+                    if m is None or not (m.voice or m.video_note):
+                        item.text = f"{ERROR_PREFIX}: сообщение недоступно"
+                    else:
+                        is_video = bool(m.video_note)
+                        duration = (m.file.duration if m.file else 0) or 0
+                        try:
+                            item.text = await self._transcribe_message(
+                                m, is_video, "video.mp4" if is_video else "voice.ogg", BATCH_PRIORITY + duration
+                            )
+                        except Exception as e:
+                            item.text = f"{ERROR_PREFIX}: {e}"
+                    # Каждый результат сразу на диск: при обрыве повторяются только оставшиеся
+                    self.batch_store.save(job, item)
+
+            await asyncio.gather(*(process(it, m) for it, m in zip(pending, messages)))
+
+        # Ошибки и частичные тексты показываем в дайджесте, но не помечаем разобранными — следующий /batch их повторит
+        failed = {it.msg_id for it in job.items if not is_complete(it.text or "")}
+
+        item_id = str(uuid.uuid4())[:8]
+        first_link = next((it.link for it in sorted(job.items, key=lambda i: i.msg_id) if it.link), None)
+        self.data_cache.put(item_id, CacheEntry(
+            text=combined_text([it for it in job.items if it.msg_id not in failed]), link=first_link
+        ))
+
+        parts = build_digest(job.title, job.items, self.MAX_MSG_LEN)
+        btns = self._summary_buttons(item_id)
+        for i, part in enumerate(parts):
+            is_last = (i == len(parts) - 1)
+            if await self.bot_sender.send_message(chat_id=self.my_id, text=part, buttons=btns if is_last else []) is None:
+                # Пакет остаётся незавершённым: следующий /batch этого чата отправит дайджест заново
+                raise DeliveryError(f"дайджест {job.title}, часть {i + 1}/{len(parts)}")
+
+        self.batch_store.finish(job, exclude=failed)
+        logger.info(f"Пакет {job.id}: {len(job.items)} записей, {len(parts)} сообщений, ошибок {len(failed)}")
+
+    @staticmethod
+    def _summary_buttons(item_id: str) -> list:
+        return [("📝 Summary", f"summ:{item_id}"), ("📋 Подробно", f"summ:{item_id}:detailed")]
+
+    def _get_link(self, chat, msg_id):
+        # chat — EntityInfo из кэша, префикс ссылки уже посчитан
+        return chat.link(msg_id) if chat else None
\ No newline at end of file
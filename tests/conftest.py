@@ -0,0 +1,10 @@
+import pytest
+from src import resilience
+
+
+@pytest.fixture(autouse=True)
+def fresh_policies():
+    """Policy и breaker'ы общие на процесс — каждому тесту свои"""
+    resilience._policies.clear()
+    yield
+    resilience._policies.clear()
@@ -0,0 +1,50 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from src import ai_client
+from src.ai_client import AIClient
+
+
+def _slow_import(events):
+    def import_module(name):
+        time.sleep(0.2)
+        events.append("imported")
+    return import_module
+
+
+def _stub_client(events):
+    async def complete_async(model, messages):
+        events.append("request")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ок"))])
+    return SimpleNamespace(chat=SimpleNamespace(complete_async=complete_async))
+
+
+def test_first_request_waits_for_warm_up(monkeypatch):
+    events = []
+    monkeypatch.setattr(ai_client.importlib, "import_module", _slow_import(events))
+
+    async def main():
+        ai = AIClient(api_key="test")
+        ai._client = _stub_client(events)
+        ai.warm_up()
+        # Повторный вызов (второй аккаунт в процессе) не запускает второй импорт
+        ai.warm_up()
+        result = await ai.chat("model", [])
+        await ai.close()
+        return result
+
+    assert asyncio.run(main()) == "ок"
+    assert events == ["imported", "request"]
+
+
+def test_close_cancels_pending_warm_up(monkeypatch):
+    monkeypatch.setattr(ai_client.importlib, "import_module", _slow_import([]))
+
+    async def main():
+        ai = AIClient(api_key="test")
+        ai.warm_up()
+        task = ai._warm_up
+        await ai.close()
+        return task
+
+    assert asyncio.run(main()).cancelled()
@@ -0,0 +1,60 @@
+from src.batch import BatchItem, BatchStore, build_digest, combined_text
+
+
+def _item(msg_id: int, text: str = None, sender: str = "Аня") -> BatchItem:
+    return BatchItem(msg_id, sender, "Голосовое", f"https://t.me/c/1/{msg_id}", None, text)
+
+
+def test_digest_packs_items_into_few_messages_in_order():
+    items = [_item(3, "третье"), _item(1, "первое <b>"), _item(2, "второе", sender="Боря")]
+    parts = build_digest("Чат & друзья", items, 4096)
+    assert len(parts) == 1
+    digest = parts[0]
+    assert digest.startswith("<b>Сводка чата:</b> Чат &amp; друзья\n<b>Сообщений:</b> 3\n")
+    assert digest.index("первое &lt;b&gt;") < digest.index("второе") < digest.index("третье")
+    assert '<b>Боря</b> · Голосовое · <a href="https://t.me/c/1/2">ссылка</a>' in digest
+
+
+def test_digest_splits_by_limit_and_cuts_long_item():
+    words = " ".join(["слово"] * 30)
+    items = [_item(i, words) for i in range(1, 6)] + [_item(9, "x" * 1000)]
+    parts = build_digest("Чат", items, 400)
+    assert all(len(p) <= 400 for p in parts)
+    # Блоки записей не дробятся между сообщениями, кроме одной записи длиннее лимита
+    joined = "".join(parts)
+    assert joined.count(words) == 5
+    assert joined.count("x") == 1000
+    assert len(parts) < 10
+
+
+def test_unfinished_job_resumes_with_saved_results(tmp_path):
+    path = str(tmp_path / "batch.sqlite3")
+    store = BatchStore(path)
+    job = store.create(-100, "Чат", [_item(1), _item(2), _item(3)])
+    job.items[0].text = "готово"
+    store.save(job, job.items[0])
+    store.close()
+
+    # После перезапуска транскрибируются только оставшиеся записи
+    store = BatchStore(path)
+    [resumed] = store.unfinished(-100)
+    assert resumed.id == job.id and resumed.title == "Чат"
+    assert [it.msg_id for it in resumed.pending] == [2, 3]
+    assert resumed.items[0].text == "готово"
+    assert store.unfinished(-200) == []
+    store.close()
+
+
+def test_finish_marks_done_except_failed(tmp_path):
+    store = BatchStore(str(tmp_path / "batch.sqlite3"))
+    job = store.create(-100, "Чат", [_item(1, "а"), _item(2, "❌ ошибка")])
+    store.finish(job, exclude={2})
+    assert store.unfinished() == []
+    assert store.is_done(-100, 1) and not store.is_done(-100, 2)
+    assert not store.is_done(-200, 1)
+    store.close()
+
+
+def test_combined_text_skips_empty_items():
+    items = [_item(2, "мир", sender="Боря"), _item(1, "привет"), _item(3)]
+    assert combined_text(items) == "Аня: привет\n\nБоря: мир"
@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import logging
+from bench import benchmark
+from src.config import Config
+
+
+def _args(**overrides):
+    args = dict(jobs=20, rate=0, noise=2, voice_share=0.6, video_share=0.2, rpc_latency=0.0,
+                download_errors=0.0, mistral_latency=0.01, mistral_errors=0.0, mistral_flood=0.0,
+                bot_latency=0.0, bot_flood=0.0, seed=1)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_check_flags_failures_and_slow_p99():
+    report = {"jobs": 10, "failed_jobs": 1, "results": {}, "latency_p99_sec": 3.0}
+    assert len(benchmark.check(report)) == 1
+    assert benchmark.check(report, max_failures=0.1) == []
+    assert len(benchmark.check(report, max_failures=0.1, max_p99=2.0)) == 1
+
+
+def test_offline_run_delivers_every_job(monkeypatch):
+    # run() перенастраивает Config под фейковые сервисы — после теста всё возвращается
+    for key in ("BOT_API_URL", "MISTRAL_SERVER_URL", "MISTRAL_API_KEY", "BOT_TOKEN",
+                "BOT_CHAT_RATE", "METRICS_PORT", "DATA_DIR"):
+        monkeypatch.setattr(Config, key, getattr(Config, key))
+    logging.disable(logging.CRITICAL)
+    try:
+        report = asyncio.run(benchmark.run(_args()))
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert benchmark.check(report) == []
+    assert report["results"]["sent"] + report["results"]["skipped"] == 20
@@ -0,0 +1,100 @@
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from src.bot_sender import BotSender, RateLimiter
+from src.config import Config
+from bench.fake_bot_api import FakeBotAPI
+
+
+class FloodFirst(FakeBotAPI):
+    """Первый запрос получает 429 с retry_after, остальные проходят"""
+
+    async def _handle(self, request):
+        self.flood_rate = 0.0 if self.requests else 1.0
+        return await super()._handle(request)
+
+
+@pytest.fixture
+def bot_config(monkeypatch):
+    monkeypatch.setattr(Config, "BOT_GLOBAL_RATE", 0)
+    monkeypatch.setattr(Config, "BOT_CHAT_RATE", 0)
+    monkeypatch.setattr(Config, "RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(Config, "BOT_RETRY_ATTEMPTS", 3)
+
+
+async def _with_api(api, fn):
+    url = await api.start()
+    sender = BotSender("test")
+    sender.base_url = f"{url}/bottest"
+    try:
+        return await fn(sender)
+    finally:
+        await sender.close()
+        await api.stop()
+
+
+def test_global_rate_spaces_requests():
+    limiter = RateLimiter(global_rate=10, chat_rate=0, chat_burst=1)
+    assert limiter.delay(1) == 0
+    limiter.consume(1)
+    assert limiter.delay(2) == pytest.approx(0.1, abs=0.01)
+
+
+def test_chat_bucket_allows_burst_then_waits():
+    limiter = RateLimiter(global_rate=0, chat_rate=1, chat_burst=3)
+    for _ in range(3):
+        assert limiter.delay(1) == 0
+        limiter.consume(1)
+    assert limiter.delay(1) == pytest.approx(1.0, abs=0.01)
+    # У другого чата своя корзина
+    assert limiter.delay(2) == 0
+
+
+def test_pause_after_429_applies_to_all_chats():
+    limiter = RateLimiter(global_rate=0, chat_rate=0, chat_burst=1)
+    limiter.pause(1, 2)
+    assert limiter.delay(1) == pytest.approx(2, abs=0.01)
+    assert limiter.delay(2) == pytest.approx(2, abs=0.01)
+
+
+def test_429_waits_retry_after_and_resends(bot_config):
+    api = FloodFirst(retry_after=1)
+
+    async def run(sender):
+        started = time.monotonic()
+        result = await sender.send_message(1, "привет")
+        return result, time.monotonic() - started
+
+    result, elapsed = asyncio.run(_with_api(api, run))
+    assert result["text"] == "привет"
+    assert [m for m, _ in api.requests] == ["sendMessage", "sendMessage"]
+    assert elapsed >= 1
+
+
+def test_failed_send_returns_none_without_stalling_other_messages(bot_config, monkeypatch):
+    monkeypatch.setattr(Config, "RETRY_BASE_DELAY", 0.3)
+    api = FakeBotAPI()
+    send = api._m_sendMessage
+
+    def fail_bad(payload):
+        if payload["text"] == "bad":
+            return web.json_response({"ok": False, "error_code": 500, "description": "boom"}, status=500)
+        return send(payload)
+
+    api._m_sendMessage = fail_bad
+
+    async def run(sender):
+        async def timed(text):
+            result = await sender.send_message(1, text)
+            return result, time.monotonic()
+
+        started = time.monotonic()
+        bad, good = await asyncio.gather(timed("bad"), timed("good"))
+        return bad, good, started
+
+    (bad, bad_at), (good, good_at), started = asyncio.run(_with_api(api, run))
+    assert bad is None
+    assert good["text"] == "good"
+    # Повторы "bad" идут через очередь с паузой и не задерживают следующее сообщение
+    assert good_at - started < 0.3 < bad_at - started
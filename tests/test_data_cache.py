@@ -0,0 +1,46 @@
+import time
+from src.data_cache import CacheEntry, DataCache
+
+
+def _cache(tmp_path, **kwargs):
+    kwargs.setdefault("max_items", 2)
+    kwargs.setdefault("ttl", 0)
+    return DataCache(str(tmp_path / "data_cache.sqlite3"), flush_interval=60, **kwargs)
+
+
+def test_lru_eviction_keeps_evicted_entries_readable(tmp_path):
+    cache = _cache(tmp_path)
+    for key in ("a", "b", "c"):
+        cache.put(key, CacheEntry(text=key))
+    assert len(cache) == 2
+    # "a" вытеснена из памяти, но ещё не записана — читается из очереди записи
+    assert cache.get("a").text == "a"
+    assert len(cache) == 2
+    cache.flush()
+    cache.db.close()
+
+
+def test_entries_survive_reopen(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("a", CacheEntry(text="текст", link="https://t.me/c/1/2", peer=-100123, msg_id=2))
+    cache.put("b", CacheEntry(text="удалить"))
+    cache.flush()
+    cache.delete("b")
+    cache.flush()
+    cache.db.close()
+
+    reopened = _cache(tmp_path)
+    entry = reopened.get("a")
+    assert (entry.text, entry.link, entry.peer, entry.msg_id) == ("текст", "https://t.me/c/1/2", -100123, 2)
+    assert reopened.get("b") is None
+    reopened.db.close()
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = _cache(tmp_path, ttl=60)
+    cache.put("old", CacheEntry(text="old", created=time.time() - 120))
+    cache.put("new", CacheEntry(text="new"))
+    assert cache.get("old") is None
+    assert cache.get("new").text == "new"
+    cache.flush()
+    cache.db.close()
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from aiohttp import web
+from src.bot_sender import BotSender
+from src.config import Config
+from src.delivery import PROGRESS_MARK, ProgressiveMessage, split_message
+from bench.fake_bot_api import FakeBotAPI
+
+HEADER = "<b>Чат:</b> тест\n\n"
+
+
+@pytest.fixture(autouse=True)
+def bot_config(monkeypatch):
+    monkeypatch.setattr(Config, "BOT_GLOBAL_RATE", 0)
+    monkeypatch.setattr(Config, "BOT_CHAT_RATE", 0)
+    monkeypatch.setattr(Config, "RETRY_BASE_DELAY", 0.01)
+
+
+async def _with_api(api, fn):
+    url = await api.start()
+    sender = BotSender("test")
+    sender.base_url = f"{url}/bottest"
+    try:
+        return await fn(sender)
+    finally:
+        await sender.close()
+        await api.stop()
+
+
+def _methods(api) -> list:
+    return [method for method, _ in api.requests]
+
+
+def test_split_message_keeps_header_in_first_part():
+    parts = split_message("H:", "a" * 25, 10)
+    assert parts == ["H:" + "a" * 8, "a" * 10, "a" * 7]
+    assert split_message("H:", "abc", 10) == ["H:abc"]
+
+
+def test_frequent_updates_are_coalesced():
+    api = FakeBotAPI()
+
+    async def run(sender):
+        progress = ProgressiveMessage(sender, 1, HEADER, 4096, interval=0.2)
+        await progress.start()
+        for i in range(20):
+            progress.update(f"кусок {i}")
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.3)
+        # После паузы на экране — самый свежий частичный текст
+        assert api.messages[(1, 1)] == HEADER + "кусок 19" + PROGRESS_MARK
+        return await progress.finish("готово", [("🔗 Перейти", "https://t.me/c/1/2")])
+
+    assert asyncio.run(_with_api(api, run))
+    methods = _methods(api)
+    assert methods[0] == "sendMessage" and methods.count("sendMessage") == 1
+    # 20 частичных текстов за 0.2 сек — не больше трёх правок, плюс итоговая
+    assert 2 <= methods.count("editMessageText") <= 4
+    assert api.messages[(1, 1)] == HEADER + "готово"
+    assert api.requests[-1][1]["reply_markup"]
+
+
+def test_finish_sends_continuations_with_buttons_on_last_part():
+    api = FakeBotAPI()
+    text = "слово " * 60
+
+    async def run(sender):
+        progress = ProgressiveMessage(sender, 1, HEADER, 150, interval=0)
+        await progress.start()
+        return await progress.finish(text, [("🔗 Перейти", "https://t.me/c/1/2")])
+
+    assert asyncio.run(_with_api(api, run))
+    parts = split_message(HEADER, text, 150)
+    assert [api.messages[(1, i + 1)] for i in range(len(parts))] == parts
+    sends = [payload for method, payload in api.requests if method == "sendMessage"]
+    assert len(sends) == len(parts)
+    assert "reply_markup" in sends[-1] and all("reply_markup" not in p for p in sends[1:-1])
+
+
+def test_finish_reports_failed_edit():
+    class EditFails(FakeBotAPI):
+        def _m_editMessageText(self, payload):
+            return web.json_response({"ok": False, "error_code": 400, "description": "Bad Request"}, status=400)
+
+    api = EditFails()
+
+    async def run(sender):
+        progress = ProgressiveMessage(sender, 1, HEADER, 4096, interval=0)
+        await progress.start()
+        return await progress.finish("готово")
+
+    assert asyncio.run(_with_api(api, run)) is False
@@ -0,0 +1,186 @@
+"""Ingest и воркеры-процессы на общей SQLite-очереди: фейковые Telegram, Bot API и Mistral, без сети"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sqlite3
+import time
+import pytest
+from src.accounts import Account
+from src.config import Config
+from bench.fake_bot_api import FakeBotAPI
+from bench.fake_mistral_api import FakeMistralAPI
+from bench.fake_telegram import FakeTelegramClient
+from src import deployment
+from src.deployment import _worker_metrics_port
+from src.job_queue import SQLiteQueue, consume
+from src.userbot import Userbot
+
+JOBS = 20
+# Короткая аренда: задачи убитого воркера быстро достаются оставшемуся
+LEASE = 5.0
+
+
+def _account(data_dir: str) -> Account:
+    return Account("bench", 0, "", "bench", "bench", data_dir)
+
+
+def _worker(settings: dict, queue_path: str, done, handled):
+    """Процесс-воркер: настоящие Userbot, планировщик и SQLite-очередь, фейковый Telegram"""
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    logging.disable(logging.CRITICAL)
+
+    async def main():
+        queue = SQLiteQueue(queue_path, lease=LEASE, poll_interval=0.05)
+        bot = Userbot(client=FakeTelegramClient(rpc_latency=0.01), account=_account(settings["DATA_DIR"]),
+                      queue=queue, role="worker", metrics_port=0)
+        dispatch = bot._dispatch_action
+
+        async def counted(*args):
+            result = await dispatch(*args)
+            with handled.get_lock():
+                handled.value += 1
+            return result
+
+        bot._dispatch_action = counted
+        await bot.start_services(bot.client.my_id)
+        bot.mark_ready()
+        consumer = asyncio.create_task(consume(queue, {"bench": bot}))
+        # Опрос, а не done.wait(): set() у multiprocessing.Event зависает, если ждавший процесс убит
+        while not done.is_set():
+            await asyncio.sleep(0.1)
+        consumer.cancel()
+        await bot.stop_services()
+        await queue.close()
+
+    asyncio.run(main())
+
+
+def _pending(queue_path: str) -> int:
+    db = sqlite3.connect(queue_path)
+    try:
+        return db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    finally:
+        db.close()
+
+
+async def _run(tmp_path) -> tuple:
+    bot_api = FakeBotAPI(latency=0.01, retry_after=0)
+    mistral = FakeMistralAPI(latency=0.05)
+    settings = {
+        "BOT_API_URL": await bot_api.start(),
+        "MISTRAL_SERVER_URL": await mistral.start(),
+        "MISTRAL_API_KEY": "bench",
+        "BOT_TOKEN": "bench",
+        "BOT_CHAT_RATE": 0,
+        "METRICS_PORT": 0,
+        "DATA_DIR": str(tmp_path),
+    }
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    queue_path = os.path.join(tmp_path, "queue.sqlite3")
+
+    # Ingest — в этом процессе: фильтр апдейтов, снятие реакции, постановка в очередь
+    client = FakeTelegramClient(rpc_latency=0)
+    ingest = Userbot(client=client, bot_client=object(), account=_account(str(tmp_path)),
+                     queue=SQLiteQueue(queue_path), role="ingest", metrics_port=0)
+    await ingest.start_services(client.my_id)
+
+    ctx = multiprocessing.get_context("spawn")
+    done = ctx.Event()
+    counters = [ctx.Value("i", 0) for _ in range(2)]
+    workers = [
+        ctx.Process(target=_worker, args=(settings, queue_path, done, counters[i]), name=f"worker-{i}")
+        for i in range(2)
+    ]
+    for p in workers:
+        p.start()
+
+    user = client.add_user("Пользователь")
+    titles = [f"Чат {i}" for i in range(JOBS)]
+    for title in titles:
+        update = client.add_message(client.add_chat(title), user, "voice", duration=5)
+        if ingest.reaction_filter(update):
+            await ingest.reaction_handler(update)
+
+    killed = False
+    deadline = time.monotonic() + 90
+    try:
+        # Готово, когда все задачи подтверждены: ack удаляет их из очереди
+        while _pending(queue_path):
+            assert time.monotonic() < deadline, f"в очереди осталось {_pending(queue_path)} задач"
+            if not killed and counters[0].value >= 2:
+                workers[0].kill()
+                killed = True
+            await asyncio.sleep(0.1)
+    finally:
+        done.set()
+        for p in workers:
+            p.join(timeout=30)
+            if p.is_alive():
+                p.kill()
+        await ingest.stop_services()
+        await bot_api.stop()
+        await mistral.stop()
+
+    sent = [payload["text"] for method, payload in bot_api.requests if method == "sendMessage"]
+    return killed, titles, sent, counters[1].value
+
+
+def test_jobs_of_killed_worker_are_delivered_again(tmp_path, monkeypatch):
+    for key in ("BOT_API_URL", "MISTRAL_SERVER_URL", "MISTRAL_API_KEY", "BOT_TOKEN",
+                "BOT_CHAT_RATE", "METRICS_PORT", "DATA_DIR"):
+        monkeypatch.setattr(Config, key, getattr(Config, key))
+
+    killed, titles, sent, survivor_handled = asyncio.run(_run(tmp_path))
+
+    assert killed
+    # Каждая задача доставлена хотя бы раз, включая взятые убитым воркером
+    for title in titles:
+        assert any(f"<b>Чат:</b> {title}\n" in text for text in sent), title
+    assert survivor_handled > 0
+
+
+def test_worker_metrics_ports_skip_ingest_port(monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_PORT", 9108)
+    assert [_worker_metrics_port(i) for i in range(3)] == [9109, 9110, 9111]
+
+    monkeypatch.setattr(Config, "METRICS_PORT", 0)
+    assert _worker_metrics_port(0) == 0
+
+
+class _StubBot:
+    """Вместо Userbot: start, как настоящий, закрывает сервисы в finally"""
+
+    def __init__(self, account, **kwargs):
+        self.stopped = False
+        self.client = self
+        self.connected = True
+        _StubBot.created.append(self)
+
+    async def start(self, started_at=None):
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.stopped = True
+
+    async def disconnect(self):
+        self.connected = False
+
+
+def test_sigterm_stops_services_and_disconnects(tmp_path, monkeypatch):
+    _StubBot.created = []
+    monkeypatch.setattr(deployment, "Userbot", _StubBot)
+
+    async def main():
+        task = asyncio.create_task(deployment.run("all", "memory://", accounts=[_account(str(tmp_path))]))
+        await asyncio.sleep(0.1)
+        os.kill(os.getpid(), signal.SIGTERM)
+        # run завершается штатно, без CancelledError
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(main())
+    [bot] = _StubBot.created
+    assert bot.stopped and not bot.connected
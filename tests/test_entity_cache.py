@@ -0,0 +1,90 @@
+import asyncio
+from telethon import types, utils
+from src.entity_cache import EntityCache
+
+CHANNEL_ID = utils.get_peer_id(types.PeerChannel(1234))
+
+
+def _user(uid: int, name: str, **kwargs):
+    return types.User(id=uid, first_name=name, **kwargs)
+
+
+def _channel(title: str, username: str = None):
+    return types.Channel(id=1234, title=title, photo=types.ChatPhotoEmpty(), date=None, username=username)
+
+
+class _Fetch:
+    """Вместо m.get_chat / m.get_sender: считает обращения к Telegram"""
+
+    def __init__(self, entity):
+        self.entity = entity
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.entity
+
+
+def test_miss_fetches_once_then_hits():
+    async def main():
+        cache = EntityCache(ttl=60, max_items=10)
+        fetch = _Fetch(_channel("Чат", username="chat"))
+        first = await cache.get(CHANNEL_ID, fetch)
+        second = await cache.get(CHANNEL_ID, fetch)
+        return cache, fetch, first, second
+
+    cache, fetch, first, second = asyncio.run(main())
+    assert fetch.calls == 1 and first is second
+    assert (first.title, first.link(5)) == ("Чат", "https://t.me/chat/5")
+    assert cache.stats() == {"items": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_expired_entry_is_fetched_again():
+    async def main():
+        cache = EntityCache(ttl=0, max_items=10)
+        fetch = _Fetch(_user(1, "Аня"))
+        await cache.get(1, fetch)
+        await cache.get(1, fetch)
+        return fetch.calls
+
+    assert asyncio.run(main()) == 2
+
+
+def test_lru_evicts_least_recently_used():
+    async def main():
+        cache = EntityCache(ttl=60, max_items=2)
+        cache.absorb({1: _user(1, "Аня"), 2: _user(2, "Боря")})
+        # Обращение к 1 делает её свежей: вытесняется 2
+        await cache.get(1, _Fetch(None))
+        cache.absorb({3: _user(3, "Вера")})
+        fetch = _Fetch(_user(2, "Боря"))
+        await cache.get(2, fetch)
+        return cache, fetch.calls
+
+    cache, calls = asyncio.run(main())
+    assert calls == 1 and len(cache) == 2
+
+
+def test_min_entity_does_not_replace_full_one():
+    async def main():
+        cache = EntityCache(ttl=60, max_items=10)
+        cache.absorb({1: _user(1, "Аня", username="anya")})
+        cache.absorb({1: _user(1, "Аня", min=True)})
+        return await cache.get(1, _Fetch(None))
+
+    assert asyncio.run(main()).username == "anya"
+
+
+def test_name_change_updates_drop_entries():
+    async def main():
+        cache = EntityCache(ttl=60, max_items=10)
+        cache.absorb({1: _user(1, "Аня"), CHANNEL_ID: _channel("Старое")})
+        cache.on_update(types.UpdateUserName(user_id=1, first_name="Анна", last_name="", usernames=[]))
+        cache.on_update(types.UpdateChannel(channel_id=1234))
+        user_fetch, chat_fetch = _Fetch(_user(1, "Анна")), _Fetch(_channel("Новое"))
+        user = await cache.get(1, user_fetch)
+        chat = await cache.get(CHANNEL_ID, chat_fetch)
+        return user, chat, user_fetch.calls + chat_fetch.calls
+
+    user, chat, calls = asyncio.run(main())
+    assert (user.name, chat.title, calls) == ("Анна", "Новое", 2)
@@ -0,0 +1,60 @@
+import os
+from src.job_journal import DOWNLOADED, TRANSCRIBED, JobJournal
+from src.media import SpooledMedia
+
+
+def _journal(tmp_path, compact_every=100):
+    return JobJournal(str(tmp_path / "jobs.sqlite3"), compact_every=compact_every)
+
+
+def test_fold_tracks_last_stage_and_artifacts():
+    rows = [
+        ("a", "queued", '{"peer": 1, "msg_id": 10, "priority": 5}'),
+        ("b", "queued", '{"peer": 2, "msg_id": 20}'),
+        ("a", "downloaded", '{"path": "/tmp/a.ogg", "sha256": "x"}'),
+        ("a", "replay", None),
+        ("a", "transcribed", '{"text": "привет"}'),
+        ("b", "sent", None),
+        # Запись без queued (задача удалена компактизацией) игнорируется
+        ("c", "transcribed", '{"text": "?"}'),
+    ]
+    jobs = JobJournal._fold(rows)
+    assert list(jobs) == ["a"]
+    job = jobs["a"]
+    assert (job.peer, job.msg_id, job.priority) == (1, 10, 5)
+    assert (job.stage, job.media_path, job.text, job.replays) == (TRANSCRIBED, "/tmp/a.ogg", "привет", 1)
+
+
+def test_unfinished_survives_reopen(tmp_path):
+    journal = _journal(tmp_path)
+    done = journal.queued(1, 10)
+    pending = journal.queued(1, 11, priority=3)
+    journal.transcribed(pending.id, "текст")
+    journal.finish(done.id)
+    journal.db.close()
+
+    reopened = _journal(tmp_path)
+    [job] = reopened.unfinished()
+    assert (job.id, job.msg_id, job.priority, job.text) == (pending.id, 11, 3, "текст")
+    assert reopened.get(done.id) is None
+    reopened.close()
+
+
+def test_compaction_removes_finished_jobs_and_artifacts(tmp_path):
+    journal = _journal(tmp_path, compact_every=2)
+    source = tmp_path / "voice.ogg"
+    source.write_bytes(b"\0" * 100)
+
+    first = journal.queued(1, 10)
+    media = SpooledMedia.from_file(str(source), suffix=".ogg")
+    path = journal.downloaded(first.id, media)
+    assert journal.get(first.id).stage == DOWNLOADED
+    journal.finish(first.id)
+    # Одна завершённая задача — до порога compact_every ещё далеко
+    assert os.path.exists(path)
+
+    second = journal.queued(1, 11)
+    journal.finish(second.id, ok=False)
+    assert not os.path.exists(path)
+    assert journal.db.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0
+    journal.close()
@@ -0,0 +1,60 @@
+"""consume поверх SQLite-очереди: подтверждение задач по итогу обработки"""
+import asyncio
+from src.job_queue import SQLiteQueue, consume
+
+
+class _Target:
+    """Вместо Userbot: каждая задача сразу завершается итогом из job["result"]"""
+
+    def __init__(self):
+        self.seen = []
+
+    async def submit_job(self, job):
+        self.seen.append(job["msg_id"])
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(job["result"])
+        return future
+
+
+def _remaining(queue) -> list:
+    return [row[0] for row in queue.db.execute("SELECT id FROM jobs ORDER BY id")]
+
+
+def test_undelivered_and_failed_jobs_are_not_acked(tmp_path):
+    async def main():
+        queue = SQLiteQueue(str(tmp_path / "queue.sqlite3"), lease=0.3, poll_interval=0.02)
+        for msg_id, result in enumerate(("sent", "undelivered", "error", "failed", "skipped")):
+            await queue.put({"account": "a", "peer": 1, "msg_id": msg_id, "result": result})
+        target = _Target()
+        task = asyncio.create_task(consume(queue, {"a": target}, prefetch=5))
+        try:
+            await asyncio.sleep(0.2)
+            # Подтверждены все, кроме undelivered и error
+            assert _remaining(queue) == [2, 3]
+
+            # После аренды их получает следующий воркер
+            await asyncio.sleep(0.4)
+            assert target.seen.count(1) >= 2 and target.seen.count(2) >= 2
+            assert target.seen.count(0) == 1
+        finally:
+            task.cancel()
+            await queue.close()
+
+    asyncio.run(main())
+
+
+def test_job_is_dropped_after_max_attempts(tmp_path):
+    async def main():
+        queue = SQLiteQueue(str(tmp_path / "queue.sqlite3"), lease=0.05, poll_interval=0.01, max_attempts=3)
+        await queue.put({"account": "a", "peer": 1, "msg_id": 7, "result": "error"})
+        target = _Target()
+        task = asyncio.create_task(consume(queue, {"a": target}))
+        try:
+            await asyncio.sleep(0.5)
+            assert target.seen == [7, 7, 7]
+            assert _remaining(queue) == []
+        finally:
+            task.cancel()
+            await queue.close()
+
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+import asyncio
+from bench.long_audio_check import StubSegmentBackend
+from src.long_audio import FAILED_SEGMENT_TEXT, LongAudioTranscriber, PartialTranscript, merge_texts, plan_segments
+from src.resilience import TransientError
+from src.transcriber import is_complete
+
+
+def test_short_record_is_one_segment():
+    segments = plan_segments(100, [], target=120, overlap=2)
+    assert [(s.start, s.end) for s in segments] == [(0.0, 100)]
+
+
+def test_cut_goes_to_nearest_silence_with_overlap():
+    segments = plan_segments(300, [(110, 112), (125, 127), (240, 242)], target=120, overlap=2)
+    # Идеальная точка 120: ближайшая пауза — середина (125, 127)
+    assert segments[0].end == 128
+    assert segments[1].start == 124
+    assert segments[-1].end == 300
+    assert [s.index for s in segments] == list(range(len(segments)))
+
+
+def test_cut_by_time_without_silences():
+    segments = plan_segments(600, [], target=120, overlap=0)
+    # Последний кусок может быть длиннее target (до target + search), но не дробится
+    assert [s.end for s in segments] == [120, 240, 360, 480, 600]
+
+
+def test_merge_removes_overlap():
+    assert merge_texts(["раз два три четыре", "три четыре пять шесть"]) == "раз два три четыре пять шесть"
+
+
+def test_merge_ignores_case_punctuation_and_cut_edge_words():
+    merged = merge_texts(["один два три, четыре пя", "Три четыре. пять шесть"])
+    assert merged == "один два три, четыре пять шесть"
+
+
+def test_merge_without_match_concatenates():
+    assert merge_texts(["раз два", "три четыре"]) == "раз два три четыре"
+
+
+def test_transcribe_reassembles_in_order():
+    silences = [(t, t + 0.8) for t in range(37, 900, 37)]
+    lat = LongAudioTranscriber(StubSegmentBackend(latency=0), fanout=4, segment_len=120, overlap=2)
+    text = asyncio.run(lat.transcribe("stub", 900, silences=silences))
+    assert text == " ".join(f"w{t}" for t in range(900))
+
+
+class FailingBackend:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    async def transcribe_segment(self, path, segment):
+        if segment.index == 0:
+            self.calls += 1
+            raise self.error
+        return f"кусок{segment.index}"
+
+
+def test_segment_retried_only_on_transient_errors():
+    for error, calls in ((TransientError(503), 2), (ValueError("400 Bad Request"), 1)):
+        backend = FailingBackend(error)
+        lat = LongAudioTranscriber(backend, retries=1, segment_len=120, overlap=0, backoff=0)
+        text = asyncio.run(lat.transcribe("stub", 200, silences=[]))
+        assert text == f"{FAILED_SEGMENT_TEXT} кусок1"
+        assert backend.calls == calls
+
+
+def test_failed_segment_marks_transcript_partial():
+    lat = LongAudioTranscriber(FailingBackend(TransientError(503)), retries=0, segment_len=120, overlap=0)
+    text = asyncio.run(lat.transcribe("stub", 200, silences=[]))
+    assert isinstance(text, PartialTranscript)
+    assert (text.failed, text.total) == (1, 2)
+    assert not is_complete(text)
+
+    full = asyncio.run(LongAudioTranscriber(StubSegmentBackend(latency=0), segment_len=120).transcribe(
+        "stub", 200, silences=[]
+    ))
+    assert not isinstance(full, PartialTranscript) and is_complete(full)
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import os
+from types import SimpleNamespace
+import pytest
+from src.config import Config
+from src.media import SpooledMedia, download_media
+
+
+@pytest.fixture(autouse=True)
+def tmp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TMP_DIR", str(tmp_path))
+    return tmp_path
+
+
+CHUNKS = [b"a" * 40, b"b" * 40, b"c" * 40]
+DATA = b"".join(CHUNKS)
+
+
+def _spooled(max_memory: int) -> SpooledMedia:
+    media = SpooledMedia(max_memory=max_memory, suffix=".ogg")
+    for chunk in CHUNKS:
+        media.write(chunk)
+    media.finish()
+    return media
+
+
+def test_small_file_stays_in_memory():
+    media = _spooled(max_memory=1000)
+    assert media.path is None
+    assert media.content() == DATA
+    assert media.size == len(DATA)
+    assert media.sha256 == hashlib.sha256(DATA).hexdigest()
+    media.close()
+
+
+def test_large_file_spills_to_disk_and_is_removed_on_close():
+    media = _spooled(max_memory=50)
+    path = media.content()
+    assert path == media.path and path.endswith(".ogg")
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert media.sha256 == hashlib.sha256(DATA).hexdigest()
+    media.close()
+    assert not os.path.exists(path)
+
+
+def test_ensure_on_disk_writes_memory_buffer():
+    media = _spooled(max_memory=1000)
+    path = media.ensure_on_disk()
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    media.close()
+    assert not os.path.exists(path)
+
+
+def test_from_file_hashes_and_keeps_foreign_file(tmp_dir):
+    path = tmp_dir / "voice.ogg"
+    path.write_bytes(DATA)
+    media = SpooledMedia.from_file(str(path))
+    assert (media.size, media.sha256) == (len(DATA), hashlib.sha256(DATA).hexdigest())
+    media.close()
+    # Файл журнала задач не удаляется
+    assert path.exists()
+
+
+def test_download_media_streams_chunks():
+    class Client:
+        async def iter_download(self, media, request_size):
+            for chunk in CHUNKS:
+                yield chunk
+
+    async def main():
+        return await download_media(Client(), SimpleNamespace(media=None))
+
+    media = asyncio.run(main())
+    assert media.content() == DATA
+    assert media.sha256 == hashlib.sha256(DATA).hexdigest()
+    media.close()
@@ -0,0 +1,61 @@
+import pytest
+from src.metrics import Metrics
+
+
+def _samples(text: str) -> dict:
+    """{имя{метки}: значение} без строк HELP/TYPE"""
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_counter_and_gauge_exposition():
+    m = Metrics()
+    m.inc("jobs_total", help_text="Задачи по типу", kind="media")
+    m.inc("jobs_total", 2, kind="text")
+    m.inc("jobs_total", kind="media")
+    m.gauge("queue_depth", lambda: {"jobs": 3, "fix": 0}, "Очереди", label="pool", account="a")
+    m.gauge("queue_depth", lambda: {"jobs": 1}, label="pool", account="b")
+    m.gauge("uptime", lambda: 12.5)
+
+    text = m.render()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert lines[:2] == ["# HELP jobs_total Задачи по типу", "# TYPE jobs_total counter"]
+    # Без текста подсказки HELP повторяет имя
+    assert "# HELP uptime uptime" in lines and "# TYPE queue_depth gauge" in lines
+    assert _samples(text) == {
+        'jobs_total{kind="media"}': "2",
+        'jobs_total{kind="text"}': "2",
+        'queue_depth{account="a",pool="jobs"}': "3",
+        'queue_depth{account="a",pool="fix"}': "0",
+        'queue_depth{account="b",pool="jobs"}': "1",
+        "uptime": "12.5",
+    }
+
+
+def test_histogram_buckets_are_cumulative():
+    m = Metrics()
+    for value in (0.01, 0.3, 0.3, 400):
+        m.observe("stage_seconds", value, "Длительность стадий", stage="transcribe")
+
+    samples = _samples(m.render())
+    assert samples['stage_seconds_bucket{stage="transcribe",le="0.05"}'] == "1"
+    assert samples['stage_seconds_bucket{stage="transcribe",le="0.5"}'] == "3"
+    assert samples['stage_seconds_bucket{stage="transcribe",le="300"}'] == "3"
+    assert samples['stage_seconds_bucket{stage="transcribe",le="+Inf"}'] == "4"
+    assert samples['stage_seconds_count{stage="transcribe"}'] == "4"
+    assert float(samples['stage_seconds_sum{stage="transcribe"}']) == pytest.approx(400.61)
+
+
+def test_failing_gauge_is_skipped():
+    m = Metrics()
+    m.gauge("broken", lambda: 1 / 0)
+    m.inc("ok_total")
+    samples = _samples(m.render())
+    assert samples == {"ok_total": "1"}
+
+
+def test_timer_observes_stage():
+    m = Metrics()
+    with m.timer("fetch"):
+        pass
+    assert _samples(m.render())['stage_seconds_count{stage="fetch"}'] == "1"
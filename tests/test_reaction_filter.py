@@ -0,0 +1,65 @@
+import datetime
+from telethon import types
+from src.config import Config
+from src.reaction_filter import ReactionFilter
+
+ME = 42
+OTHER = 7
+
+
+def _edit(msg_id: int = 1, *reactors, channel: int = 100):
+    """Правка сообщения с реакциями: reactors — [(user_id, emoji)]"""
+    date = datetime.datetime.now()
+    reactions = types.MessageReactions(results=[], recent_reactions=[
+        types.MessagePeerReaction(peer_id=types.PeerUser(uid), date=date, reaction=types.ReactionEmoji(emoticon=e))
+        for uid, e in reactors
+    ]) if reactors else None
+    msg = types.Message(id=msg_id, peer_id=types.PeerChannel(channel), date=date, message="", reactions=reactions)
+    return types.UpdateEditChannelMessage(message=msg, pts=1, pts_count=1)
+
+
+def _filter() -> ReactionFilter:
+    f = ReactionFilter(window=60)
+    f.my_id = ME
+    return f
+
+
+def test_only_our_trigger_reaction_passes():
+    f = _filter()
+    assert not f(types.UpdateNewMessage(message=_edit().message, pts=1, pts_count=1))
+    assert not f(_edit(1))
+    assert not f(_edit(1, (OTHER, Config.TRIGGER_EMOJI)))
+    assert not f(_edit(1, (ME, "👍")))
+    assert f(_edit(1, (ME, Config.TRIGGER_EMOJI)))
+    assert f.stats() == {"seen": 5, "dispatched": 1, "duplicates": 0, "filtered_ratio": 0.8}
+
+
+def test_repeated_edits_with_our_reaction_are_duplicates():
+    f = _filter()
+    assert f(_edit(1, (ME, Config.TRIGGER_EMOJI)))
+    # Кто-то ещё поставил реакцию, наша осталась — задача не повторяется
+    assert not f(_edit(1, (ME, Config.TRIGGER_EMOJI), (OTHER, "👍")))
+    assert not f(_edit(1, (OTHER, "👍"), (ME, Config.TRIGGER_EMOJI), (ME, "🔥")))
+    # Другое сообщение — своя задача
+    assert f(_edit(2, (ME, Config.TRIGGER_EMOJI)))
+    assert (f.dispatched, f.duplicates) == (2, 2)
+
+
+def test_reaction_set_again_after_removal_is_dispatched():
+    f = _filter()
+    assert f(_edit(1, (ME, Config.TRIGGER_EMOJI)))
+    assert not f(_edit(1, (OTHER, "👍")))
+    assert f(_edit(1, (ME, Config.TRIGGER_EMOJI), (OTHER, "👍")))
+    # Все реакции сняты
+    assert not f(_edit(1))
+    assert f(_edit(1, (ME, Config.TRIGGER_EMOJI)))
+    assert (f.dispatched, f.duplicates) == (3, 0)
+
+
+def test_entity_updates_go_to_callback():
+    f = _filter()
+    seen = []
+    f.on_entity_update = seen.append
+    update = types.UpdateUserName(user_id=OTHER, first_name="Новое", last_name="", usernames=[])
+    assert not f(update)
+    assert seen == [update]
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from src.resilience import CircuitBreaker, CircuitOpenError, Policy, TransientError
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_half_open(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", threshold=2, reset_timeout=10)
+
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    now[0] = 11
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Пока идёт пробный запрос, остальные не пропускаются
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.allow()
+
+
+def test_failed_probe_reopens_breaker(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", threshold=1, reset_timeout=10)
+    breaker.failure()
+    now[0] = 11
+    breaker.allow()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def _flaky(errors: list):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    return fn, calls
+
+
+def test_policy_retries_transient_errors():
+    fn, calls = _flaky([TransientError(503), TransientError(429, retry_after=0)])
+    p = Policy("test", attempts=3, base_delay=0, max_delay=0)
+    assert asyncio.run(p.call(fn)) == "ok"
+    assert len(calls) == 3
+    assert p.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_policy_does_not_retry_client_errors():
+    fn, calls = _flaky([TransientError(400)])
+    p = Policy("test", attempts=3, base_delay=0, max_delay=0)
+    with pytest.raises(TransientError):
+        asyncio.run(p.call(fn))
+    assert len(calls) == 1
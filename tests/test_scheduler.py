@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from src.scheduler import Scheduler
+
+
+def _scheduler(workers: int = 1, maxsize: int = 10) -> Scheduler:
+    return Scheduler(workers={name: workers for name in Scheduler.POOLS}, maxsize=maxsize)
+
+
+def test_jobs_run_by_priority_then_fifo():
+    async def main():
+        scheduler = _scheduler()
+        scheduler.start()
+        gate = asyncio.Event()
+        order = []
+
+        async def job(name):
+            if name == "first":
+                await gate.wait()
+            order.append(name)
+
+        # Единственный воркер занят первой задачей, остальные копятся в очереди
+        futures = [await scheduler.submit("jobs", 0, lambda: job("first"))]
+        await asyncio.sleep(0)
+        for name, priority in (("long", 30), ("short-1", 1), ("fix", 0), ("short-2", 1)):
+            futures.append(await scheduler.submit("jobs", priority, lambda name=name: job(name)))
+        gate.set()
+        await asyncio.gather(*futures)
+        await scheduler.close(timeout=1)
+        return order
+
+    assert asyncio.run(main()) == ["first", "fix", "short-1", "short-2", "long"]
+
+
+def test_full_queue_blocks_submit():
+    async def main():
+        scheduler = _scheduler(maxsize=1)
+        scheduler.start()
+        gate = asyncio.Event()
+
+        async def job():
+            await gate.wait()
+
+        await scheduler.submit("jobs", 0, job)
+        await asyncio.sleep(0)
+        await scheduler.submit("jobs", 0, job)
+        # Воркер занят, очередь полна: третья задача ждёт места
+        blocked = asyncio.ensure_future(scheduler.submit("jobs", 0, job))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        assert scheduler.depths()["jobs"] == 1
+
+        gate.set()
+        await asyncio.wait_for(blocked, 1)
+        await scheduler.close(timeout=1)
+
+    asyncio.run(main())
+
+
+def test_close_drains_started_jobs_and_rejects_new():
+    async def main():
+        scheduler = _scheduler()
+        scheduler.start()
+        done = []
+
+        async def job(i):
+            # Задача с вложенной стадией: стадии после остановки ещё принимаются
+            await scheduler.run("transcribe", 0, lambda: asyncio.sleep(0.01))
+            done.append(i)
+
+        for i in range(3):
+            await scheduler.submit("jobs", 0, lambda i=i: job(i))
+        await scheduler.close(timeout=5)
+        assert done == [0, 1, 2]
+        with pytest.raises(RuntimeError):
+            await scheduler.submit("jobs", 0, lambda: job(3))
+
+    asyncio.run(main())
+
+
+def test_stage_error_reaches_caller():
+    async def main():
+        scheduler = _scheduler()
+        scheduler.start()
+
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await scheduler.run("fix", 0, fail)
+        await scheduler.close(timeout=1)
+
+    asyncio.run(main())
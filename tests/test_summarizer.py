@@ -0,0 +1,27 @@
+from src.summarizer import CHARS_PER_TOKEN, split_text
+
+
+def test_short_text_is_one_chunk():
+    assert split_text("Коротко.", 100) == ["Коротко."]
+
+
+def test_chunks_fit_limit_and_keep_all_words():
+    text = "\n\n".join(
+        " ".join(f"слово{p}_{i}." for i in range(60)) for p in range(5)
+    )
+    chunks = split_text(text, 50)
+    assert len(chunks) > 1
+    assert all(len(c) <= 50 * CHARS_PER_TOKEN for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_paragraphs_are_not_split_when_they_fit():
+    first, second = "Первый абзац. " * 5, "Второй абзац. " * 5
+    chunks = split_text(f"{first}\n\n{second}", len(first) // CHARS_PER_TOKEN + 1)
+    assert chunks == [first, second]
+
+
+def test_word_longer_than_limit_is_cut():
+    chunks = split_text("а" * 100, 10)
+    assert all(len(c) <= 10 * CHARS_PER_TOKEN for c in chunks)
+    assert "".join(chunks) == "а" * 100
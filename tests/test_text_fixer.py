@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from src.text_fixer import MistralTextFixer, is_noop
+
+
+@pytest.mark.parametrize("text", [
+    "ок",
+    "👍🔥",
+    "https://example.com/very/long/link",
+    "@username #тег",
+    "да нет",
+    "Привет, как дела? Всё хорошо, спасибо.",
+])
+def test_noop(text):
+    assert is_noop(text)
+
+
+@pytest.mark.parametrize("text", [
+    "привет как дела что нового у тебя сегодня вечером",
+    "смотри https://example.com там всё написано подробно и без ошибок вообще",
+])
+def test_needs_fix(text):
+    assert not is_noop(text)
+
+
+class _EchoAI:
+    """Вместо AIClient: «исправляет» текст, добавляя запятую после первого слова"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def chat(self, model, messages):
+        text = messages[-1]["content"]
+        self.calls.append(text)
+        await asyncio.sleep(0.01)
+        first, rest = text.split(" ", 1)
+        return f"{first}, {rest}"
+
+
+TEXT = "привет как дела что нового у тебя сегодня вечером"
+
+
+def test_cache_and_coalescing_keyed_on_exact_text():
+    async def main():
+        ai = _EchoAI()
+        fixer = MistralTextFixer(ai)
+        multiline = TEXT.replace(" у ", "\nу ")
+
+        # Одинаковые одновременные запросы — один вызов API
+        first, second, other = await asyncio.gather(
+            fixer.fix_punctuation(TEXT), fixer.fix_punctuation(TEXT), fixer.fix_punctuation(multiline)
+        )
+        assert first == second == "привет, как дела что нового у тебя сегодня вечером"
+        # Текст с переносом строки не получает чужой ответ без переноса
+        assert other == "привет, как дела что нового\nу тебя сегодня вечером"
+        assert ai.calls == [TEXT, multiline]
+
+        assert fixer.try_local(TEXT) == first
+        assert fixer.try_local(TEXT + " ") is None
+
+    asyncio.run(main())
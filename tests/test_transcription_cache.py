@@ -0,0 +1,60 @@
+import time
+from types import SimpleNamespace
+from src.transcription_cache import TranscriptionCache
+
+
+def _doc(doc_id: int):
+    return SimpleNamespace(id=doc_id, access_hash=doc_id * 10)
+
+
+def _cache(tmp_path, **kwargs):
+    kwargs.setdefault("ttl", 0)
+    kwargs.setdefault("max_entries", 0)
+    return TranscriptionCache(str(tmp_path / "transcriptions.sqlite3"), **kwargs)
+
+
+def test_hit_by_file_and_by_content(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get_by_file(_doc(1)) is None
+    assert cache.get_by_content("aa") is None
+    cache.put(_doc(1), "aa", "привет")
+
+    assert cache.get_by_file(_doc(1)) == "привет"
+    # Тот же файл, пересланный под другим id, находится по хэшу содержимого
+    assert cache.get_by_file(_doc(2)) is None
+    assert cache.get_by_content("aa") == "привет"
+    assert cache.has_file(_doc(1)) and not cache.has_file(_doc(2))
+    # Промах считается один раз на запись — после поиска по содержимому
+    assert cache.stats() == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
+    cache.close()
+
+
+def test_expired_entries_miss_and_are_evicted_on_open(tmp_path):
+    cache = _cache(tmp_path, ttl=60)
+    cache.put(_doc(1), "aa", "старое")
+    cache.db.execute("UPDATE transcripts SET created = ?", (time.time() - 120,))
+    cache.db.commit()
+    assert cache.get_by_file(_doc(1)) is None
+    assert not cache.has_file(_doc(1))
+    cache.close()
+
+    reopened = _cache(tmp_path, ttl=60)
+    assert reopened.db.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0] == 0
+    reopened.close()
+
+
+def test_eviction_keeps_recently_accessed(tmp_path):
+    cache = _cache(tmp_path)
+    for i in range(3):
+        cache.put(_doc(i), f"sha{i}", f"текст {i}")
+        cache.db.execute("UPDATE transcripts SET accessed = ? WHERE text = ?", (100 + i, f"текст {i}"))
+    cache.db.commit()
+    # Запись 0 прочитана последней — она переживёт вытеснение
+    assert cache.get_by_file(_doc(0)) == "текст 0"
+    cache.close()
+
+    # Лимит — 3 ключа: doc:0 (свежий доступ) и пара ключей записи 2
+    reopened = _cache(tmp_path, max_entries=3)
+    keys = {row[0] for row in reopened.db.execute("SELECT key FROM transcripts")}
+    assert keys == {"doc:0:0", "doc:2:20", "sha:sha2"}
+    reopened.close()